@@ -0,0 +1,135 @@
+import frappe
+from frappe.utils import add_months, flt, nowdate
+
+CLASSIFICATION_MONTHS = 12
+ABC_A_SHARE = 0.80
+ABC_B_SHARE = 0.95
+XYZ_X_CV = 0.5
+XYZ_Y_CV = 1.0
+
+
+def classify_inventory(company=None):
+    """
+    Company-wide ABC/XYZ class for every AI Inventory Forecast
+
+    ABC comes from each item/warehouse's share of the company's annual
+    consumption value, accumulated with a window function in value order.
+    XYZ comes from the coefficient of variation of its monthly consumption,
+    months without consumption counting as zero.
+    """
+    try:
+        values = {
+            "from_date": add_months(nowdate(), -CLASSIFICATION_MONTHS),
+            "months": CLASSIFICATION_MONTHS,
+            "company": company,
+            "a_share": ABC_A_SHARE,
+            "b_share": ABC_B_SHARE,
+            "x_cv": XYZ_X_CV,
+            "y_cv": XYZ_Y_CV
+        }
+        company_condition = "AND f.company = %(company)s" if company else ""
+
+        frappe.db.sql(f"""
+            UPDATE `tabAI Inventory Forecast` target
+            INNER JOIN (
+                SELECT
+                    name,
+                    annual_value,
+                    CASE
+                        WHEN annual_value <= 0 OR company_value <= 0 THEN 'C'
+                        WHEN running_value / company_value <= %(a_share)s THEN 'A'
+                        WHEN running_value / company_value <= %(b_share)s THEN 'B'
+                        ELSE 'C'
+                    END AS abc_class,
+                    CASE
+                        WHEN mean_qty IS NULL OR mean_qty <= 0 THEN 'Z'
+                        WHEN SQRT(GREATEST(mean_sq_qty - mean_qty * mean_qty, 0)) / mean_qty <= %(x_cv)s THEN 'X'
+                        WHEN SQRT(GREATEST(mean_sq_qty - mean_qty * mean_qty, 0)) / mean_qty <= %(y_cv)s THEN 'Y'
+                        ELSE 'Z'
+                    END AS xyz_class
+                FROM (
+                    SELECT
+                        f.name,
+                        IFNULL(u.annual_value, 0) AS annual_value,
+                        u.mean_qty,
+                        u.mean_sq_qty,
+                        SUM(IFNULL(u.annual_value, 0)) OVER (
+                            PARTITION BY f.company
+                            ORDER BY IFNULL(u.annual_value, 0) DESC, f.name
+                            ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                        ) AS running_value,
+                        SUM(IFNULL(u.annual_value, 0)) OVER (PARTITION BY f.company) AS company_value
+                    FROM `tabAI Inventory Forecast` f
+                    LEFT JOIN (
+                        SELECT
+                            item_code, warehouse,
+                            SUM(month_value) AS annual_value,
+                            SUM(month_qty) / %(months)s AS mean_qty,
+                            SUM(month_qty * month_qty) / %(months)s AS mean_sq_qty
+                        FROM (
+                            SELECT
+                                sle.item_code, sle.warehouse,
+                                DATE_FORMAT(sle.posting_date, '%%Y-%%m') AS month,
+                                SUM(-sle.actual_qty) AS month_qty,
+                                SUM(-sle.stock_value_difference) AS month_value
+                            FROM `tabStock Ledger Entry` sle
+                            WHERE sle.actual_qty < 0
+                            AND sle.is_cancelled = 0
+                            AND sle.posting_date >= %(from_date)s
+                            GROUP BY sle.item_code, sle.warehouse, month
+                        ) monthly
+                        GROUP BY item_code, warehouse
+                    ) u ON u.item_code = f.item_code AND u.warehouse = f.warehouse
+                    WHERE f.docstatus < 2
+                    {company_condition}
+                ) ranked
+            ) classes ON classes.name = target.name
+            SET target.abc_class = classes.abc_class,
+                target.xyz_class = classes.xyz_class,
+                target.annual_consumption_value = classes.annual_value
+        """, values)
+
+        frappe.db.commit()
+
+        return {"success": True, "classes": get_class_distribution(company)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"ABC/XYZ classification failed: {str(e)}", "ABC XYZ Classification")
+        return {"success": False, "error": str(e)}
+
+
+def get_class_distribution(company=None):
+    """Forecast count per ABC/XYZ class pair"""
+    conditions = "WHERE company = %(company)s" if company else ""
+    return {
+        f"{row.abc_class or '-'}{row.xyz_class or '-'}": row.count
+        for row in frappe.db.sql(f"""
+            SELECT abc_class, xyz_class, COUNT(*) AS count
+            FROM `tabAI Inventory Forecast`
+            {conditions}
+            GROUP BY abc_class, xyz_class
+        """, {"company": company}, as_dict=True)
+    }
+
+
+def get_forecast_classes(keys):
+    """Persisted classes for (item_code, warehouse) keys from one query"""
+    keys = {tuple(key) for key in keys if all(key)}
+    if not keys:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT item_code, warehouse, abc_class, xyz_class, annual_consumption_value
+        FROM `tabAI Inventory Forecast`
+        WHERE item_code IN %(item_codes)s
+        AND warehouse IN %(warehouses)s
+    """, {
+        "item_codes": list({key[0] for key in keys}),
+        "warehouses": list({key[1] for key in keys})
+    }, as_dict=True)
+
+    return {
+        (row.item_code, row.warehouse): row
+        for row in rows if (row.item_code, row.warehouse) in keys
+    }
@@ -4,30 +4,25 @@ Includes ARIMA, LSTM, Prophet, and specialized financial models
 """
 
 import frappe
-import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 import json
 import warnings
+from ai_inventory.lazy_imports import is_available, lazy_from, lazy_import
 warnings.filterwarnings('ignore')
 
-try:
-    from statsmodels.tsa.arima.model import ARIMA
-    from statsmodels.tsa.seasonal import seasonal_decompose
-    from statsmodels.tsa.holtwinters import ExponentialSmoothing
-    STATSMODELS_AVAILABLE = True
-except ImportError:
-    STATSMODELS_AVAILABLE = False
-    frappe.log_error("statsmodels not available. Install with: pip install statsmodels")
+# Heavy libraries are only imported when a model actually runs
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
-try:
-    import sklearn
-    from sklearn.preprocessing import MinMaxScaler
-    from sklearn.metrics import mean_absolute_error, mean_squared_error
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    frappe.log_error("sklearn not available. Install with: pip install scikit-learn")
+STATSMODELS_AVAILABLE = is_available("statsmodels")
+ARIMA = lazy_from("statsmodels.tsa.arima.model", "ARIMA")
+seasonal_decompose = lazy_from("statsmodels.tsa.seasonal", "seasonal_decompose")
+ExponentialSmoothing = lazy_from("statsmodels.tsa.holtwinters", "ExponentialSmoothing")
+
+SKLEARN_AVAILABLE = is_available("sklearn")
+MinMaxScaler = lazy_from("sklearn.preprocessing", "MinMaxScaler")
+mean_absolute_error = lazy_from("sklearn.metrics", "mean_absolute_error")
+mean_squared_error = lazy_from("sklearn.metrics", "mean_squared_error")
 
 class BaseTimeSeriesPredictor:
     """Base class for all time series predictors"""
@@ -379,10 +379,10 @@ def _calculate_company_health(company: str):
         }
 
 @frappe.whitelist()
-def get_dashboard_summary(company: str = None, period: str = "month"):
+def get_dashboard_summary(company: str = None, period: str = "month", sections: str = None):
     """Get dashboard summary data"""
     try:
-        dashboard_data = get_dashboard_data(company, period)
+        dashboard_data = get_dashboard_data(company, period, sections)
         return dashboard_data
         
     except Exception as e:
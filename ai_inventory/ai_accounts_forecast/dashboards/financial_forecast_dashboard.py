@@ -9,25 +9,52 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+# Dashboard sections: (builder, cache TTL in seconds, invalidation cache key prefix).
+# The prefixes are the keys hooks.update_forecast_cache clears on forecast changes.
+DASHBOARD_SECTIONS = {
+    "summary_metrics": ("get_summary_metrics", 300, "forecast_summary"),
+    "forecast_performance": ("get_forecast_performance", 600, "forecast_performance"),
+    "trend_analysis": ("get_trend_analysis", 900, "financial_dashboard"),
+    "risk_analysis": ("get_risk_analysis", 600, "financial_dashboard"),
+    "recent_forecasts": ("get_recent_forecasts", 120, "financial_dashboard"),
+    "alerts_notifications": ("get_alerts_and_notifications", 60, "financial_dashboard"),
+    "integration_status": ("get_integration_status", 300, "financial_dashboard")
+}
+PERIOD_SECTIONS = ("summary_metrics", "forecast_performance", "trend_analysis")
+MAX_SECTION_WORKERS = 4
+
 @frappe.whitelist()
-def get_dashboard_data(company=None, period="month"):
+def get_dashboard_data(company=None, period="month", sections=None):
     """
     Get comprehensive dashboard data for financial forecasting
+    
+    Each section is cached independently. Sections missing from the cache
+    are computed concurrently. Pass `sections` (comma separated or JSON
+    list) to fetch only some sections, e.g. for lazy loading.
     """
     try:
-        dashboard_data = {
-            "summary_metrics": get_summary_metrics(company, period),
-            "forecast_performance": get_forecast_performance(company, period),
-            "trend_analysis": get_trend_analysis(company, period),
-            "risk_analysis": get_risk_analysis(company),
-            "recent_forecasts": get_recent_forecasts(company),
-            "alerts_notifications": get_alerts_and_notifications(company),
-            "integration_status": get_integration_status(company)
-        }
+        requested = parse_sections(sections)
+        
+        dashboard_data = {}
+        cold_sections = []
+        for section in requested:
+            cached = get_cached_section(section, company, period)
+            if cached is not None:
+                dashboard_data[section] = cached
+            else:
+                cold_sections.append(section)
+        
+        computed = compute_sections(cold_sections, company, period)
+        for section, data in computed.items():
+            # Failed sections are retried on the next request instead of cached
+            if not (isinstance(data, dict) and data.get("section_error")):
+                set_cached_section(section, company, period, data)
+            dashboard_data[section] = data
         
         return {
             "success": True,
-            "data": dashboard_data,
+            "data": {section: dashboard_data[section] for section in requested},
+            "cached_sections": [s for s in requested if s not in cold_sections],
             "last_updated": datetime.now().isoformat()
         }
         
@@ -38,6 +65,124 @@ def get_dashboard_data(company=None, period="month"):
             "error": str(e)
         }
 
+def parse_sections(sections=None):
+    """Validate the requested section list, defaulting to all sections"""
+    if not sections:
+        return list(DASHBOARD_SECTIONS)
+    
+    if isinstance(sections, str):
+        try:
+            sections = json.loads(sections)
+        except ValueError:
+            sections = sections.split(",")
+    
+    requested = [s.strip() for s in sections if s and s.strip()]
+    unknown = [s for s in requested if s not in DASHBOARD_SECTIONS]
+    if unknown:
+        frappe.throw(_("Unknown dashboard sections: {0}").format(", ".join(unknown)))
+    
+    return requested
+
+def get_section_cache_key(section, company=None):
+    """Cache key holding a section; shared with hooks.update_forecast_cache"""
+    return f"{DASHBOARD_SECTIONS[section][2]}_{company or 'all'}"
+
+def get_section_field(section, period):
+    return f"{section}:{period}" if section in PERIOD_SECTIONS else section
+
+def get_cached_section(section, company=None, period="month"):
+    """Return a cached section payload if present and not expired"""
+    entries = frappe.cache().get_value(get_section_cache_key(section, company)) or {}
+    entry = entries.get(get_section_field(section, period))
+    
+    if entry and entry["expires"] > datetime.now().timestamp():
+        return entry["data"]
+    
+    return None
+
+def set_cached_section(section, company, period, data):
+    """Store a section payload with its own TTL"""
+    key = get_section_cache_key(section, company)
+    ttl = DASHBOARD_SECTIONS[section][1]
+    
+    entries = frappe.cache().get_value(key) or {}
+    entries[get_section_field(section, period)] = {
+        "data": data,
+        "expires": datetime.now().timestamp() + ttl
+    }
+    # Keep the key alive as long as its longest-lived section
+    frappe.cache().set_value(key, entries, expires_in_sec=max(v[1] for v in DASHBOARD_SECTIONS.values()))
+
+def build_section(section, company=None, period="month"):
+    """Compute a single dashboard section"""
+    builder = globals()[DASHBOARD_SECTIONS[section][0]]
+    
+    if section in PERIOD_SECTIONS:
+        return builder(company, period)
+    
+    return builder(company)
+
+def get_section_error_stub(section, error):
+    """Placeholder for a section that failed, so the rest of the dashboard still renders"""
+    frappe.log_error(f"Dashboard section {section} failed: {str(error)}", "Financial Forecast Dashboard")
+    return {"section_error": True, "error": str(error)}
+
+def compute_sections(sections, company=None, period="month"):
+    """
+    Compute cold sections, concurrently when more than one is needed
+    
+    A section that raises is returned as an error stub rather than failing
+    the whole dashboard.
+    """
+    if not sections:
+        return {}
+    
+    if len(sections) == 1:
+        try:
+            return {sections[0]: build_section(sections[0], company, period)}
+        except Exception as e:
+            return {sections[0]: get_section_error_stub(sections[0], e)}
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    site = frappe.local.site
+    sites_path = frappe.local.sites_path
+    user = frappe.session.user
+    
+    with ThreadPoolExecutor(max_workers=min(len(sections), MAX_SECTION_WORKERS)) as executor:
+        futures = {
+            section: executor.submit(build_section_on_own_connection,
+                                     site, sites_path, user, section, company, period)
+            for section in sections
+        }
+        
+        results = {}
+        for section, future in futures.items():
+            try:
+                results[section] = future.result()
+            except Exception as e:
+                results[section] = get_section_error_stub(section, e)
+        return results
+
+def build_section_on_own_connection(site, sites_path, user, section, company=None, period="month"):
+    """
+    Compute a section in a worker thread on its own database connection
+    
+    The connection goes to the read replica when the site has one configured
+    and to the primary otherwise. Section builders only read.
+    """
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+        
+        if frappe.conf.read_from_replica:
+            frappe.connect_replica()
+        
+        return build_section(section, company, period)
+    finally:
+        frappe.destroy()
+
 def get_summary_metrics(company=None, period="month"):
     """Get high-level summary metrics"""
     
@@ -109,35 +109,20 @@ class FinancialDataExtractor:
     
     def extract_inventory_financial_impact(self):
         """Extract inventory data that impacts finances"""
-        inventory_forecasts = frappe.get_all("AI Inventory Forecast",
-            filters={"company": self.company} if self.company else {},
-            fields=["*"]
-        )
+        from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import get_company_inventory_impact
         
-        financial_impact = {
-            "total_inventory_value": 0,
-            "reorder_cash_impact": 0,
-            "carrying_cost_monthly": 0,
-            "forecasts": inventory_forecasts
-        }
+        # Read the maintained company aggregate rather than every inventory forecast
+        impact = get_company_inventory_impact(self.company)
         
-        for forecast in inventory_forecasts:
-            # Calculate inventory value
-            current_value = (forecast.get("current_stock", 0) * 
-                           forecast.get("valuation_rate", 0))
-            financial_impact["total_inventory_value"] += current_value
-            
-            # Calculate reorder cash impact
-            if forecast.get("reorder_alert"):
-                reorder_cost = (forecast.get("suggested_qty", 0) * 
-                              forecast.get("valuation_rate", 0))
-                financial_impact["reorder_cash_impact"] += reorder_cost
-            
-            # Calculate carrying costs (25% annually)
-            carrying_cost = current_value * 0.25 / 12
-            financial_impact["carrying_cost_monthly"] += carrying_cost
-        
-        return financial_impact
+        return {
+            "total_inventory_value": impact["total_inventory_value"],
+            "reorder_cash_impact": impact["reorder_cash_impact"],
+            "carrying_cost_monthly": impact["carrying_cost_monthly"],
+            "purchase_impact": impact["purchase_impact"],
+            "revenue_impact": impact["revenue_impact"],
+            "forecast_count": impact["forecast_count"],
+            "by_item_group": impact["by_item_group"]
+        }
 
 class DataQualityValidator:
     """Validate quality of extracted financial data"""
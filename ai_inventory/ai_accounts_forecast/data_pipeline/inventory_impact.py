@@ -0,0 +1,195 @@
+"""
+Inventory Financial Impact Aggregate
+Maintains per (company, item group) inventory impact totals in AI Inventory Impact Summary
+"""
+
+import frappe
+from frappe.utils import flt, now
+import hashlib
+from typing import Dict, Optional
+
+CARRYING_COST_ANNUAL_RATE = 0.25
+REVENUE_MARKUP = 1.3  # 30% markup assumption
+IMPACT_FIELDS = ["total_inventory_value", "reorder_cash_impact", "carrying_cost_monthly",
+                 "purchase_impact", "revenue_impact"]
+# Per bucket sums over `tabAI Inventory Forecast` f, matching get_forecast_contribution
+IMPACT_SUMS = f"""
+    COUNT(*) AS forecast_count,
+    SUM(f.current_stock * f.valuation_rate) AS total_inventory_value,
+    SUM(CASE WHEN f.reorder_alert = 1 THEN f.suggested_qty * f.valuation_rate ELSE 0 END) AS reorder_cash_impact,
+    SUM(f.current_stock * f.valuation_rate) * {CARRYING_COST_ANNUAL_RATE} / 12 AS carrying_cost_monthly,
+    SUM(f.predicted_consumption * f.valuation_rate) AS purchase_impact,
+    SUM(f.predicted_consumption * f.valuation_rate) * {REVENUE_MARKUP} AS revenue_impact
+"""
+NAME_CHUNK_SIZE = 1000
+
+
+def get_summary_name(company: str, item_group: Optional[str]) -> str:
+    """Deterministic row name for a (company, item group) bucket"""
+    return hashlib.md5(f"{company}\n{item_group or ''}".encode()).hexdigest()[:16]
+
+
+def get_forecast_contribution(forecast) -> Dict:
+    """Impact a single AI Inventory Forecast contributes to its bucket"""
+    valuation_rate = flt(forecast.get("valuation_rate"))
+    inventory_value = flt(forecast.get("current_stock")) * valuation_rate
+    purchase_impact = flt(forecast.get("predicted_consumption")) * valuation_rate
+
+    return {
+        "forecast_count": 1,
+        "total_inventory_value": inventory_value,
+        "reorder_cash_impact": flt(forecast.get("suggested_qty")) * valuation_rate if forecast.get("reorder_alert") else 0,
+        "carrying_cost_monthly": inventory_value * CARRYING_COST_ANNUAL_RATE / 12,
+        "purchase_impact": purchase_impact,
+        "revenue_impact": purchase_impact * REVENUE_MARKUP
+    }
+
+
+def apply_impact_delta(company: str, item_group: Optional[str], delta: Dict, sign: int = 1):
+    """Atomically add (or subtract) a contribution to a bucket"""
+    if not company:
+        return
+
+    values = [sign * flt(delta[field]) for field in ["forecast_count"] + IMPACT_FIELDS]
+    timestamp = now()
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabAI Inventory Impact Summary`
+            (name, company, item_group, forecast_count, {", ".join(IMPACT_FIELDS)},
+             creation, modified, owner, modified_by, docstatus)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Administrator', 'Administrator', 0)
+        ON DUPLICATE KEY UPDATE
+            forecast_count = forecast_count + VALUES(forecast_count),
+            {", ".join(f"{field} = {field} + VALUES({field})" for field in IMPACT_FIELDS)},
+            modified = VALUES(modified)
+    """, [get_summary_name(company, item_group), company, item_group or None] + values + [timestamp, timestamp])
+
+
+def apply_forecasts_impact(conditions: str, values: Dict, sign: int = 1):
+    """
+    Add (or with sign=-1 remove) the contribution of the forecasts matching conditions
+
+    Raw SQL writers to AI Inventory Forecast bypass the document events, so
+    they call this with sign=-1 before the write and sign=1 after it. One
+    grouped read and one upsert per touched bucket, whatever the row count.
+    """
+    try:
+        for row in frappe.db.sql(f"""
+            SELECT f.company, f.item_group, {IMPACT_SUMS}
+            FROM `tabAI Inventory Forecast` f
+            WHERE {conditions}
+            GROUP BY f.company, f.item_group
+        """, values, as_dict=True):
+            apply_impact_delta(row.company, row.item_group, row, sign)
+
+    except Exception as e:
+        frappe.log_error(f"Inventory impact delta error: {str(e)}", "Inventory Impact Aggregate")
+
+
+def apply_named_forecasts_impact(names, sign: int = 1):
+    """apply_forecasts_impact for forecasts by name"""
+    names = list(names)
+    for start in range(0, len(names), NAME_CHUNK_SIZE):
+        apply_forecasts_impact("f.name IN %(names)s", {"names": names[start:start + NAME_CHUNK_SIZE]}, sign)
+
+
+def on_inventory_forecast_update(doc, method):
+    """Move the forecast's contribution from its old bucket values to the new ones"""
+    try:
+        old_doc = doc.get_doc_before_save()
+        if old_doc:
+            apply_impact_delta(old_doc.company, old_doc.item_group, get_forecast_contribution(old_doc), sign=-1)
+
+        apply_impact_delta(doc.company, doc.item_group, get_forecast_contribution(doc))
+
+    except Exception as e:
+        frappe.log_error(f"Inventory impact update error: {str(e)}", "Inventory Impact Aggregate")
+
+
+def on_inventory_forecast_trash(doc, method):
+    """Remove a deleted forecast's contribution"""
+    try:
+        apply_impact_delta(doc.company, doc.item_group, get_forecast_contribution(doc), sign=-1)
+    except Exception as e:
+        frappe.log_error(f"Inventory impact delete error: {str(e)}", "Inventory Impact Aggregate")
+
+
+def get_company_inventory_impact(company: Optional[str] = None) -> Dict:
+    """Read the aggregated inventory impact for a company (all companies if not given)"""
+    filters = {"company": company} if company else {}
+    buckets = frappe.get_all("AI Inventory Impact Summary",
+        filters=filters,
+        fields=["item_group", "forecast_count"] + IMPACT_FIELDS
+    )
+
+    impact = {field: 0 for field in IMPACT_FIELDS}
+    impact["forecast_count"] = 0
+    impact["by_item_group"] = {}
+
+    for bucket in buckets:
+        impact["forecast_count"] += bucket.forecast_count or 0
+        for field in IMPACT_FIELDS:
+            impact[field] += flt(bucket.get(field))
+
+        group = impact["by_item_group"].setdefault(bucket.item_group or "Uncategorized", {field: 0 for field in IMPACT_FIELDS})
+        for field in IMPACT_FIELDS:
+            group[field] += flt(bucket.get(field))
+
+    return impact
+
+
+def rebuild_inventory_impact_summary(company: Optional[str] = None):
+    """
+    Recompute the aggregate from scratch
+
+    The main SQL writers keep the aggregate current through
+    apply_forecasts_impact, but valuation rates and other direct writers
+    (sync jobs) are only picked up here, so this runs daily to correct drift.
+    """
+    try:
+        conditions = "WHERE f.company = %(company)s" if company else ""
+        values = {"company": company}
+
+        # Refresh the valuation rate each forecast contributes with
+        frappe.db.sql(f"""
+            UPDATE `tabAI Inventory Forecast` f
+            LEFT JOIN `tabBin` b ON b.item_code = f.item_code AND b.warehouse = f.warehouse
+            LEFT JOIN `tabItem` i ON i.name = f.item_code
+            SET f.valuation_rate = COALESCE(NULLIF(b.valuation_rate, 0), i.valuation_rate, 0)
+            {conditions}
+        """, values)
+
+        rows = frappe.db.sql(f"""
+            SELECT
+                f.company,
+                f.item_group,
+                {IMPACT_SUMS}
+            FROM `tabAI Inventory Forecast` f
+            {conditions}
+            GROUP BY f.company, f.item_group
+        """, values, as_dict=True)
+
+        if company:
+            frappe.db.delete("AI Inventory Impact Summary", {"company": company})
+        else:
+            frappe.db.delete("AI Inventory Impact Summary")
+
+        timestamp = now()
+        fields = ["name", "company", "item_group", "forecast_count"] + IMPACT_FIELDS + [
+            "last_rebuilt", "creation", "modified", "owner", "modified_by", "docstatus"
+        ]
+        frappe.db.bulk_insert("AI Inventory Impact Summary", fields, [
+            [get_summary_name(row.company, row.item_group), row.company, row.item_group, row.forecast_count]
+            + [flt(row.get(field)) for field in IMPACT_FIELDS]
+            + [timestamp, timestamp, timestamp, "Administrator", "Administrator", 0]
+            for row in rows if row.company
+        ])
+
+        frappe.db.commit()
+
+        return {"success": True, "buckets": len(rows)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Inventory impact rebuild error: {str(e)}", "Inventory Impact Aggregate")
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,173 @@
+"""
+Monthly Revenue Cube
+Maintains submitted Sales Invoice revenue per (company, month, customer group, territory, item group)
+in AI Revenue Cube
+"""
+
+import frappe
+from frappe.utils import add_months, flt, get_first_day, getdate, now, nowdate
+import hashlib
+from typing import Dict, List, Optional, Sequence
+
+CUBE_DIMENSIONS = ("company", "month", "customer_group", "territory", "item_group")
+CUBE_MEASURES = ("net_revenue", "qty", "invoice_count")
+REBUILD_MONTHS = 24
+
+
+def get_cube_name(company: str, month, customer_group: Optional[str],
+                  territory: Optional[str], item_group: Optional[str]) -> str:
+    """Deterministic row name for a cube cell"""
+    key = "\n".join([company, str(getdate(month)), customer_group or "", territory or "", item_group or ""])
+    return hashlib.md5(key.encode()).hexdigest()[:16]
+
+
+def get_invoice_cells(doc) -> List[Dict]:
+    """Revenue a submitted Sales Invoice contributes, one cell per item group"""
+    month = get_first_day(doc.posting_date)
+    cells = {}
+
+    for item in doc.get("items") or []:
+        cell = cells.setdefault(item.item_group, {
+            "company": doc.company,
+            "month": month,
+            "customer_group": doc.customer_group,
+            "territory": doc.territory,
+            "item_group": item.item_group,
+            "net_revenue": 0,
+            "qty": 0,
+            "invoice_count": 1
+        })
+        cell["net_revenue"] += flt(item.base_net_amount)
+        cell["qty"] += flt(item.stock_qty or item.qty)
+
+    return list(cells.values())
+
+
+def apply_revenue_delta(cells: List[Dict], sign: int = 1):
+    """Atomically add (or subtract) invoice cells to the cube"""
+    timestamp = now()
+
+    for cell in cells:
+        if not cell.get("company"):
+            continue
+
+        frappe.db.sql(f"""
+            INSERT INTO `tabAI Revenue Cube`
+                (name, {", ".join(CUBE_DIMENSIONS)}, {", ".join(CUBE_MEASURES)},
+                 creation, modified, owner, modified_by, docstatus)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Administrator', 'Administrator', 0)
+            ON DUPLICATE KEY UPDATE
+                {", ".join(f"{field} = {field} + VALUES({field})" for field in CUBE_MEASURES)},
+                modified = VALUES(modified)
+        """, [get_cube_name(*(cell[field] for field in CUBE_DIMENSIONS))]
+            + [cell[field] or None for field in CUBE_DIMENSIONS]
+            + [sign * flt(cell[field]) for field in CUBE_MEASURES]
+            + [timestamp, timestamp])
+
+
+def on_sales_invoice_submit(doc, method):
+    """Add a submitted invoice's revenue to its cube cells"""
+    try:
+        apply_revenue_delta(get_invoice_cells(doc))
+    except Exception as e:
+        frappe.log_error(f"Revenue cube submit error for {doc.name}: {str(e)}", "Revenue Cube")
+
+
+def on_sales_invoice_cancel(doc, method):
+    """Remove a cancelled invoice's revenue from its cube cells"""
+    try:
+        apply_revenue_delta(get_invoice_cells(doc), sign=-1)
+    except Exception as e:
+        frappe.log_error(f"Revenue cube cancel error for {doc.name}: {str(e)}", "Revenue Cube")
+
+
+def get_revenue_cube_slice(company: Optional[str] = None, period_months: int = 18,
+                           group_by: Sequence[str] = ("month",), filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Roll the cube up to the requested dimensions over the last period_months
+
+    filters may pin any cube dimension to a value, e.g. {"territory": "India"}.
+    """
+    group_by = [dimension for dimension in group_by if dimension in CUBE_DIMENSIONS]
+    conditions = ["month >= %(from_month)s"]
+    values = {"from_month": get_first_day(add_months(nowdate(), -int(period_months or 18)))}
+
+    if company:
+        conditions.append("company = %(company)s")
+        values["company"] = company
+
+    for dimension, value in (filters or {}).items():
+        if dimension in CUBE_DIMENSIONS:
+            conditions.append(f"{dimension} = %({dimension})s")
+            values[dimension] = value
+
+    select_dimensions = "".join(f"{dimension}, " for dimension in group_by)
+    grouping = f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ""
+
+    return frappe.db.sql(f"""
+        SELECT
+            {select_dimensions}
+            SUM(net_revenue) AS net_revenue,
+            SUM(qty) AS qty,
+            SUM(invoice_count) AS invoice_count
+        FROM `tabAI Revenue Cube`
+        WHERE {" AND ".join(conditions)}
+        {grouping}
+    """, values, as_dict=True)
+
+
+def rebuild_revenue_cube(company: Optional[str] = None, months: int = REBUILD_MONTHS):
+    """
+    Recompute the last `months` of the cube from submitted Sales Invoices
+
+    Runs nightly to correct drift from invoices changed outside the document
+    events (data imports, direct SQL fixes) and backfills new sites.
+    """
+    try:
+        from_month = get_first_day(add_months(nowdate(), -int(months)))
+        values = {"from_month": from_month, "company": company}
+        invoice_conditions = "AND si.company = %(company)s" if company else ""
+
+        rows = frappe.db.sql(f"""
+            SELECT
+                si.company,
+                DATE_FORMAT(si.posting_date, '%%Y-%%m-01') AS month,
+                si.customer_group,
+                si.territory,
+                sii.item_group,
+                SUM(sii.base_net_amount) AS net_revenue,
+                SUM(IFNULL(NULLIF(sii.stock_qty, 0), sii.qty)) AS qty,
+                COUNT(DISTINCT si.name) AS invoice_count
+            FROM `tabSales Invoice` si
+            INNER JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
+            WHERE si.docstatus = 1
+            AND si.posting_date >= %(from_month)s
+            {invoice_conditions}
+            GROUP BY si.company, month, si.customer_group, si.territory, sii.item_group
+        """, values, as_dict=True)
+
+        cube_conditions = {"month": [">=", from_month]}
+        if company:
+            cube_conditions["company"] = company
+        frappe.db.delete("AI Revenue Cube", cube_conditions)
+
+        timestamp = now()
+        fields = ["name"] + list(CUBE_DIMENSIONS) + list(CUBE_MEASURES) + [
+            "last_rebuilt", "creation", "modified", "owner", "modified_by", "docstatus"
+        ]
+        frappe.db.bulk_insert("AI Revenue Cube", fields, [
+            [get_cube_name(*(row[field] for field in CUBE_DIMENSIONS))]
+            + [row[field] or None for field in CUBE_DIMENSIONS]
+            + [flt(row[field]) for field in CUBE_MEASURES]
+            + [timestamp, timestamp, timestamp, "Administrator", "Administrator", 0]
+            for row in rows if row.company
+        ], chunk_size=1000)
+
+        frappe.db.commit()
+
+        return {"success": True, "cells": len(rows)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Revenue cube rebuild error: {str(e)}", "Revenue Cube")
+        return {"success": False, "error": str(e)}
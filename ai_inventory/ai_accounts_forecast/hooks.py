@@ -5,9 +5,12 @@ Handles ERPNext document events for financial forecasting integration
 
 import frappe
 from frappe import _
+from frappe.utils import flt
+import hashlib
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from ai_inventory.instrumentation import instrument
 
 def validate_financial_forecast(doc, method):
     """Validate financial forecast before saving"""
@@ -74,7 +77,7 @@ def after_financial_forecast_insert(doc, method):
             send_first_forecast_notification(doc)
         
         # Update dashboard cache
-        frappe.cache().delete_key(f"financial_dashboard_{doc.company}")
+        update_forecast_cache(doc.company)
         
         # Trigger automatic sync to specific forecast types
         try:
@@ -95,11 +98,15 @@ def after_financial_forecast_insert(doc, method):
 def on_journal_entry_submit(doc, method):
     """Handle journal entry submission for financial forecasting"""
     try:
-        # Extract relevant financial data
+        # Net each account across all lines of the voucher so a large journal
+        # records one trigger per account instead of one per line
         for entry in doc.accounts:
-            if entry.account and entry.debit_in_account_currency or entry.credit_in_account_currency:
-                # Trigger forecast update for affected account
-                enqueue_forecast_update(doc.company, entry.account, "Journal Entry")
+            if not entry.account:
+                continue
+            net_amount = flt(entry.debit_in_account_currency) - flt(entry.credit_in_account_currency)
+            if net_amount:
+                collect_forecast_trigger(doc.company, entry.account, "Journal Entry",
+                                         get_voucher_key(doc.doctype, doc.name), net_amount)
                 
     except Exception as e:
         frappe.log_error(f"Journal entry forecast trigger error: {str(e)}", "Financial Forecast Trigger")
@@ -107,16 +114,12 @@ def on_journal_entry_submit(doc, method):
 def on_payment_entry_submit(doc, method):
     """Handle payment entry submission for financial forecasting"""
     try:
-        accounts_to_update = []
-        
         if doc.paid_from:
-            accounts_to_update.append(doc.paid_from)
+            collect_forecast_trigger(doc.company, doc.paid_from, "Payment Entry",
+                                     get_voucher_key(doc.doctype, doc.name), -flt(doc.paid_amount))
         if doc.paid_to:
-            accounts_to_update.append(doc.paid_to)
-        
-        # Enqueue forecast updates for affected accounts
-        for account in accounts_to_update:
-            enqueue_forecast_update(doc.company, account, "Payment Entry")
+            collect_forecast_trigger(doc.company, doc.paid_to, "Payment Entry",
+                                     get_voucher_key(doc.doctype, doc.name), flt(doc.received_amount))
             
     except Exception as e:
         frappe.log_error(f"Payment entry forecast trigger error: {str(e)}", "Financial Forecast Trigger")
@@ -124,11 +127,11 @@ def on_payment_entry_submit(doc, method):
 def on_gl_entry_submit(doc, method):
     """Handle GL entry submission for financial forecasting"""
     try:
-        # Only update for significant amounts (configurable threshold)
-        amount_threshold = frappe.db.get_single_value("AI Financial Settings", "forecast_trigger_threshold") or 1000
-        
-        if doc.debit > amount_threshold or doc.credit > amount_threshold:
-            enqueue_forecast_update(doc.company, doc.account, "GL Entry")
+        # GL rows are netted per voucher and account; the threshold is applied
+        # to that net when the voucher's triggers are flushed
+        voucher = get_voucher_key(doc.voucher_type, doc.voucher_no) if doc.voucher_no else doc.name
+        collect_forecast_trigger(doc.company, doc.account, "GL Entry", voucher,
+                                 flt(doc.debit) - flt(doc.credit))
             
     except Exception as e:
         frappe.log_error(f"GL entry forecast trigger error: {str(e)}", "Financial Forecast Trigger")
@@ -191,14 +194,14 @@ def validate_model_parameters(doc):
 def sync_with_inventory_forecast(doc):
     """Sync financial forecast with inventory forecasts"""
     try:
-        # Get related inventory forecasts
-        inventory_forecasts = frappe.get_all("AI Inventory Forecast",
-                                           filters={"company": doc.company},
-                                           fields=["name", "item_code", "predicted_consumption", "valuation_rate"])
+        from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import get_company_inventory_impact
+        
+        # Read the precomputed company aggregate instead of scanning inventory forecasts
+        company_impact = get_company_inventory_impact(doc.company)
         
-        if inventory_forecasts:
+        if company_impact["forecast_count"]:
             # Calculate inventory impact on financial forecast
-            inventory_impact = calculate_inventory_financial_impact(inventory_forecasts, doc.forecast_type)
+            inventory_impact = calculate_inventory_financial_impact(company_impact, doc.forecast_type)
             
             # Update financial forecast with inventory insights
             if inventory_impact:
@@ -207,31 +210,26 @@ def sync_with_inventory_forecast(doc):
     except Exception as e:
         frappe.log_error(f"Inventory sync error: {str(e)}", "Financial Forecast Inventory Sync")
 
-def calculate_inventory_financial_impact(inventory_forecasts, forecast_type):
-    """Calculate financial impact from inventory forecasts"""
+def calculate_inventory_financial_impact(company_impact, forecast_type):
+    """Calculate financial impact from the company inventory impact aggregate"""
     impact = {"total_impact": 0, "details": []}
     
-    for inv in inventory_forecasts:
-        if forecast_type == "Cash Flow":
-            # Calculate cash flow impact from inventory purchases
-            purchase_impact = (inv.predicted_consumption or 0) * (inv.valuation_rate or 0)
-            impact["total_impact"] += purchase_impact
-            impact["details"].append({
-                "item": inv.item_code,
-                "impact": purchase_impact,
-                "type": "purchase_cashflow"
-            })
-        
-        elif forecast_type == "Revenue":
-            # Estimate revenue impact (would need selling price)
-            # For now, use a simple multiplier
-            revenue_impact = (inv.predicted_consumption or 0) * (inv.valuation_rate or 0) * 1.3  # 30% markup assumption
-            impact["total_impact"] += revenue_impact
-            impact["details"].append({
-                "item": inv.item_code,
-                "impact": revenue_impact,
-                "type": "sales_revenue"
-            })
+    if forecast_type == "Cash Flow":
+        # Cash flow impact from inventory purchases
+        field, impact_type = "purchase_impact", "purchase_cashflow"
+    elif forecast_type == "Revenue":
+        # Estimated revenue impact (valuation plus markup assumption)
+        field, impact_type = "revenue_impact", "sales_revenue"
+    else:
+        return None
+    
+    impact["total_impact"] = company_impact[field]
+    for item_group, group_impact in company_impact["by_item_group"].items():
+        impact["details"].append({
+            "item_group": item_group,
+            "impact": group_impact[field],
+            "type": impact_type
+        })
     
     return impact if impact["total_impact"] > 0 else None
 
@@ -260,6 +258,108 @@ def update_forecast_with_inventory_data(doc, inventory_impact):
     except Exception as e:
         frappe.log_error(f"Forecast update error: {str(e)}", "Financial Forecast Update")
 
+# Trigger Aggregation
+
+def get_trigger_settings():
+    """Get forecast trigger settings, cached for the current request"""
+    settings = getattr(frappe.local, "ai_financial_trigger_settings", None)
+    
+    if settings is None:
+        threshold = frappe.db.get_single_value("AI Financial Settings", "forecast_trigger_threshold")
+        settings = frappe._dict(amount_threshold=flt(threshold) or 1000)
+        frappe.local.ai_financial_trigger_settings = settings
+    
+    return settings
+
+def get_voucher_key(voucher_type, voucher_no):
+    """Key a voucher the same way in the voucher and GL Entry hooks"""
+    return f"{voucher_type}::{voucher_no}"
+
+def get_voucher_net(source_nets):
+    """Net of one voucher on an account; its GL rows win over its own submit hook"""
+    if "GL Entry" in source_nets:
+        return source_nets["GL Entry"]
+    return next(iter(source_nets.values()), 0)
+
+def collect_forecast_trigger(company, account, trigger_source, voucher, net_amount):
+    """Record an affected (company, account) pair for the current transaction
+    
+    Amounts are netted per voucher (see get_voucher_key) and per source. The
+    GL rows of a voucher and the voucher's own submit hook describe the same
+    movement, so only one of them counts towards the threshold. A single
+    flush is registered to run after the transaction commits.
+    """
+    if not company or not account:
+        return
+    
+    pending = getattr(frappe.local, "ai_financial_forecast_triggers", None)
+    
+    if pending is None:
+        pending = frappe.local.ai_financial_forecast_triggers = {}
+        frappe.db.after_commit.add(flush_forecast_triggers)
+        frappe.db.after_rollback.add(reset_forecast_triggers)
+    
+    entry = pending.setdefault((company, account), {"sources": set(), "voucher_nets": {}})
+    entry["sources"].add(trigger_source)
+    source_nets = entry["voucher_nets"].setdefault(voucher, {})
+    source_nets[trigger_source] = source_nets.get(trigger_source, 0) + flt(net_amount)
+
+def reset_forecast_triggers():
+    """Discard triggers collected in a transaction that was rolled back"""
+    frappe.local.ai_financial_forecast_triggers = None
+
+@instrument("hooks.flush_forecast_triggers")
+def flush_forecast_triggers():
+    """Enqueue one deduplicated batch job for all accounts touched in the transaction"""
+    pending = getattr(frappe.local, "ai_financial_forecast_triggers", None)
+    reset_forecast_triggers()
+    
+    if not pending:
+        return
+    
+    try:
+        threshold = get_trigger_settings().amount_threshold
+        cache = frappe.cache()
+        accounts = []
+        
+        for (company, account), entry in pending.items():
+            # Threshold applies to the largest per-voucher net, not to single lines
+            if max(abs(get_voucher_net(nets)) for nets in entry["voucher_nets"].values()) <= threshold:
+                continue
+            
+            # Skip accounts that already have an update queued
+            if cache.get(f"forecast_update_{company}_{account}"):
+                continue
+            
+            accounts.append({
+                "company": company,
+                "account": account,
+                "trigger_source": ", ".join(sorted(entry["sources"]))
+            })
+        
+        if not accounts:
+            return
+        
+        # Same account set, same job id, so repeated flushes deduplicate
+        job_key = hashlib.md5(
+            json.dumps(sorted((a["company"], a["account"]) for a in accounts)).encode()
+        ).hexdigest()[:16]
+        frappe.enqueue(
+            'ai_inventory.ai_accounts_forecast.hooks.update_account_forecasts',
+            accounts=accounts,
+            queue='default',
+            timeout=300 + 60 * len(accounts),
+            job_id=f"ai_financial_forecast_update::{job_key}",
+            deduplicate=True
+        )
+        
+        # Mark the accounts as queued only once the job is actually enqueued
+        for a in accounts:
+            cache.set(f"forecast_update_{a['company']}_{a['account']}", True, expires_in_sec=300)  # 5 minutes
+        
+    except Exception as e:
+        frappe.log_error(f"Forecast trigger flush error: {str(e)}", "Financial Forecast Queue")
+
 def enqueue_forecast_update(company, account, trigger_source):
     """Enqueue forecast update job"""
     try:
@@ -272,7 +372,7 @@ def enqueue_forecast_update(company, account, trigger_source):
             
             # Enqueue the update job
             frappe.enqueue(
-                'ai_inventory.ai_accounts_forecast.jobs.update_account_forecast',
+                'ai_inventory.ai_accounts_forecast.hooks.update_account_forecast',
                 company=company,
                 account=account,
                 trigger_source=trigger_source,
@@ -318,12 +418,14 @@ def get_forecast_types_for_account(account_type):
 def update_forecast_cache(company):
     """Update forecast summary cache"""
     try:
-        # Clear existing cache
-        cache_keys = [
-            f"financial_dashboard_{company}",
-            f"forecast_summary_{company}",
-            f"forecast_performance_{company}"
-        ]
+        # Clear existing cache, including the all-companies dashboard sections
+        cache_keys = []
+        for scope in (company, "all"):
+            cache_keys.extend([
+                f"financial_dashboard_{scope}",
+                f"forecast_summary_{scope}",
+                f"forecast_performance_{scope}"
+            ])
         
         for key in cache_keys:
             frappe.cache().delete_key(key)
@@ -447,6 +549,11 @@ def log_forecast_activity(doc, activity):
 
 # Background Jobs
 
+def update_account_forecasts(accounts):
+    """Background job to update forecasts for a batch of triggered accounts"""
+    for entry in accounts:
+        update_account_forecast(entry["company"], entry["account"], entry["trigger_source"])
+
 def update_account_forecast(company, account, trigger_source):
     """Background job to update account forecast"""
     try:
@@ -0,0 +1,228 @@
+"""
+Financial Alert Engine - Set-based alert evaluation
+Evaluates alert rules over the whole AI Financial Forecast table in one pass
+"""
+
+import frappe
+from frappe.utils import flt, now
+import numpy as np
+from typing import Dict, List
+from ai_inventory.series import reserve_series
+
+OPEN_ALERT_STATUSES = ("Open", "Investigating")
+LOW_CONFIDENCE_THRESHOLD = 50
+VARIANCE_BAND_PCT = 50
+# AI Financial Alert is named format:AI-ALERT-{#####}; frappe keys the counter of a
+# braced series by the text inside the braces, which is empty here
+ALERT_NAME_PREFIX = "AI-ALERT-"
+ALERT_SERIES_KEY = ""
+ALERT_SERIES_DIGITS = 5
+
+
+class FinancialAlertEngine:
+    """Evaluate financial alert rules as vectorized predicates over all forecasts"""
+
+    def __init__(self, company: str = None):
+        self.company = company
+        self.settings = self._load_thresholds()
+
+    def _load_thresholds(self) -> Dict:
+        """Read balance thresholds once per run"""
+        def _get_single_safe(field: str):
+            try:
+                return frappe.db.get_single_value("AI Financial Settings", field)
+            except Exception:
+                return None
+
+        return {
+            "low_balance": flt(_get_single_safe("forecast_trigger_threshold")) or 10000,
+            "critical_balance": flt(_get_single_safe("critical_threshold")) or 1000
+        }
+
+    def run(self) -> Dict:
+        """Evaluate all rules, drop alerts that are already open and bulk insert the rest"""
+        forecasts = self._load_forecasts()
+        if not forecasts:
+            return {"success": True, "forecasts_evaluated": 0, "alerts_created": 0}
+
+        candidates = self.evaluate(forecasts)
+        new_alerts = self._exclude_open_alerts(candidates)
+        created = self._bulk_insert_alerts(new_alerts)
+
+        return {
+            "success": True,
+            "forecasts_evaluated": len(forecasts),
+            "alerts_matched": len(candidates),
+            "alerts_created": created
+        }
+
+    def _load_forecasts(self) -> List[Dict]:
+        """Load every active forecast with its account balance in a single query"""
+        conditions = "f.docstatus != 2"
+        values = {}
+        if self.company:
+            conditions += " AND f.company = %(company)s"
+            values["company"] = self.company
+
+        return frappe.db.sql(f"""
+            SELECT
+                f.name, f.company, f.account, f.forecast_type,
+                f.predicted_amount, f.confidence_score,
+                bal.balance
+            FROM `tabAI Financial Forecast` f
+            LEFT JOIN (
+                SELECT
+                    gl.account,
+                    SUM(CASE WHEN acc.root_type IN ('Asset', 'Expense')
+                             THEN gl.debit - gl.credit
+                             ELSE gl.credit - gl.debit END) AS balance
+                FROM `tabGL Entry` gl
+                INNER JOIN `tabAccount` acc ON acc.name = gl.account
+                WHERE gl.is_cancelled = 0
+                AND gl.docstatus = 1
+                AND gl.account IN (
+                    SELECT DISTINCT account FROM `tabAI Financial Forecast`
+                    WHERE forecast_type = 'Cash Flow' AND docstatus != 2
+                )
+                GROUP BY gl.account
+            ) bal ON bal.account = f.account AND f.forecast_type = 'Cash Flow'
+            WHERE {conditions}
+        """, values, as_dict=True)
+
+    def evaluate(self, forecasts: List[Dict]) -> List[Dict]:
+        """Apply every rule as a boolean mask over the forecast arrays"""
+        confidence = np.array([flt(f.confidence_score) for f in forecasts])
+        predicted = np.array([flt(f.predicted_amount) for f in forecasts])
+        has_balance = np.array([f.balance is not None for f in forecasts])
+        balance = np.array([flt(f.balance) for f in forecasts])
+
+        low_balance = self.settings["low_balance"]
+        critical_balance = self.settings["critical_balance"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance_pct = np.where(predicted != 0, np.abs(balance - predicted) / np.abs(predicted) * 100, 0)
+
+        rules = [
+            {
+                "mask": (confidence > 0) & (confidence < LOW_CONFIDENCE_THRESHOLD),
+                "alert_type": "Forecast Quality",
+                "title": "Low Confidence Forecast",
+                "priority": "Medium",
+                "message": lambda f, i: f"Forecast {f.name} has low confidence score: {f.confidence_score}%",
+                "recommended_action": "Review forecast parameters and data quality"
+            },
+            {
+                "mask": has_balance & (balance >= 0) & (balance < critical_balance),
+                "alert_type": "Balance Monitoring",
+                "title": "Critical Balance Alert",
+                "priority": "Critical",
+                "threshold_value": critical_balance,
+                "message": lambda f, i: f"Critical low balance: ₹{balance[i]:,.2f} (threshold: ₹{critical_balance:,.2f})",
+                "recommended_action": "Review cash flow and take appropriate action"
+            },
+            {
+                "mask": has_balance & (balance >= critical_balance) & (balance < low_balance),
+                "alert_type": "Balance Monitoring",
+                "title": "Warning Balance Alert",
+                "priority": "High",
+                "threshold_value": low_balance,
+                "message": lambda f, i: f"Low balance warning: ₹{balance[i]:,.2f} (threshold: ₹{low_balance:,.2f})",
+                "recommended_action": "Monitor situation"
+            },
+            {
+                "mask": has_balance & (balance < 0),
+                "alert_type": "Balance Monitoring",
+                "title": "Negative Balance Alert",
+                "priority": "Critical",
+                "threshold_value": 0,
+                "message": lambda f, i: f"Negative balance detected: ₹{balance[i]:,.2f}",
+                "recommended_action": "Review cash flow and take appropriate action"
+            },
+            {
+                "mask": has_balance & (predicted != 0) & (variance_pct > VARIANCE_BAND_PCT),
+                "alert_type": "Balance Monitoring",
+                "title": "Balance Variance Alert",
+                "priority": "Medium",
+                "threshold_value": None,
+                "message": lambda f, i: (
+                    f"Large variance from prediction: Current=₹{balance[i]:,.2f}, "
+                    f"Predicted=₹{predicted[i]:,.2f} ({variance_pct[i]:.1f}% difference)"
+                ),
+                "recommended_action": "Monitor situation"
+            }
+        ]
+
+        candidates = []
+        for rule in rules:
+            for i in np.flatnonzero(rule["mask"]):
+                forecast = forecasts[i]
+                threshold_value = rule.get("threshold_value")
+                actual_value = float(balance[i]) if has_balance[i] else None
+
+                variance_percentage = None
+                if threshold_value and actual_value is not None:
+                    variance_percentage = abs(actual_value - threshold_value) / abs(threshold_value) * 100
+
+                candidates.append({
+                    "company": forecast.company,
+                    "alert_type": rule["alert_type"],
+                    "alert_title": rule["title"],
+                    "alert_message": rule["message"](forecast, i),
+                    "priority": rule["priority"],
+                    "threshold_value": threshold_value,
+                    "actual_value": actual_value,
+                    "variance_percentage": variance_percentage,
+                    "related_forecast": forecast.name,
+                    "forecast_type": forecast.forecast_type,
+                    "confidence_level": forecast.confidence_score,
+                    "recommended_action": rule["recommended_action"]
+                })
+
+        return candidates
+
+    def _exclude_open_alerts(self, candidates: List[Dict]) -> List[Dict]:
+        """Anti-join candidates against alerts that are still open"""
+        if not candidates:
+            return []
+
+        open_keys = {
+            (row.related_forecast, row.alert_type, row.alert_title)
+            for row in frappe.db.sql("""
+                SELECT related_forecast, alert_type, alert_title
+                FROM `tabAI Financial Alert`
+                WHERE status IN %(statuses)s
+                AND related_forecast IS NOT NULL
+            """, {"statuses": OPEN_ALERT_STATUSES}, as_dict=True)
+        }
+
+        return [
+            alert for alert in candidates
+            if (alert["related_forecast"], alert["alert_type"], alert["alert_title"]) not in open_keys
+        ]
+
+    def _bulk_insert_alerts(self, alerts: List[Dict]) -> int:
+        """Insert new alert rows in chunks without per-document save hooks"""
+        if not alerts:
+            return 0
+
+        timestamp = now()
+        user = frappe.session.user
+        fields = [
+            "name", "creation", "modified", "owner", "modified_by", "docstatus",
+            "alert_date", "status"
+        ] + list(alerts[0].keys())
+
+        # One series update reserves the names of the whole batch
+        start = reserve_series(ALERT_SERIES_KEY, len(alerts))
+        values = []
+        for serial, alert in enumerate(alerts, start + 1):
+            values.append(
+                [f"{ALERT_NAME_PREFIX}{serial:0{ALERT_SERIES_DIGITS}d}", timestamp, timestamp, user, user, 0,
+                 timestamp, "Open"]
+                + [alert[field] for field in fields[8:]]
+            )
+
+        frappe.db.bulk_insert("AI Financial Alert", fields, values, chunk_size=1000)
+        frappe.db.commit()
+
+        return len(values)
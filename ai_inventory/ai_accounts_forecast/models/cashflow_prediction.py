@@ -9,6 +9,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+from ai_inventory.lead_time_metrics import get_lead_time_days
 
 class CashFlowPredictor:
     """
@@ -186,8 +187,8 @@ class CashFlowPredictor:
         if not supplier:
             return 14  # Default 2 weeks
             
-        supplier_doc = frappe.get_doc("Supplier", supplier)
-        return getattr(supplier_doc, 'lead_time_days', 14)
+        # Observed lead times are loaded once per request for the whole company
+        return get_lead_time_days(self.company, supplier=supplier, batch=True)
     
     def get_customer_payment_pattern(self, customer):
         """Analyze customer payment patterns"""
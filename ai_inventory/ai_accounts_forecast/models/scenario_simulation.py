@@ -0,0 +1,231 @@
+"""
+Cash Flow Scenario Simulation
+Monte Carlo simulation of monthly revenue and expense paths from AI Financial Forecasts
+"""
+
+import frappe
+from frappe.utils import add_months, flt, get_first_day, get_last_day, getdate, nowdate
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional
+
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 100000
+MAX_HORIZON_MONTHS = 36
+PERCENTILES = [5, 25, 50, 75, 95]
+BOUND_Z_SCORE = 1.96  # upper/lower bounds are treated as a 95% interval
+DEFAULT_RELATIVE_SPREAD = 0.15  # used when a forecast has no usable bounds
+MIN_RESIDUALS = 8
+MAX_BIAS = 0.5
+SIMULATION_CACHE_TTL = 3600
+
+
+class CashflowScenarioSimulator:
+    """Simulate cash balance paths as (simulations x months) arrays"""
+
+    def __init__(self, company: str = None, months_ahead: int = 12,
+                 n_simulations: int = DEFAULT_SIMULATIONS, opening_balance: float = None):
+        self.company = company
+        self.months_ahead = max(1, min(int(months_ahead or 12), MAX_HORIZON_MONTHS))
+        self.n_simulations = max(100, min(int(n_simulations or DEFAULT_SIMULATIONS), MAX_SIMULATIONS))
+        self.opening_balance = opening_balance
+
+        start = get_first_day(nowdate())
+        self.month_starts = [getdate(add_months(start, offset)) for offset in range(self.months_ahead)]
+        self.horizon_end = getdate(get_last_day(self.month_starts[-1]))
+
+    def run(self, use_cache: bool = True) -> Dict:
+        """Return cached results for the current forecast version, simulating on a miss"""
+        if self.opening_balance is None:
+            self.opening_balance = self._get_opening_balance()
+
+        cache_key = self.get_cache_key()
+        if use_cache:
+            cached = frappe.cache().get_value(cache_key)
+            if cached:
+                return cached
+
+        result = self.simulate()
+        frappe.cache().set_value(cache_key, result, expires_in_sec=SIMULATION_CACHE_TTL)
+
+        return result
+
+    def get_cache_key(self) -> str:
+        """Key on company, horizon and a fingerprint of the forecasts feeding the simulation"""
+        version = frappe.db.sql(f"""
+            SELECT COUNT(*), MAX(modified), SUM(forecast_version)
+            FROM `tabAI Financial Forecast`
+            WHERE {self._forecast_conditions()}
+        """, self._forecast_values())[0]
+
+        fingerprint = hashlib.md5(
+            f"{version}|{flt(self.opening_balance, 2)}|{self.n_simulations}".encode()
+        ).hexdigest()[:12]
+
+        return f"cashflow_simulation_{self.company or 'all'}_{self.months_ahead}_{fingerprint}"
+
+    def simulate(self) -> Dict:
+        """Sample revenue and expense paths and summarise the resulting balances"""
+        revenue_mean, revenue_sigma = self._monthly_distribution("Revenue")
+        expense_mean, expense_sigma = self._monthly_distribution("Expense")
+
+        # Seed from the inputs so the same forecasts always give the same bands
+        seed = int(hashlib.md5(f"{self.company}|{self.months_ahead}|{revenue_mean.sum()}|{expense_mean.sum()}".encode()).hexdigest()[:8], 16)
+        rng = np.random.default_rng(seed)
+
+        shape = (self.n_simulations, self.months_ahead)
+        revenue = self._sample_paths(rng, "Revenue", revenue_mean, revenue_sigma, shape)
+        expenses = self._sample_paths(rng, "Expense", expense_mean, expense_sigma, shape)
+
+        net_cashflow = revenue - expenses
+        balances = self.opening_balance + np.cumsum(net_cashflow, axis=1)
+
+        balance_bands = np.percentile(balances, PERCENTILES, axis=0)
+        net_bands = np.percentile(net_cashflow, PERCENTILES, axis=0)
+        total_net_bands = np.percentile(net_cashflow.sum(axis=1), PERCENTILES)
+
+        # First month each path goes negative, -1 when it never does
+        negative = balances < 0
+        breached = negative.any(axis=1)
+        first_breach = np.where(breached, negative.argmax(axis=1), -1)
+        breach_months = first_breach[breached]
+
+        months = [month.strftime("%Y-%m") for month in self.month_starts]
+
+        return {
+            "company": self.company or "All Companies",
+            "months_ahead": self.months_ahead,
+            "simulations": self.n_simulations,
+            "opening_balance": flt(self.opening_balance, 2),
+            "percentiles": PERCENTILES,
+            "monthly": [
+                {
+                    "month": months[i],
+                    "expected_revenue": flt(revenue_mean[i], 2),
+                    "expected_expenses": flt(expense_mean[i], 2),
+                    "net_cashflow_bands": {f"p{p}": flt(net_bands[j, i], 2) for j, p in enumerate(PERCENTILES)},
+                    "balance_bands": {f"p{p}": flt(balance_bands[j, i], 2) for j, p in enumerate(PERCENTILES)},
+                    "probability_negative": flt(negative[:, i].mean() * 100, 2),
+                    "cumulative_breach_probability": flt((first_breach[breached] <= i).sum() / self.n_simulations * 100, 2)
+                }
+                for i in range(self.months_ahead)
+            ],
+            "total_net_cashflow": {f"p{p}": flt(total_net_bands[j], 2) for j, p in enumerate(PERCENTILES)},
+            "probability_negative_balance": flt(breached.mean() * 100, 2),
+            "probability_negative_at_end": flt(negative[:, -1].mean() * 100, 2),
+            "time_to_breach": {
+                "median_months": flt(np.median(breach_months) + 1, 1) if breach_months.size else None,
+                "earliest_month": months[int(breach_months.min())] if breach_months.size else None
+            },
+            "generated_at": frappe.utils.now()
+        }
+
+    def _monthly_distribution(self, forecast_type: str):
+        """Expected amount and standard deviation per month for one forecast type"""
+        forecasts = frappe.db.sql(f"""
+            SELECT forecast_start_date, forecast_end_date, predicted_amount, upper_bound, lower_bound
+            FROM `tabAI Financial Forecast`
+            WHERE {self._forecast_conditions()}
+            AND forecast_type = %s
+        """, self._forecast_values() + [forecast_type], as_dict=True)
+
+        mean = np.zeros(self.months_ahead)
+        variance = np.zeros(self.months_ahead)
+        if not forecasts:
+            return mean, np.sqrt(variance)
+
+        month_starts = np.array(self.month_starts, dtype="datetime64[D]")
+        month_ends = np.array([get_last_day(month) for month in self.month_starts], dtype="datetime64[D]")
+        starts = np.array([f.forecast_start_date for f in forecasts], dtype="datetime64[D]")
+        ends = np.array([f.forecast_end_date or f.forecast_start_date for f in forecasts], dtype="datetime64[D]")
+
+        predicted = np.abs(np.array([flt(f.predicted_amount) for f in forecasts]))
+        upper = np.array([flt(f.upper_bound) for f in forecasts])
+        lower = np.array([flt(f.lower_bound) for f in forecasts])
+
+        # Forecast amounts are monthly figures applied to every month they overlap
+        has_bounds = upper > lower
+        sigma = np.where(has_bounds, (upper - lower) / (2 * BOUND_Z_SCORE), predicted * DEFAULT_RELATIVE_SPREAD)
+
+        overlaps = (starts[:, None] <= month_ends[None, :]) & (ends[:, None] >= month_starts[None, :])
+        mean = predicted @ overlaps
+        variance = (sigma ** 2) @ overlaps
+
+        return mean, np.sqrt(variance)
+
+    def _sample_paths(self, rng, forecast_type: str, mean: np.ndarray, sigma: np.ndarray, shape) -> np.ndarray:
+        """Draw shocks from historical residuals when there are enough, otherwise from a normal"""
+        residuals = self._get_relative_residuals(forecast_type)
+
+        if residuals.size >= MIN_RESIDUALS and residuals.std() > 0:
+            # Keep the residuals' shape and bias, scale their spread to the forecast bounds
+            bias = float(np.clip(residuals.mean(), -MAX_BIAS, MAX_BIAS))
+            standardized = (residuals - residuals.mean()) / residuals.std()
+            shocks = rng.choice(standardized, size=shape, replace=True)
+            paths = mean * (1 + bias) + sigma * shocks
+        else:
+            paths = mean + sigma * rng.standard_normal(shape)
+
+        return np.maximum(paths, 0)
+
+    def _get_relative_residuals(self, forecast_type: str) -> np.ndarray:
+        """Historical (actual - predicted) / predicted for a forecast type"""
+        conditions = "forecast_type = %s AND predicted_value != 0 AND actual_value IS NOT NULL"
+        values = [forecast_type]
+        if self.company:
+            conditions += " AND company = %s"
+            values.append(self.company)
+
+        rows = frappe.db.sql(f"""
+            SELECT (actual_value - predicted_value) / ABS(predicted_value)
+            FROM `tabAI Forecast Accuracy`
+            WHERE {conditions}
+            ORDER BY measurement_date DESC
+            LIMIT 500
+        """, values)
+
+        return np.array([flt(row[0]) for row in rows])
+
+    def _get_opening_balance(self) -> float:
+        """Current balance across Bank and Cash accounts"""
+        conditions = "acc.account_type IN ('Bank', 'Cash') AND acc.is_group = 0"
+        values = [nowdate()]
+        if self.company:
+            conditions += " AND acc.company = %s"
+            values.append(self.company)
+
+        return flt(frappe.db.sql(f"""
+            SELECT SUM(gl.debit) - SUM(gl.credit)
+            FROM `tabGL Entry` gl
+            INNER JOIN `tabAccount` acc ON acc.name = gl.account
+            WHERE gl.is_cancelled = 0
+            AND gl.posting_date <= %s
+            AND {conditions}
+        """, values)[0][0])
+
+    def _forecast_conditions(self) -> str:
+        conditions = """docstatus != 2
+            AND forecast_type IN ('Revenue', 'Expense')
+            AND forecast_start_date <= %s
+            AND IFNULL(forecast_end_date, forecast_start_date) >= %s"""
+        if self.company:
+            conditions += " AND company = %s"
+        return conditions
+
+    def _forecast_values(self) -> List:
+        values = [self.horizon_end, self.month_starts[0]]
+        if self.company:
+            values.append(self.company)
+        return values
+
+
+def run_cashflow_simulation(company: str = None, months_ahead: int = 12,
+                            n_simulations: int = DEFAULT_SIMULATIONS,
+                            opening_balance: Optional[float] = None) -> Dict:
+    """Run (or read from cache) the Monte Carlo cash flow simulation"""
+    try:
+        simulator = CashflowScenarioSimulator(company, months_ahead, n_simulations, opening_balance)
+        return {"success": True, "data": simulator.run()}
+    except Exception as e:
+        frappe.log_error(f"Cash flow simulation error: {str(e)}", "Cash Flow Simulation")
+        return {"success": False, "error": str(e)}
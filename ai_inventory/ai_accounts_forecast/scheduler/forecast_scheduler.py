@@ -380,64 +380,38 @@ def monthly_cleanup():
         frappe.log_error(error_msg, "AI Forecast Monthly Cleanup")
 
 def cleanup_old_forecasts(days_old: int = 180) -> int:
-    """Remove forecasts older than specified days"""
+    """Archive forecasts older than specified days"""
     
     try:
-        cutoff_date = add_days(nowdate(), -days_old)
+        from ai_inventory.archive import archive_doctype
         
-        old_forecasts = frappe.get_all('AI Financial Forecast',
-                                     filters={'creation': ['<', cutoff_date]},
-                                     pluck='name')
-        
-        deleted_count = 0
-        for forecast_name in old_forecasts:
-            try:
-                frappe.delete_doc('AI Financial Forecast', forecast_name, ignore_permissions=True)
-                deleted_count += 1
-            except:
-                continue
-        
-        if deleted_count > 0:
-            frappe.db.commit()
-        
-        return deleted_count
+        return archive_doctype('AI Financial Forecast', retention_days=days_old)
         
     except Exception as e:
         frappe.log_error(f"Cleanup old forecasts failed: {str(e)}", "AI Forecast Cleanup")
         return 0
 
 def cleanup_duplicate_forecasts() -> int:
-    """Remove duplicate forecasts keeping the most recent"""
+    """Archive duplicate forecasts keeping the most recent"""
     
     try:
-        # Find duplicates
-        duplicates = frappe.db.sql("""
-            SELECT company, account, forecast_type, 
-                   GROUP_CONCAT(name ORDER BY creation DESC) as forecast_names,
-                   COUNT(*) as count
-            FROM `tabAI Financial Forecast`
-            GROUP BY company, account, forecast_type
-            HAVING COUNT(*) > 1
-        """, as_dict=True)
-        
-        deleted_count = 0
-        
-        for dup in duplicates:
-            forecast_names = dup.forecast_names.split(',')
-            # Keep the first (most recent), delete the rest
-            to_delete = forecast_names[1:]
-            
-            for forecast_name in to_delete:
-                try:
-                    frappe.delete_doc('AI Financial Forecast', forecast_name, ignore_permissions=True)
-                    deleted_count += 1
-                except:
-                    continue
-        
-        if deleted_count > 0:
-            frappe.db.commit()
+        from ai_inventory.archive import archive_doctype
+        
+        # Rank forecasts per key, newest first
+        to_archive = frappe.db.sql_list("""
+            SELECT name FROM (
+                SELECT name,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY company, account, forecast_type
+                           ORDER BY creation DESC
+                       ) AS recency
+                FROM `tabAI Financial Forecast`
+            ) ranked
+            WHERE recency > 1
+        """)
         
-        return deleted_count
+        # Chunked, name ordered deletes instead of one delete_doc per forecast
+        return archive_doctype('AI Financial Forecast', names=to_archive)
         
     except Exception as e:
         frappe.log_error(f"Cleanup duplicates failed: {str(e)}", "AI Forecast Cleanup")
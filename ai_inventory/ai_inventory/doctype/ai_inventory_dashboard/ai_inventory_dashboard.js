@@ -316,7 +316,7 @@ function bulk_create_for_items_with_stock(frm) {
             callback: function(r) {
                 if (r.message) {
                     frappe.msgprint({
-                        title: __('Selective Creation Complete'),
+                        title: __('Selective Creation Queued'),
                         message: r.message.message,
                         indicator: r.message.status === 'success' ? 'green' : 'red'
                     });
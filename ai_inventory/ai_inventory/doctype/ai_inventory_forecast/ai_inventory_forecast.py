@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import time
 import threading
+from ai_inventory.instrumentation import instrument
+from ai_inventory.stock_alerts import clear_threshold_cache
+from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import apply_named_forecasts_impact
 
 # Safe imports for ML packages - only import when actually needed
 def safe_import_ml_packages():
@@ -105,7 +108,7 @@ class AIInventoryForecast(Document):
             
         try:
             current_stock = frappe.db.sql("""
-                SELECT b.actual_qty 
+                SELECT b.actual_qty, b.valuation_rate
                 FROM `tabBin` b
                 INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
                 WHERE b.item_code = %s 
@@ -115,6 +118,12 @@ class AIInventoryForecast(Document):
             
             self.current_stock = flt(current_stock[0][0]) if current_stock else 0.0
             
+            # Valuation rate feeds the company inventory impact aggregate
+            if current_stock and flt(current_stock[0][1]):
+                self.valuation_rate = flt(current_stock[0][1])
+            else:
+                self.valuation_rate = flt(frappe.db.get_value("Item", self.item_code, "valuation_rate"))
+            
             # Get last purchase date for this company
             last_purchase = frappe.db.sql("""
                 SELECT sle.posting_date 
@@ -161,20 +170,15 @@ class AIInventoryForecast(Document):
     def set_basic_supplier(self):
         """Basic supplier setting without ML"""
         try:
+            from ai_inventory.supplier_ranking import get_ranked_suppliers, get_most_recent_supplier
+            
             # Get most recent supplier for this item
-            recent_supplier = frappe.db.sql("""
-                SELECT poi.supplier 
-                FROM `tabPurchase Order Item` poi
-                INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-                WHERE poi.item_code = %s 
-                AND po.company = %s
-                AND po.docstatus = 1
-                ORDER BY po.transaction_date DESC 
-                LIMIT 1
-            """, (self.item_code, self.company))
+            recent_supplier = get_most_recent_supplier(
+                get_ranked_suppliers([self.item_code], self.company).get(self.item_code)
+            )
             
             if recent_supplier:
-                supplier = recent_supplier[0][0]
+                supplier = recent_supplier.supplier
                 if hasattr(self, 'preferred_supplier'):
                     self.preferred_supplier = supplier
                 if not self.supplier:
@@ -210,6 +214,7 @@ class AIInventoryForecast(Document):
             frappe.log_error(f"Auto PO queue failed: {str(e)}")
 
     @frappe.whitelist()
+    @instrument("forecast.inventory.run_ai_forecast")
     def run_ai_forecast(self):
         """Main AI forecasting function with company-specific data and concurrency protection"""
         try:
@@ -287,6 +292,16 @@ class AIInventoryForecast(Document):
             frappe.log_error(f"Historical data query failed: {str(e)}")
             return []
 
+    def get_planning_lead_time(self):
+        """Observed lead time for this item or its supplier, else the configured one"""
+        from ai_inventory.lead_time_metrics import get_lead_time_days
+        
+        try:
+            return get_lead_time_days(self.company, self.item_code, self.supplier,
+                default=self.lead_time_days or 14)
+        except Exception:
+            return self.lead_time_days or 14
+
     def set_no_data_defaults(self):
         """Set default values when no data is available"""
         self.predicted_consumption = 0
@@ -368,7 +383,7 @@ class AIInventoryForecast(Document):
                     movement_type = "Non Moving"
                 
                 # Calculate reorder parameters
-                lead_time = self.lead_time_days or 14
+                lead_time = self.get_planning_lead_time()
                 safety_factor = 1.5 if movement_type == "Fast Moving" else 1.2
                 reorder_level = (daily_avg * lead_time) * safety_factor
                 suggested_qty = max(1, int(daily_avg * (future_days + lead_time)))
@@ -479,7 +494,7 @@ class AIInventoryForecast(Document):
                 confidence_score = 40
             
             # Calculate reorder parameters
-            lead_time = self.lead_time_days or 14
+            lead_time = self.get_planning_lead_time()
             safety_stock_multiplier = 1.5 if movement_type == "Fast Moving" else 1.2
             reorder_level = (daily_consumption * lead_time) * safety_stock_multiplier
             
@@ -573,6 +588,8 @@ class AIInventoryForecast(Document):
     def update_forecast_fields_safe(self, forecast_result):
         """Thread-safe update of forecast fields"""
         try:
+            # The raw UPDATE skips on_update, so move the inventory impact here
+            apply_named_forecasts_impact([self.name], sign=-1)
             frappe.db.sql("""
                 UPDATE `tabAI Inventory Forecast`
                 SET 
@@ -598,7 +615,11 @@ class AIInventoryForecast(Document):
                 now(),
                 self.name
             ))
+            apply_named_forecasts_impact([self.name])
             frappe.db.commit()
+            
+            # and drop the cached alert threshold
+            clear_threshold_cache(self)
         except Exception as e:
             frappe.log_error(f"Forecast field update failed: {str(e)}")
 
@@ -735,6 +756,10 @@ class AIInventoryForecast(Document):
             return {"status": "error", "message": error_msg}
 
 
+def on_doctype_update():
+    frappe.db.add_index("AI Inventory Forecast", ["company", "abc_class", "xyz_class"])
+
+
 # Background job functions to handle async operations
 @frappe.whitelist()
 def run_forecast_background(forecast_name):
@@ -783,6 +808,7 @@ def create_auto_po_background(forecast_name):
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument("sync.ai_forecasts_now")
 def sync_ai_forecasts_now(company=None):
     """Sync AI forecasts immediately with company filter"""
     try:
@@ -1275,7 +1301,7 @@ def bulk_create_purchase_orders():
             WHERE reorder_alert = 1
             AND suggested_qty > 0
             AND (supplier IS NOT NULL OR preferred_supplier IS NOT NULL)
-            ORDER BY company, supplier
+            ORDER BY CASE abc_class WHEN 'A' THEN 1 WHEN 'B' THEN 2 ELSE 3 END, company, supplier
             LIMIT 100
         """, as_dict=True)
         
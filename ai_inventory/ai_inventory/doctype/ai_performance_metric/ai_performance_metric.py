@@ -0,0 +1,13 @@
+# Copyright (c) 2025, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AIPerformanceMetric(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("AI Performance Metric", ["operation", "period_start"])
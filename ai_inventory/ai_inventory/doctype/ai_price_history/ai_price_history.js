@@ -0,0 +1,8 @@
+// Copyright (c) 2025, sammish and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("AI Price History", {
+// 	refresh(frm) {
+
+// 	},
+// });
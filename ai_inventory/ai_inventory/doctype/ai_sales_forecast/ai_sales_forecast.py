@@ -12,32 +12,25 @@ import time
 import uuid
 warnings.filterwarnings('ignore')
 
-# Try to import ML libraries with fallback
-try:
-    import pandas as pd
-    import numpy as np
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    frappe.log_error("pandas/numpy not available. Using fallback methods.", "AI Sales Forecasting")
+import os
+from ai_inventory.lazy_imports import is_available, lazy_from, lazy_import
+from ai_inventory.instrumentation import instrument
+from ai_inventory.event_log import log_event
 
-try:
-    import joblib
-    import os
-    JOBLIB_AVAILABLE = True
-except ImportError:
-    JOBLIB_AVAILABLE = False
+# ML libraries are imported on first use; availability is checked without importing them
+PANDAS_AVAILABLE = is_available("pandas") and is_available("numpy")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
-# Try to import sklearn with fallback
-try:
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.linear_model import LinearRegression
-    from sklearn.preprocessing import LabelEncoder
-    from sklearn.metrics import mean_absolute_error, mean_squared_error
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    frappe.log_error("scikit-learn not available. Using simple forecasting.", "AI Sales Forecasting")
+JOBLIB_AVAILABLE = is_available("joblib")
+joblib = lazy_import("joblib")
+
+SKLEARN_AVAILABLE = is_available("sklearn")
+RandomForestRegressor = lazy_from("sklearn.ensemble", "RandomForestRegressor")
+LinearRegression = lazy_from("sklearn.linear_model", "LinearRegression")
+LabelEncoder = lazy_from("sklearn.preprocessing", "LabelEncoder")
+mean_absolute_error = lazy_from("sklearn.metrics", "mean_absolute_error")
+mean_squared_error = lazy_from("sklearn.metrics", "mean_squared_error")
 
 # ============== UTILITY FUNCTIONS ==============
 
@@ -316,7 +309,7 @@ class SalesForecastingEngine:
             ORDER BY so.transaction_date
         """, (start_date,), as_dict=True)
         
-        frappe.log_error(f"Extracted {len(sales_data)} sales records and {len(order_data)} order records", "AI Sales Forecasting")
+        log_event("sales_forecast.extract", sales_records=len(sales_data), order_records=len(order_data))
         return sales_data, order_data
     
     def prepare_features(self, data):
@@ -415,7 +408,7 @@ class SalesForecastingEngine:
         if not SKLEARN_AVAILABLE:
             return {"error": "scikit-learn not available. Using simple forecasting instead."}
             
-        frappe.log_error("Starting model training", "AI Sales Forecasting")
+        log_event("sales_forecast.training_started")
         
         # Extract data
         sales_data, order_data = self.extract_historical_data()
@@ -512,7 +505,7 @@ class SalesForecastingEngine:
         # Update dashboard with training results
         self._update_training_stats(model_performance)
         
-        frappe.log_error(f"Training completed for {len(model_performance)} items", "AI Sales Forecasting")
+        log_event("sales_forecast.training_completed", items=len(model_performance))
         return model_performance
     
     def load_models(self):
@@ -642,7 +635,7 @@ class SalesForecastingEngine:
     
     def _generate_simple_forecasts(self, forecast_days):
         """Generate simple forecasts when ML models are not available"""
-        frappe.log_error("Generating simple forecasts (ML models not available)", "AI Sales Forecasting")
+        log_event("sales_forecast.simple_forecasts", "ML models not available")
         
         import random
         
@@ -1565,8 +1558,7 @@ def scheduled_forecast_generation():
         if config.auto_submit_sales_orders:
             auto_create_sales_orders()
         
-        frappe.log_error(f"Scheduled forecast generation completed: {forecasts_created} forecasts", 
-                        "AI Sales Forecasting")
+        log_event("sales_forecast.scheduled_generation", forecasts_created=forecasts_created)
         
     except Exception as e:
         frappe.log_error(f"Scheduled forecast generation failed: {str(e)}", 
@@ -1590,8 +1582,8 @@ def scheduled_model_training():
             engine = SalesForecastingEngine()
             performance = engine.train_models()
             
-            frappe.log_error(f"Scheduled model training completed for {len(performance) if isinstance(performance, dict) else 0} items", 
-                            "AI Sales Forecasting")
+            log_event("sales_forecast.scheduled_training",
+                      items=len(performance) if isinstance(performance, dict) else 0)
         
     except Exception as e:
         frappe.log_error(f"Scheduled model training failed: {str(e)}", 
@@ -2039,6 +2031,7 @@ def bulk_create_sales_forecasts(company=None, customer=None, territory=None, day
         }
 
 @frappe.whitelist()
+@instrument("sync.ai_sales_forecasts_now")
 def sync_ai_sales_forecasts_now(company=None):
     """Manual sync function for AI Sales Forecasts - Robust version"""
     try:
@@ -2772,6 +2765,7 @@ def get_sales_setup_status():
 # ============== DOCTYPE CLASS ==============
 
 class AISalesForecast(Document):
+    @instrument("forecast.sales.run_ai_forecast")
     def run_ai_forecast(self):
         """Run AI forecast for this specific record with concurrency protection"""
         try:
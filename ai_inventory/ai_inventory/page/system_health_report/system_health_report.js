@@ -470,6 +470,7 @@ class SystemHealthReport {
                                     ${api_performance.api_status}
                                 </span>
                             </p>
+                            <p><strong>Avg Response:</strong> ${api_performance.avg_response_time || 'No data'}</p>
                         </div>
                     </div>
                 </div>
@@ -500,9 +501,50 @@ class SystemHealthReport {
                     </div>
                 </div>
             </div>
+            ${this.render_operation_timings(api_performance.operations || [])}
         `);
     }
 
+    render_operation_timings(operations) {
+        if (!operations.length) {
+            return '';
+        }
+
+        const rows = operations.map(op => `
+            <tr>
+                <td>${frappe.utils.escape_html(op.operation)}</td>
+                <td class="text-right">${op.call_count}</td>
+                <td class="text-right">${flt(op.mean_ms, 1)}</td>
+                <td class="text-right">${flt(op.p95_ms, 1)}</td>
+                <td class="text-right">${flt(op.queries_per_call, 1)}</td>
+                <td class="text-right">${op.rows_written}</td>
+                <td class="text-right">${op.error_count}</td>
+            </tr>
+        `).join('');
+
+        return `
+            <div class="card mt-3">
+                <div class="card-body">
+                    <h5>Where Time Goes (last 24 hours)</h5>
+                    <table class="table table-sm">
+                        <thead>
+                            <tr>
+                                <th>Operation</th>
+                                <th class="text-right">Calls</th>
+                                <th class="text-right">Mean ms</th>
+                                <th class="text-right">P95 ms</th>
+                                <th class="text-right">Queries / Call</th>
+                                <th class="text-right">Rows Written</th>
+                                <th class="text-right">Errors</th>
+                            </tr>
+                        </thead>
+                        <tbody>${rows}</tbody>
+                    </table>
+                </div>
+            </div>
+        `;
+    }
+
     render_recommendations(recommendations) {
         const container = this.page.main.find('.recommendations-section');
         
@@ -8,6 +8,8 @@ import json
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
+from ai_inventory.supplier_ranking import get_ranked_suppliers, get_most_recent_supplier
+from ai_inventory.event_log import log_event
 
 # Advanced data science imports with fallbacks
 try:
@@ -26,7 +28,9 @@ except ImportError:
 # Additional imports
 import frappe
 import json
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.ai_consolidated_predictive_insights")
 def execute(filters=None):
     """
     AI-Powered Consolidated Predictive Insights Report
@@ -709,9 +713,9 @@ def calculate_advanced_metrics(row, filters):
         # IMPROVED Stock status determination with better logic
         item_code = str(row.get('item_code', 'N/A'))
         
-        # If this is the specific item WR20065, let's add debug info
-        if item_code == "WR20065":
-            frappe.log_error(f"DEBUG WR20065: current_stock={current_stock}, enhanced_reorder={enhanced_reorder}, predicted_demand={predicted_demand}")
+        # Stock status inputs, written only when ai_inventory_debug_events is enabled
+        log_event("consolidated_insights.stock_status", level="debug", item_code=item_code,
+                  current_stock=current_stock, enhanced_reorder=enhanced_reorder, predicted_demand=predicted_demand)
         
         # Robust stock status calculation
         if current_stock <= 0:
@@ -1966,7 +1970,7 @@ def ensure_default_supplier():
     
     return supplier_name
 
-def get_ai_recommended_supplier(item_code):
+def get_ai_recommended_supplier(item_code, ranked_suppliers=None):
     """Get AI-recommended supplier for an item"""
     try:
         # First check AI Inventory Forecast for preferred supplier
@@ -2003,18 +2007,13 @@ def get_ai_recommended_supplier(item_code):
             }
         
         # Last fallback - most recent supplier for this item
-        recent_supplier = frappe.db.sql("""
-            SELECT poi.supplier
-            FROM `tabPurchase Order Item` poi
-            INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-            WHERE poi.item_code = %s AND po.docstatus = 1
-            ORDER BY po.transaction_date DESC
-            LIMIT 1
-        """, (item_code,), as_dict=True)
+        if ranked_suppliers is None:
+            ranked_suppliers = get_ranked_suppliers([item_code]).get(item_code, [])
+        recent_supplier = get_most_recent_supplier(ranked_suppliers)
         
         if recent_supplier:
             return {
-                'supplier': recent_supplier[0]['supplier'],
+                'supplier': recent_supplier.supplier,
                 'confidence': 50,
                 'source': 'Recent Purchase'
             }
@@ -2034,20 +2033,12 @@ def get_ai_recommended_supplier(item_code):
             'source': 'Error Fallback'
         }
 
-def get_alternative_suppliers(item_code):
+def get_alternative_suppliers(item_code, ranked_suppliers=None):
     """Get alternative suppliers for an item"""
     try:
-        suppliers = frappe.db.sql("""
-            SELECT DISTINCT poi.supplier, COUNT(*) as order_count,
-                   AVG(poi.rate) as avg_rate,
-                   MAX(po.transaction_date) as last_order_date
-            FROM `tabPurchase Order Item` poi
-            INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-            WHERE poi.item_code = %s AND po.docstatus = 1
-            GROUP BY poi.supplier
-            ORDER BY order_count DESC, last_order_date DESC
-            LIMIT 5
-        """, (item_code,), as_dict=True)
+        if ranked_suppliers is None:
+            ranked_suppliers = get_ranked_suppliers([item_code]).get(item_code, [])
+        suppliers = list(ranked_suppliers[:5])
         
         if not suppliers:
             # Get any suppliers from Item Default
@@ -2072,7 +2063,7 @@ def get_alternative_suppliers(item_code):
         frappe.log_error(f"Failed to get alternative suppliers for {item_code}: {str(e)}")
         return []
 
-def get_estimated_item_rate(item_code):
+def get_estimated_item_rate(item_code, ranked_suppliers=None):
     """Get estimated rate for an item from multiple sources"""
     try:
         # First try to get from Item master
@@ -2092,17 +2083,12 @@ def get_estimated_item_rate(item_code):
                 return valuation_rate
         
         # Try to get recent purchase rate
-        recent_rate = frappe.db.sql("""
-            SELECT poi.rate
-            FROM `tabPurchase Order Item` poi
-            INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-            WHERE poi.item_code = %s AND po.docstatus = 1
-            ORDER BY po.transaction_date DESC
-            LIMIT 1
-        """, (item_code,), as_dict=True)
+        if ranked_suppliers is None:
+            ranked_suppliers = get_ranked_suppliers([item_code]).get(item_code, [])
+        recent_supplier = get_most_recent_supplier(ranked_suppliers)
         
-        if recent_rate and recent_rate[0].get('rate'):
-            return flt(recent_rate[0]['rate'])
+        if recent_supplier and recent_supplier.last_rate:
+            return flt(recent_supplier.last_rate)
         
         # Try to get from Price List
         price_list_rate = frappe.db.sql("""
@@ -2268,6 +2254,9 @@ def preview_ai_purchase_order(filters=None):
         preview_items = []
         total_items_analyzed = len(data)
         
+        # One ranking lookup for every item instead of aggregate scans per line
+        ranked_suppliers = get_ranked_suppliers([row.get('item_code') for row in data])
+        
         for row in data:
             current_stock = flt(row.get('current_stock', 0))
             predicted_demand = flt(row.get('predicted_demand', 0))
@@ -2310,11 +2299,13 @@ def preview_ai_purchase_order(filters=None):
                 
                 suggested_qty = max(int(suggested_qty), 1)
                 
+                item_suppliers = ranked_suppliers.get(row.get('item_code'), [])
+                
                 # Get AI-selected supplier or fallback to item default
-                ai_supplier = get_ai_recommended_supplier(row.get('item_code'))
+                ai_supplier = get_ai_recommended_supplier(row.get('item_code'), item_suppliers)
                 
                 # Get estimated rate from multiple sources
-                estimated_rate = get_estimated_item_rate(row.get('item_code'))
+                estimated_rate = get_estimated_item_rate(row.get('item_code'), item_suppliers)
                 
                 preview_items.append({
                     'item_code': row.get('item_code'),
@@ -2329,7 +2320,7 @@ def preview_ai_purchase_order(filters=None):
                     'reorder_reason': " | ".join(reorder_reason),
                     'ai_supplier': ai_supplier.get('supplier'),
                     'supplier_confidence': ai_supplier.get('confidence', 70),
-                    'alternative_suppliers': get_alternative_suppliers(row.get('item_code')),
+                    'alternative_suppliers': get_alternative_suppliers(row.get('item_code'), item_suppliers),
                     'stock_status': determine_stock_status(current_stock, reorder_level, predicted_demand),
                     'days_stock_remaining': calculate_days_stock_remaining(current_stock, predicted_demand)
                 })
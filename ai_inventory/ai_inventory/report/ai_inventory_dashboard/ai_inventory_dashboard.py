@@ -10,7 +10,9 @@ import pandas as pd
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.ai_inventory_dashboard")
 def execute(filters=None):
     columns, data = [], []
     
@@ -196,6 +198,8 @@ def get_enhanced_data(filters):
             aif.last_forecast_date,
             aif.forecast_period_days,
             aif.lead_time_days,
+            aif.abc_class,
+            aif.xyz_class,
             CASE 
                 WHEN aif.predicted_consumption > 0 AND aif.forecast_period_days > 0 
                 THEN ROUND(aif.current_stock / (aif.predicted_consumption / aif.forecast_period_days))
@@ -325,7 +329,7 @@ def apply_data_science_enhancements(data, filters):
         df['risk_score'] = df.apply(lambda row: safe_calculate_risk_score(row), axis=1)
         
         # Get ML price predictions
-        df['predicted_price'] = df.apply(lambda row: safe_get_ml_price_prediction(row), axis=1)
+        df['predicted_price'] = safe_get_ml_price_predictions(df.to_dict('records'))
         
         # Add inventory efficiency metrics
         df = safe_add_inventory_efficiency_metrics(df)
@@ -535,70 +539,37 @@ def calculate_risk_score(row):
         frappe.log_error(f"Risk score calculation error for {row.get('item_code', 'unknown')}: {str(e)}")
         return 50.0  # Default medium risk
 
-def get_ml_price_prediction(row):
-    """Get ML price prediction for the item"""
-    try:
-        item_code = row.get('item_code')
-        preferred_supplier = row.get('preferred_supplier')
-        company = row.get('company')
-        suggested_qty = flt(row.get('suggested_qty', 1))
-        
-        if not preferred_supplier or not item_code:
-            return 0
-        
-        # Try to import ML supplier analyzer
-        try:
-            from ai_inventory.ml_supplier_analyzer import MLSupplierAnalyzer
-            analyzer = MLSupplierAnalyzer()
-            
-            price_result = analyzer.predict_item_price(
-                item_code, preferred_supplier, company, suggested_qty
-            )
-            
-            if price_result.get('status') == 'success':
-                return flt(price_result.get('predicted_price', 0))
-        except ImportError:
-            pass
-        except Exception as e:
-            frappe.log_error(f"ML analyzer failed for {item_code}: {str(e)}")
-        
-        # Fallback: Get last purchase price
-        last_price = frappe.db.sql("""
-            SELECT poi.rate
-            FROM `tabPurchase Order Item` poi
-            INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-            WHERE poi.item_code = %s 
-            AND po.supplier = %s
-            AND po.company = %s
-            AND po.docstatus = 1
-            ORDER BY po.transaction_date DESC
-            LIMIT 1
-        """, (item_code, preferred_supplier, company))
-        
-        return flt(last_price[0][0]) if last_price else 0
-        
-    except Exception as e:
-        frappe.log_error(f"Price prediction error for {row.get('item_code', 'unknown')}: {str(e)}")
-        return 0
+def get_ml_price_predictions(rows):
+    """Get ML price predictions for all rows in one batch"""
+    from ai_inventory.price_prediction import predict_prices
+    
+    lines = []
+    positions = []
+    for position, row in enumerate(rows):
+        if row.get('preferred_supplier') and row.get('item_code'):
+            positions.append(position)
+            lines.append({
+                "item_code": row.get('item_code'),
+                "supplier": row.get('preferred_supplier'),
+                "company": row.get('company'),
+                "qty": flt(row.get('suggested_qty', 1))
+            })
+    
+    prices = [0] * len(rows)
+    for position, prediction in zip(positions, predict_prices(lines)):
+        prices[position] = flt(prediction.get('predicted_price', 0))
+    
+    return prices
 
 def add_inventory_efficiency_metrics(df):
     """Add inventory efficiency and performance metrics"""
     try:
-        # Calculate ABC classification based on consumption value
+        # ABC class is classified company-wide and stored on the forecast nightly
         if len(df) > 0:
             df['consumption_value'] = df['predicted_consumption'] * df['predicted_price']
-            df = df.sort_values('consumption_value', ascending=False)
-            
-            total_items = len(df)
-            df['abc_class'] = 'C'  # Default
-            
-            # A class - top 20% by value (80% of consumption)
-            a_cutoff = int(total_items * 0.2)
-            df.iloc[:a_cutoff, df.columns.get_loc('abc_class')] = 'A'
-            
-            # B class - next 30% by value (15% of consumption)
-            b_cutoff = int(total_items * 0.5)
-            df.iloc[a_cutoff:b_cutoff, df.columns.get_loc('abc_class')] = 'B'
+            if 'abc_class' not in df.columns:
+                df['abc_class'] = 'C'
+            df['abc_class'] = df['abc_class'].fillna('').map(lambda abc_class: abc_class or 'C')
         
         # Calculate inventory turns
         df['inventory_turns'] = df.apply(lambda row: 
@@ -705,13 +676,13 @@ def safe_calculate_risk_score(row):
         frappe.log_error(f"Risk score calculation failed for {row.get('item_code', 'unknown')}: {str(e)}")
         return 50.0
 
-def safe_get_ml_price_prediction(row):
-    """Safe wrapper for ML price prediction"""
+def safe_get_ml_price_predictions(rows):
+    """Safe wrapper for batch ML price prediction"""
     try:
-        return get_ml_price_prediction(row)
+        return get_ml_price_predictions(rows)
     except Exception as e:
-        frappe.log_error(f"Price prediction failed for {row.get('item_code', 'unknown')}: {str(e)}")
-        return 0
+        frappe.log_error(f"Batch price prediction failed: {str(e)}")
+        return [0] * len(rows)
 
 def safe_add_inventory_efficiency_metrics(df):
     """Safe wrapper for inventory efficiency metrics"""
@@ -8,6 +8,7 @@ import json
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
+from ai_inventory.instrumentation import instrument
 
 # Safe imports for data science libraries
 try:
@@ -17,6 +18,7 @@ try:
 except ImportError:
     PANDAS_AVAILABLE = False
 
+@instrument("report.ai_sales_dashboard")
 def execute(filters=None):
     """Main execution function for the report"""
     try:
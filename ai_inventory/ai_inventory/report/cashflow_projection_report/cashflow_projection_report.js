@@ -286,6 +286,19 @@ function show_scenario_dialog(scenario_data) {
         `;
     }
     
+    if (scenario_data.simulation) {
+        let sim = scenario_data.simulation;
+        let breach = sim.time_to_breach || {};
+        html += `
+            <div class="scenario-card" style="margin-bottom: 20px; padding: 15px; border: 1px solid #ddd; border-radius: 5px;">
+                <h5 style="color: #6c5ce7;">Monte Carlo Simulation (${sim.simulations} runs)</h5>
+                <p><strong>Net Cash Flow P5 / P50 / P95:</strong> ${format_currency(sim.total_net_cashflow.p5)} / ${format_currency(sim.total_net_cashflow.p50)} / ${format_currency(sim.total_net_cashflow.p95)}</p>
+                <p><strong>Probability of Negative Balance:</strong> ${sim.probability_negative_balance}%</p>
+                <p><strong>Median Time to Breach:</strong> ${breach.median_months ? breach.median_months + ' months' : __('No breach expected')}</p>
+            </div>
+        `;
+    }
+    
     html += '</div>';
     
     dialog.fields_dict.scenario_html.$wrapper.html(html);
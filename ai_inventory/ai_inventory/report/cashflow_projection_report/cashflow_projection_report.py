@@ -2,9 +2,13 @@
 import frappe
 from frappe import _
 import json
+import copy
 from datetime import datetime, timedelta
 import calendar
+from ai_inventory.ai_accounts_forecast.models.scenario_simulation import run_cashflow_simulation
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.cashflow_projection_report")
 def execute(filters=None):
     """
     ERPNext Report Framework entry point
@@ -223,14 +227,20 @@ def generate_cashflow_projection_report(company=None, months_ahead=12, include_s
         # Get current balance
         current_balance = get_current_balance(company)
         
+        # Aggregate forecasts per month once; every section below reuses it
+        projection_base = get_projection_base(company, months_ahead, from_date, to_date)
+        
         # Get monthly projections with date filters
-        monthly_projections = get_monthly_projections(company, months_ahead, from_date, to_date)
+        monthly_projections = get_monthly_projections(company, months_ahead, from_date, to_date,
+                                                      projection_base=projection_base)
         
         # Get cash flow breakdown
-        cashflow_breakdown = get_cashflow_breakdown(company, months_ahead)
+        cashflow_breakdown = get_cashflow_breakdown(company, months_ahead, projection_base=projection_base)
         
         # Get scenario analysis
-        scenarios = get_scenario_analysis(company, months_ahead) if include_scenarios else {}
+        scenarios = get_scenario_analysis(company, months_ahead,
+                                          base_projections=monthly_projections,
+                                          opening_balance=current_balance["total_balance"]) if include_scenarios else {}
         
         # Get risk assessment
         risk_assessment = get_cashflow_risk_assessment(monthly_projections)
@@ -313,10 +323,8 @@ def get_current_balance(company=None):
         "currency": frappe.defaults.get_global_default("currency") or "INR"
     }
 
-def get_monthly_projections(company=None, months_ahead=12, from_date=None, to_date=None):
-    """Get monthly cash flow projections"""
-    
-    projections = []
+def get_projection_months(months_ahead=12, from_date=None, to_date=None):
+    """Build the month spine for the projection horizon"""
     
     # Use from_date if provided, otherwise start from today
     start_date = frappe.utils.getdate(from_date) if from_date else frappe.utils.getdate()
@@ -326,58 +334,99 @@ def get_monthly_projections(company=None, months_ahead=12, from_date=None, to_da
         end_date = frappe.utils.getdate(to_date)
         months_ahead = max(1, frappe.utils.date_diff(end_date, start_date) // 30)
     
-    for month_offset in range(months_ahead):
+    months = []
+    for month_offset in range(int(months_ahead)):
         projection_date = frappe.utils.add_months(start_date, month_offset)
         month_start = frappe.utils.get_first_day(projection_date)
-        month_end = frappe.utils.get_last_day(projection_date)
         
         # Skip if beyond to_date
         if to_date and month_start > frappe.utils.getdate(to_date):
             break
         
-        # Get revenue forecasts for this month
-        revenue_forecast = frappe.db.sql("""
-            SELECT 
-                SUM(predicted_amount) as total_revenue,
-                AVG(confidence_score) as avg_confidence
-            FROM `tabAI Financial Forecast`
-            WHERE forecast_type = 'Revenue'
-            AND forecast_start_date <= %(month_end)s
-            AND forecast_end_date >= %(month_start)s
-            {}
-        """.format("AND company = %(company)s" if company else ""),
-        {"company": company, "month_start": month_start, "month_end": month_end}, as_dict=True)[0]
-        
-        # Get expense forecasts for this month
-        expense_forecast = frappe.db.sql("""
-            SELECT 
-                SUM(predicted_amount) as total_expenses,
-                AVG(confidence_score) as avg_confidence
-            FROM `tabAI Financial Forecast`
-            WHERE forecast_type = 'Expense'
-            AND forecast_start_date <= %(month_end)s
-            AND forecast_end_date >= %(month_start)s
-            {}
-        """.format("AND company = %(company)s" if company else ""),
-        {"company": company, "month_start": month_start, "month_end": month_end}, as_dict=True)[0]
-        
-        # Get cash flow forecasts for this month
-        cashflow_forecast = frappe.db.sql("""
-            SELECT 
-                SUM(predicted_amount) as net_cashflow,
-                AVG(confidence_score) as avg_confidence,
-                COUNT(*) as forecast_count
-            FROM `tabAI Financial Forecast`
-            WHERE forecast_type = 'Cash Flow'
-            AND forecast_start_date <= %(month_end)s
-            AND forecast_end_date >= %(month_start)s
-            {}
-        """.format("AND company = %(company)s" if company else ""),
-        {"company": company, "month_start": month_start, "month_end": month_end}, as_dict=True)[0]
-        
-        total_revenue = revenue_forecast.total_revenue or 0
-        total_expenses = expense_forecast.total_expenses or 0
-        net_cashflow = cashflow_forecast.net_cashflow or (total_revenue - total_expenses)
+        months.append({
+            "projection_date": projection_date,
+            "month_start": month_start,
+            "month_end": frappe.utils.get_last_day(projection_date)
+        })
+    
+    return months
+
+def get_projection_base(company=None, months_ahead=12, from_date=None, to_date=None):
+    """
+    Aggregate Revenue, Expense and Cash Flow forecasts for every month of the
+    horizon in a single query against a generated month spine
+    
+    Rows are grouped by month, forecast type, account type, sign and whether
+    the forecast starts in that month, so projections and the category
+    breakdown can both be derived from the same result set.
+    """
+    months = get_projection_months(months_ahead, from_date, to_date)
+    if not months:
+        return {"months": [], "rows": []}
+    
+    spine_sql = " UNION ALL ".join(
+        ["SELECT %s AS month_start, %s AS month_end"] * len(months)
+    )
+    values = []
+    for month in months:
+        values.extend([month["month_start"], month["month_end"]])
+    
+    company_condition = ""
+    if company:
+        company_condition = "AND f.company = %s"
+        values.append(company)
+    
+    rows = frappe.db.sql(f"""
+        SELECT 
+            m.month_start,
+            f.forecast_type,
+            f.account_type,
+            SIGN(f.predicted_amount) AS amount_sign,
+            f.forecast_start_date >= m.month_start AS starts_in_month,
+            SUM(f.predicted_amount) AS total_amount,
+            SUM(ABS(f.predicted_amount)) AS total_abs_amount,
+            SUM(f.confidence_score) AS confidence_sum,
+            COUNT(f.confidence_score) AS confidence_count,
+            COUNT(*) AS forecast_count
+        FROM ({spine_sql}) m
+        INNER JOIN `tabAI Financial Forecast` f
+            ON f.forecast_start_date <= m.month_end
+            AND f.forecast_end_date >= m.month_start
+        WHERE f.forecast_type IN ('Revenue', 'Expense', 'Cash Flow')
+        {company_condition}
+        GROUP BY m.month_start, f.forecast_type, f.account_type, amount_sign, starts_in_month
+    """, values, as_dict=True)
+    
+    return {"months": months, "rows": rows}
+
+def _sum_rows(rows, amount_field="total_amount"):
+    """Combine grouped rows into a total and an average confidence"""
+    total = sum(row[amount_field] or 0 for row in rows)
+    confidence_count = sum(row.confidence_count or 0 for row in rows)
+    confidence = (sum(row.confidence_sum or 0 for row in rows) / confidence_count) if confidence_count else 0
+    return total, confidence, sum(row.forecast_count or 0 for row in rows)
+
+def get_monthly_projections(company=None, months_ahead=12, from_date=None, to_date=None, projection_base=None):
+    """Get monthly cash flow projections"""
+    
+    if projection_base is None:
+        projection_base = get_projection_base(company, months_ahead, from_date, to_date)
+    
+    rows_by_month = {}
+    for row in projection_base["rows"]:
+        rows_by_month.setdefault((str(row.month_start), row.forecast_type), []).append(row)
+    
+    projections = []
+    
+    for month in projection_base["months"]:
+        projection_date = month["projection_date"]
+        month_key = str(month["month_start"])
+        
+        total_revenue, revenue_confidence, _count = _sum_rows(rows_by_month.get((month_key, "Revenue"), []))
+        total_expenses, expense_confidence, _count = _sum_rows(rows_by_month.get((month_key, "Expense"), []))
+        cashflow_total, cashflow_confidence, cashflow_count = _sum_rows(rows_by_month.get((month_key, "Cash Flow"), []))
+        
+        net_cashflow = cashflow_total or (total_revenue - total_expenses)
         
         projections.append({
             "month": projection_date.strftime("%Y-%m"),
@@ -385,17 +434,17 @@ def get_monthly_projections(company=None, months_ahead=12, from_date=None, to_da
             "year": projection_date.year,
             "revenue": {
                 "amount": total_revenue,
-                "confidence": revenue_forecast.avg_confidence or 0
+                "confidence": revenue_confidence
             },
             "expenses": {
                 "amount": total_expenses,
-                "confidence": expense_forecast.avg_confidence or 0
+                "confidence": expense_confidence
             },
             "net_cashflow": {
                 "amount": net_cashflow,
-                "confidence": cashflow_forecast.avg_confidence or 0
+                "confidence": cashflow_confidence
             },
-            "forecast_count": cashflow_forecast.forecast_count or 0,
+            "forecast_count": cashflow_count,
             "cumulative_cashflow": 0  # Will be calculated later
         })
     
@@ -407,52 +456,44 @@ def get_monthly_projections(company=None, months_ahead=12, from_date=None, to_da
     
     return projections
 
-def get_cashflow_breakdown(company=None, months_ahead=12):
+def get_cashflow_breakdown(company=None, months_ahead=12, projection_base=None):
     """Get detailed cash flow breakdown by category"""
     
-    # Get inflow categories
-    inflow_categories = frappe.db.sql("""
-        SELECT 
-            account_type,
-            SUM(predicted_amount) as total_amount,
-            AVG(confidence_score) as avg_confidence,
-            COUNT(*) as forecast_count
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type IN ('Revenue', 'Cash Flow')
-        AND predicted_amount > 0
-        AND forecast_start_date >= %(start_date)s
-        AND forecast_start_date <= %(end_date)s
-        {}
-        GROUP BY account_type
-        ORDER BY total_amount DESC
-    """.format("AND company = %(company)s" if company else ""),
-    {
-        "company": company,
-        "start_date": frappe.utils.nowdate(),
-        "end_date": frappe.utils.add_months(frappe.utils.nowdate(), months_ahead)
-    }, as_dict=True)
+    if projection_base is None:
+        projection_base = get_projection_base(company, months_ahead)
+    
+    # Each forecast counts once, in the month it starts
+    starting_rows = [row for row in projection_base["rows"] if row.starts_in_month]
+    
+    def _categories(rows, amount_field):
+        by_account_type = {}
+        for row in rows:
+            by_account_type.setdefault(row.account_type, []).append(row)
+        
+        categories = []
+        for account_type, type_rows in by_account_type.items():
+            total, confidence, count = _sum_rows(type_rows, amount_field)
+            categories.append(frappe._dict({
+                "account_type": account_type,
+                "total_amount": total,
+                "avg_confidence": confidence,
+                "forecast_count": count
+            }))
+        
+        return sorted(categories, key=lambda c: c.total_amount, reverse=True)
+    
+    # Inflows: positive Revenue and Cash Flow forecasts
+    inflow_categories = _categories(
+        [row for row in starting_rows if row.forecast_type in ("Revenue", "Cash Flow") and row.amount_sign > 0],
+        "total_amount"
+    )
     
-    # Get outflow categories
-    outflow_categories = frappe.db.sql("""
-        SELECT 
-            account_type,
-            SUM(ABS(predicted_amount)) as total_amount,
-            AVG(confidence_score) as avg_confidence,
-            COUNT(*) as forecast_count
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type IN ('Expense', 'Cash Flow')
-        AND (predicted_amount < 0 OR forecast_type = 'Expense')
-        AND forecast_start_date >= %(start_date)s
-        AND forecast_start_date <= %(end_date)s
-        {}
-        GROUP BY account_type
-        ORDER BY total_amount DESC
-    """.format("AND company = %(company)s" if company else ""),
-    {
-        "company": company,
-        "start_date": frappe.utils.nowdate(),
-        "end_date": frappe.utils.add_months(frappe.utils.nowdate(), months_ahead)
-    }, as_dict=True)
+    # Outflows: all Expense forecasts and negative Cash Flow forecasts
+    outflow_categories = _categories(
+        [row for row in starting_rows
+         if row.forecast_type == "Expense" or (row.forecast_type == "Cash Flow" and row.amount_sign < 0)],
+        "total_abs_amount"
+    )
     
     # Calculate totals
     total_inflows = sum(cat.total_amount for cat in inflow_categories)
@@ -472,13 +513,14 @@ def get_cashflow_breakdown(company=None, months_ahead=12):
         "net_flow": total_inflows - total_outflows
     }
 
-def get_scenario_analysis(company=None, months_ahead=12):
-    """Generate scenario analysis (optimistic, pessimistic, most likely)"""
+def get_scenario_analysis(company=None, months_ahead=12, base_projections=None, opening_balance=None):
+    """Generate scenario analysis (optimistic, pessimistic, most likely) plus a Monte Carlo simulation"""
     
     scenarios = {}
     
     # Base scenario (most likely) - use existing forecasts
-    base_projections = get_monthly_projections(company, months_ahead)
+    if base_projections is None:
+        base_projections = get_monthly_projections(company, months_ahead)
     
     scenarios["realistic"] = {
         "net_cashflow": sum(p["net_cashflow"]["amount"] for p in base_projections),
@@ -489,7 +531,7 @@ def get_scenario_analysis(company=None, months_ahead=12):
     # Optimistic scenario (+20% revenue, -10% expenses)
     optimistic_projections = []
     for projection in base_projections:
-        opt_projection = projection.copy()
+        opt_projection = copy.deepcopy(projection)
         opt_projection["revenue"]["amount"] *= 1.2
         opt_projection["expenses"]["amount"] *= 0.9
         opt_projection["net_cashflow"]["amount"] = opt_projection["revenue"]["amount"] - opt_projection["expenses"]["amount"]
@@ -504,7 +546,7 @@ def get_scenario_analysis(company=None, months_ahead=12):
     # Pessimistic scenario (-15% revenue, +15% expenses)
     pessimistic_projections = []
     for projection in base_projections:
-        pess_projection = projection.copy()
+        pess_projection = copy.deepcopy(projection)
         pess_projection["revenue"]["amount"] *= 0.85
         pess_projection["expenses"]["amount"] *= 1.15
         pess_projection["net_cashflow"]["amount"] = pess_projection["revenue"]["amount"] - pess_projection["expenses"]["amount"]
@@ -516,6 +558,11 @@ def get_scenario_analysis(company=None, months_ahead=12):
         "assumptions": "15% lower revenue, 15% higher expenses, market downturn"
     }
     
+    # Stochastic scenarios sampled from forecast bounds and historical residuals
+    simulation = run_cashflow_simulation(company, months_ahead, opening_balance=opening_balance)
+    if simulation.get("success"):
+        scenarios["simulation"] = simulation["data"]
+    
     return scenarios
 
 def get_cashflow_risk_assessment(monthly_projections):
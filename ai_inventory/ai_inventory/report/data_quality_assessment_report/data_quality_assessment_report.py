@@ -5,7 +5,9 @@ import json
 from datetime import datetime, timedelta
 import statistics
 import calendar
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.data_quality_assessment_report")
 def execute(filters=None):
     """Main execute function for ERPNext report"""
     columns = get_columns()
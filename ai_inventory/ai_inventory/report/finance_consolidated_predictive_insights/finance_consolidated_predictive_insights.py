@@ -15,6 +15,7 @@ import statistics
 import math
 import random
 from typing import List, Dict, Optional, Tuple
+from ai_inventory.instrumentation import instrument
 
 # Optional scientific packages (not required). Fallbacks implemented below.
 try:  # noqa: SIM105
@@ -23,6 +24,7 @@ except Exception:  # pragma: no cover
     np = None  # type: ignore
 
 
+@instrument("report.finance_consolidated_predictive_insights")
 def execute(filters: Optional[Dict] = None) -> Tuple[List[Dict], List[Dict]]:
     columns = get_columns()
     data = get_data(filters or {})
@@ -4,7 +4,9 @@ from frappe import _
 import json
 from datetime import datetime, timedelta
 import statistics
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.forecast_accuracy_report")
 def execute(filters=None):
     """Main execute function for ERPNext report"""
     columns = get_columns()
@@ -11,7 +11,9 @@ from datetime import datetime, timedelta
 from scipy import stats
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import math
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.forecast_sales_accuracy_analysis")
 def execute(filters=None):
     if not filters:
         filters = {}
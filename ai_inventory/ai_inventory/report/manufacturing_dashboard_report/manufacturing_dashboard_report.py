@@ -3,7 +3,9 @@ import frappe
 from frappe import _
 import json
 from datetime import datetime, timedelta
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.manufacturing_dashboard_report")
 def execute(filters=None):
     """Main execute function for ERPNext report"""
     columns = get_columns()
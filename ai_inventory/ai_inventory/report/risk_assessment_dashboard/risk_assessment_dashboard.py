@@ -4,7 +4,12 @@ from frappe import _
 import json
 from datetime import datetime, timedelta
 import statistics
+from concurrent.futures import ThreadPoolExecutor
+from ai_inventory.instrumentation import instrument
 
+MAX_ASSESSOR_WORKERS = 4
+
+@instrument("report.risk_assessment_dashboard")
 def execute(filters=None):
     """Main execute function for ERPNext report"""
     columns = get_columns()
@@ -308,17 +313,22 @@ def generate_risk_assessment_dashboard(company=None, period_months=6):
     """Generate comprehensive risk assessment dashboard"""
     
     try:
-        # Get financial risks
-        financial_risks = assess_financial_risks(company, period_months)
-        
-        # Get operational risks  
-        operational_risks = assess_operational_risks(company, period_months)
+        period_months = int(period_months or 6)
         
-        # Get market risks
-        market_risks = assess_market_risks(company, period_months)
+        # Load every aggregate the assessors need in one pass
+        snapshot = get_risk_snapshot(company, period_months)
         
-        # Get risk metrics
-        risk_metrics = calculate_risk_metrics(company, period_months)
+        # Assessors only read the snapshot, so they can run side by side
+        with ThreadPoolExecutor(max_workers=MAX_ASSESSOR_WORKERS) as executor:
+            financial_future = executor.submit(assess_financial_risks, company, period_months, snapshot)
+            operational_future = executor.submit(assess_operational_risks, company, period_months, snapshot)
+            market_future = executor.submit(assess_market_risks, company, period_months, snapshot)
+            metrics_future = executor.submit(calculate_risk_metrics, company, period_months, snapshot)
+            
+            financial_risks = financial_future.result()
+            operational_risks = operational_future.result()
+            market_risks = market_future.result()
+            risk_metrics = metrics_future.result()
         
         # Get mitigation strategies
         mitigation_strategies = get_mitigation_strategies(financial_risks, operational_risks, market_risks)
@@ -357,50 +367,130 @@ def generate_risk_assessment_dashboard(company=None, period_months=6):
             "error": str(e)
         }
 
-def assess_financial_risks(company=None, period_months=6):
+def get_risk_snapshot(company=None, period_months=6):
+    """
+    Load the forecast, accuracy and account aggregates used by every assessor
+    
+    One conditional-aggregate pass over AI Financial Forecast replaces the
+    per-assessor queries. The snapshot is memoized per request for each
+    (company, period) so assessors called on their own share it too.
+    """
+    period_months = int(period_months or 6)
+    snapshots = getattr(frappe.local, "risk_assessment_snapshots", None)
+    if snapshots is None:
+        snapshots = frappe.local.risk_assessment_snapshots = {}
+    
+    key = (company, period_months)
+    if key in snapshots:
+        return snapshots[key]
+    
+    values = {"company": company, "period_months": period_months}
+    company_condition = "AND company = %(company)s" if company else ""
+    in_period = "forecast_start_date >= CURDATE() AND forecast_start_date <= DATE_ADD(CURDATE(), INTERVAL %(period_months)s MONTH)"
+    
+    forecast_aggregates = frappe.db.sql("""
+        SELECT 
+            SUM(CASE WHEN {negative_cash_flow} THEN 1 ELSE 0 END) as negative_count,
+            MIN(CASE WHEN {negative_cash_flow} THEN predicted_amount END) as worst_month,
+            AVG(CASE WHEN {negative_cash_flow} THEN predicted_amount END) as avg_flow,
+            
+            SUM(CASE WHEN forecast_type = 'Balance Sheet' AND forecast_start_date <= CURDATE()
+                     AND account_type IN ('Bank', 'Cash') THEN predicted_amount ELSE 0 END) as cash_equivalents,
+            SUM(CASE WHEN forecast_type = 'Balance Sheet' AND forecast_start_date <= CURDATE()
+                     AND account_type = 'Receivable' THEN predicted_amount ELSE 0 END) as receivables,
+            SUM(CASE WHEN account_type = 'Payable' AND forecast_start_date <= CURDATE()
+                     THEN predicted_amount END) as total_liabilities,
+            
+            SUM(CASE WHEN account_type = 'Receivable' AND forecast_start_date <= CURDATE()
+                     THEN predicted_amount END) as total_receivables,
+            AVG(CASE WHEN account_type = 'Receivable' AND forecast_start_date <= CURDATE()
+                     THEN confidence_score END) as receivable_confidence,
+            
+            AVG(CASE WHEN forecast_type = 'Revenue'
+                     AND (account_name LIKE '%%Production%%' OR account_name LIKE '%%Manufacturing%%')
+                     AND forecast_start_date >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
+                     THEN predicted_amount END) as avg_production,
+            
+            STDDEV(CASE WHEN {recent_revenue} THEN predicted_amount END) as revenue_volatility,
+            AVG(CASE WHEN {recent_revenue} THEN predicted_amount END) as avg_revenue,
+            SUM(CASE WHEN {recent_revenue} THEN 1 ELSE 0 END) as revenue_data_points,
+            
+            SUM(CASE WHEN {in_period} THEN ABS(predicted_amount) END) as total_exposure
+        FROM `tabAI Financial Forecast`
+        WHERE 1=1
+        {company_condition}
+    """.format(
+        in_period=in_period,
+        negative_cash_flow=f"forecast_type = 'Cash Flow' AND predicted_amount < 0 AND {in_period}",
+        recent_revenue="forecast_type = 'Revenue' AND forecast_start_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)",
+        company_condition=company_condition
+    ), values, as_dict=True)[0]
+    
+    accuracy = frappe.db.sql("""
+        SELECT 
+            AVG(accuracy_percentage) as avg_accuracy,
+            STDDEV(accuracy_percentage) as accuracy_volatility,
+            COUNT(*) as total_forecasts
+        FROM `tabAI Forecast Accuracy`
+        WHERE measurement_date >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)
+        {}
+    """.format(company_condition), values, as_dict=True)[0]
+    
+    cash_accounts = frappe.db.sql("""
+        SELECT DISTINCT account, account_name
+        FROM `tabAI Financial Forecast`
+        WHERE account_type IN ('Bank', 'Cash', 'Receivable', 'Payable')
+        {}
+        LIMIT 10
+    """.format(company_condition), values, as_dict=True)
+    
+    snapshot = frappe._dict({
+        "forecasts": forecast_aggregates,
+        "accuracy": accuracy,
+        "cash_accounts": [acc.account_name for acc in cash_accounts]
+    })
+    snapshots[key] = snapshot
+    
+    return snapshot
+
+def assess_financial_risks(company=None, period_months=6, snapshot=None):
     """Assess financial risks"""
     
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
     risks = []
     
     # Cash flow risk
-    cash_flow_risk = assess_cash_flow_risk(company, period_months)
+    cash_flow_risk = assess_cash_flow_risk(company, period_months, snapshot)
     if cash_flow_risk:
         risks.append(cash_flow_risk)
     
     # Liquidity risk
-    liquidity_risk = assess_liquidity_risk(company)
+    liquidity_risk = assess_liquidity_risk(company, snapshot)
     if liquidity_risk:
         risks.append(liquidity_risk)
     
     # Credit risk
-    credit_risk = assess_credit_risk(company)
+    credit_risk = assess_credit_risk(company, snapshot)
     if credit_risk:
         risks.append(credit_risk)
     
     # Forecast accuracy risk
-    accuracy_risk = assess_forecast_accuracy_risk(company)
+    accuracy_risk = assess_forecast_accuracy_risk(company, snapshot)
     if accuracy_risk:
         risks.append(accuracy_risk)
     
     return risks
 
-def assess_cash_flow_risk(company=None, period_months=6):
+def assess_cash_flow_risk(company=None, period_months=6, snapshot=None):
     """Assess cash flow risks"""
     
     # Get cash flow forecasts
-    negative_months = frappe.db.sql("""
-        SELECT 
-            COUNT(*) as negative_count,
-            MIN(predicted_amount) as worst_month,
-            AVG(predicted_amount) as avg_flow
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type = 'Cash Flow'
-        AND predicted_amount < 0
-        AND forecast_start_date >= CURDATE()
-        AND forecast_start_date <= DATE_ADD(CURDATE(), INTERVAL %(period_months)s MONTH)
-        {}
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company, "period_months": period_months}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
+    negative_months = frappe._dict({
+        "negative_count": int(snapshot.forecasts.negative_count or 0),
+        "worst_month": snapshot.forecasts.worst_month or 0,
+        "avg_flow": snapshot.forecasts.avg_flow or 0
+    })
     
     if negative_months.negative_count > 0:
         severity = "Critical" if negative_months.negative_count > 3 else "High" if negative_months.negative_count > 1 else "Medium"
@@ -416,7 +506,7 @@ def assess_cash_flow_risk(company=None, period_months=6):
             "current_exposure": abs(negative_months.avg_flow) if negative_months.avg_flow < 0 else 0,
             "trend": "Increasing",
             "mitigation_urgency": "Immediate" if severity == "Critical" else "High",
-            "related_accounts": get_related_cash_accounts(company),
+            "related_accounts": get_related_cash_accounts(company, snapshot),
             "risk_factors": [
                 "Seasonal demand variations",
                 "Payment collection delays", 
@@ -427,39 +517,15 @@ def assess_cash_flow_risk(company=None, period_months=6):
     
     return None
 
-def assess_liquidity_risk(company=None):
+def assess_liquidity_risk(company=None, snapshot=None):
     """Assess liquidity risks"""
     
-    # Get current liquid assets
-    liquid_assets = frappe.db.sql("""
-        SELECT 
-            SUM(CASE WHEN account_type IN ('Bank', 'Cash') THEN predicted_amount ELSE 0 END) as cash_equivalents,
-            SUM(CASE WHEN account_type = 'Receivable' THEN predicted_amount ELSE 0 END) as receivables
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type = 'Balance Sheet'
-        AND forecast_start_date <= CURDATE()
-        {}
-        ORDER BY forecast_start_date DESC
-        LIMIT 1
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
-    
-    # Get current liabilities
-    current_liabilities = frappe.db.sql("""
-        SELECT 
-            SUM(predicted_amount) as total_liabilities
-        FROM `tabAI Financial Forecast`
-        WHERE account_type = 'Payable'
-        AND forecast_start_date <= CURDATE()
-        {}
-        ORDER BY forecast_start_date DESC
-        LIMIT 1
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
+    # Get current liquid assets and liabilities
+    snapshot = snapshot or get_risk_snapshot(company)
     
-    cash_equivalents = liquid_assets.cash_equivalents or 0
-    receivables = liquid_assets.receivables or 0
-    total_liabilities = current_liabilities.total_liabilities or 1
+    cash_equivalents = snapshot.forecasts.cash_equivalents or 0
+    receivables = snapshot.forecasts.receivables or 0
+    total_liabilities = snapshot.forecasts.total_liabilities or 1
     
     # Calculate liquidity ratios
     current_ratio = (cash_equivalents + receivables) / total_liabilities
@@ -495,23 +561,14 @@ def assess_liquidity_risk(company=None):
     
     return None
 
-def assess_credit_risk(company=None):
+def assess_credit_risk(company=None, snapshot=None):
     """Assess credit and counterparty risks"""
     
     # Get receivables aging analysis
-    overdue_receivables = frappe.db.sql("""
-        SELECT 
-            SUM(predicted_amount) as total_receivables,
-            AVG(confidence_score) as avg_confidence
-        FROM `tabAI Financial Forecast`
-        WHERE account_type = 'Receivable'
-        AND forecast_start_date <= CURDATE()
-        {}
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company)
     
-    total_receivables = overdue_receivables.total_receivables or 0
-    confidence = overdue_receivables.avg_confidence or 100
+    total_receivables = snapshot.forecasts.total_receivables or 0
+    confidence = snapshot.forecasts.receivable_confidence or 100
     
     # Estimate credit risk based on receivables and confidence
     estimated_bad_debt = total_receivables * (100 - confidence) / 100
@@ -545,21 +602,12 @@ def assess_credit_risk(company=None):
     
     return None
 
-def assess_forecast_accuracy_risk(company=None):
+def assess_forecast_accuracy_risk(company=None, snapshot=None):
     """Assess risks from forecast inaccuracy"""
     
     # Get recent forecast accuracy
-    accuracy_data = frappe.db.sql("""
-        SELECT 
-            AVG(accuracy_score) as avg_accuracy,
-            STDDEV(accuracy_score) as accuracy_volatility,
-            COUNT(*) as total_forecasts
-        FROM `tabAI Forecast Accuracy` aa
-        JOIN `tabAI Financial Forecast` aff ON aa.original_forecast_id = aff.name
-        WHERE aa.evaluation_date >= DATE_SUB(NOW(), INTERVAL 90 DAY)
-        {}
-    """.format("AND aff.company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company)
+    accuracy_data = snapshot.accuracy
     
     avg_accuracy = accuracy_data.avg_accuracy or 80
     accuracy_volatility = accuracy_data.accuracy_volatility or 10
@@ -592,13 +640,14 @@ def assess_forecast_accuracy_risk(company=None):
     
     return None
 
-def assess_operational_risks(company=None, period_months=6):
+def assess_operational_risks(company=None, period_months=6, snapshot=None):
     """Assess operational risks"""
     
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
     risks = []
     
     # Capacity utilization risk
-    capacity_risk = assess_capacity_risk(company)
+    capacity_risk = assess_capacity_risk(company, snapshot)
     if capacity_risk:
         risks.append(capacity_risk)
     
@@ -619,22 +668,13 @@ def assess_operational_risks(company=None, period_months=6):
     
     return risks
 
-def assess_capacity_risk(company=None):
+def assess_capacity_risk(company=None, snapshot=None):
     """Assess capacity and production risks"""
     
     # Get capacity utilization from manufacturing data
-    capacity_data = frappe.db.sql("""
-        SELECT 
-            AVG(predicted_amount) as avg_production
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type = 'Revenue'
-        AND (account_name LIKE '%Production%' OR account_name LIKE '%Manufacturing%')
-        AND forecast_start_date >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-        {}
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company)
     
-    avg_production = capacity_data.avg_production or 1000000
+    avg_production = snapshot.forecasts.avg_production or 1000000
     
     # Simulate capacity utilization (would come from actual production systems)
     estimated_capacity = avg_production * 1.2  # Assume 20% headroom
@@ -773,13 +813,14 @@ def assess_technology_risk(company=None):
         ]
     }
 
-def assess_market_risks(company=None, period_months=6):
+def assess_market_risks(company=None, period_months=6, snapshot=None):
     """Assess market and external risks"""
     
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
     risks = []
     
     # Demand volatility risk
-    demand_risk = assess_demand_risk(company, period_months)
+    demand_risk = assess_demand_risk(company, period_months, snapshot)
     if demand_risk:
         risks.append(demand_risk)
     
@@ -800,24 +841,14 @@ def assess_market_risks(company=None, period_months=6):
     
     return risks
 
-def assess_demand_risk(company=None, period_months=6):
+def assess_demand_risk(company=None, period_months=6, snapshot=None):
     """Assess demand volatility risks"""
     
     # Get revenue volatility
-    revenue_data = frappe.db.sql("""
-        SELECT 
-            STDDEV(predicted_amount) as revenue_volatility,
-            AVG(predicted_amount) as avg_revenue,
-            COUNT(*) as data_points
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_type = 'Revenue'
-        AND forecast_start_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-        {}
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
     
-    revenue_volatility = revenue_data.revenue_volatility or 0
-    avg_revenue = revenue_data.avg_revenue or 1000000
+    revenue_volatility = snapshot.forecasts.revenue_volatility or 0
+    avg_revenue = snapshot.forecasts.avg_revenue or 1000000
     
     volatility_pct = (revenue_volatility / max(avg_revenue, 1)) * 100
     
@@ -927,21 +958,13 @@ def assess_regulatory_risk(company=None):
         ]
     }
 
-def calculate_risk_metrics(company=None, period_months=6):
+def calculate_risk_metrics(company=None, period_months=6, snapshot=None):
     """Calculate key risk metrics"""
     
     # Value at Risk calculation (simplified)
-    total_exposure = frappe.db.sql("""
-        SELECT 
-            SUM(ABS(predicted_amount)) as total_exposure
-        FROM `tabAI Financial Forecast`
-        WHERE forecast_start_date >= CURDATE()
-        AND forecast_start_date <= DATE_ADD(CURDATE(), INTERVAL %(period_months)s MONTH)
-        {}
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company, "period_months": period_months}, as_dict=True)[0]
+    snapshot = snapshot or get_risk_snapshot(company, period_months)
     
-    exposure = total_exposure.total_exposure or 10000000
+    exposure = snapshot.forecasts.total_exposure or 10000000
     
     # Calculate VaR (simplified - 95% confidence, 1% of exposure)
     var_95 = exposure * 0.01
@@ -1185,19 +1208,11 @@ def get_risk_trend(company=None, period_months=6):
         "trend_analysis": "Risk levels have remained relatively stable with slight increase in operational risks"
     }
 
-def get_related_cash_accounts(company=None):
+def get_related_cash_accounts(company=None, snapshot=None):
     """Get cash-related accounts for risk analysis"""
     
-    accounts = frappe.db.sql("""
-        SELECT DISTINCT account, account_name
-        FROM `tabAI Financial Forecast`
-        WHERE account_type IN ('Bank', 'Cash', 'Receivable', 'Payable')
-        {}
-        LIMIT 10
-    """.format("AND company = %(company)s" if company else ""),
-    {"company": company}, as_dict=True)
-    
-    return [acc.account_name for acc in accounts]
+    snapshot = snapshot or get_risk_snapshot(company)
+    return snapshot.cash_accounts
 
 @frappe.whitelist()
 def export_risk_assessment(company=None, period_months=6, format="excel"):
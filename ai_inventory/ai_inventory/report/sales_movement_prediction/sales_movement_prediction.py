@@ -10,7 +10,9 @@ import pandas as pd
 from datetime import datetime, timedelta
 from scipy import stats
 import math
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.sales_movement_prediction")
 def execute(filters=None):
     if not filters:
         filters = {}
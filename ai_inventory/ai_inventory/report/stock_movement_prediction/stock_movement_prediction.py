@@ -14,7 +14,9 @@ from datetime import datetime, timedelta
 from scipy import stats
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import math
+from ai_inventory.instrumentation import instrument
 
+@instrument("report.stock_movement_prediction")
 def execute(filters=None):
     if not filters:
         filters = {}
@@ -278,6 +280,9 @@ def get_accuracy_conditions(filters):
     if filters.get("min_confidence"):
         conditions += " AND aif.confidence_score >= %(min_confidence)s"
     
+    if filters.get("abc_class_filter"):
+        conditions += " AND aif.abc_class = %(abc_class_filter)s"
+    
     if filters.get("accuracy_category"):
         # This will be applied after accuracy calculation
         pass
@@ -0,0 +1,277 @@
+"""
+Archival tier for aged forecast and log rows
+
+Rows past their retention are written to compressed JSONL partitions under
+private/files/ai_archive/<doctype>/<YYYY-MM>/ and then deleted from the hot
+table in small name-ordered chunks, each committed on its own so no delete
+holds locks for long. Partitions are zstd compressed when the zstandard
+package is installed and gzip compressed otherwise; read_archive reads both.
+"""
+
+import frappe
+from frappe.utils import add_days, cint, getdate, now, nowdate
+import glob
+import gzip
+import json
+import os
+import time
+from ai_inventory.lazy_imports import is_available, lazy_import
+
+zstandard = lazy_import("zstandard")
+
+CHUNK_SIZE = 500
+CHUNK_PAUSE = 0.05  # seconds between chunks so replication and other writers keep up
+ARCHIVED_DETAILS_NOTE = "Archived - see AI Inventory Forecast Details archive"
+
+# doctype: (date field deciding age and partition, retention days, extra condition)
+ARCHIVE_POLICIES = {
+    "AI Forecast Sync Log": ("creation", 90, ""),
+    "AI Forecast Accuracy": ("creation", 365, ""),
+    "AI Sales Forecast": ("modified", 365, ""),
+    "AI Financial Forecast": ("creation", 180, ""),
+    "Error Log": ("creation", 30, "AND error LIKE '%%AI Inventory%%'"),
+    "AI Performance Metric": ("period_start", 90, ""),
+}
+
+
+def get_archive_path(*parts):
+    return frappe.get_site_path("private", "files", "ai_archive", *parts)
+
+
+def write_partition(doctype, month, rows):
+    """Write rows to a new compressed partition file for one doctype and month"""
+    directory = get_archive_path(frappe.scrub(doctype), month)
+    os.makedirs(directory, exist_ok=True)
+
+    payload = "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+    stem = os.path.join(directory, f"{time.strftime('%Y%m%d%H%M%S')}-{frappe.generate_hash(length=6)}.jsonl")
+
+    if is_available("zstandard"):
+        path, data = stem + ".zst", zstandard.ZstdCompressor(level=10).compress(payload)
+    else:
+        path, data = stem + ".gz", gzip.compress(payload)
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_partition(path):
+    """Rows of one partition file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    payload = zstandard.ZstdDecompressor().decompress(data) if path.endswith(".zst") else gzip.decompress(data)
+    return [json.loads(line) for line in payload.decode().splitlines() if line]
+
+
+def archive_rows(doctype, rows, date_field):
+    """Write rows, with their child table rows, to partitions by month of date_field"""
+    names = [row.name for row in rows]
+    children = {}
+    for table_field in frappe.get_meta(doctype).get_table_fields():
+        for child in frappe.db.sql(f"""
+            SELECT * FROM `tab{table_field.options}`
+            WHERE parent IN %(names)s AND parenttype = %(doctype)s
+            ORDER BY idx
+        """, {"names": names, "doctype": doctype}, as_dict=True):
+            children.setdefault(child.parent, {}).setdefault(table_field.fieldname, []).append(child)
+
+    by_month = {}
+    for row in rows:
+        row = dict(row, **children.get(row.name, {}))
+        by_month.setdefault(str(getdate(row.get(date_field) or row["creation"]))[:7], []).append(row)
+
+    for month, month_rows in by_month.items():
+        write_partition(doctype, month, month_rows)
+
+
+def delete_rows(doctype, names):
+    """Delete rows and their child rows by name"""
+    for table_field in frappe.get_meta(doctype).get_table_fields():
+        frappe.db.sql(f"""
+            DELETE FROM `tab{table_field.options}`
+            WHERE parent IN %(names)s AND parenttype = %(doctype)s
+        """, {"names": names, "doctype": doctype})
+    frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE name IN %(names)s", {"names": names})
+
+
+def get_linked_names(doctype):
+    """
+    Names of doctype that other records still link to
+
+    The raw deletes skip delete_doc's link checks, so these rows are left in
+    place, as delete_doc would have refused them with LinkExistsError.
+    """
+    link_fields = frappe.db.sql("""
+        SELECT parent, fieldname FROM `tabDocField`
+        WHERE fieldtype = 'Link' AND options = %(doctype)s
+        UNION
+        SELECT dt, fieldname FROM `tabCustom Field`
+        WHERE fieldtype = 'Link' AND options = %(doctype)s
+    """, {"doctype": doctype})
+
+    linked = set()
+    for link_doctype, fieldname in link_fields:
+        if frappe.db.table_exists(link_doctype):
+            linked.update(frappe.db.sql_list(f"""
+                SELECT DISTINCT `{fieldname}` FROM `tab{link_doctype}`
+                WHERE IFNULL(`{fieldname}`, '') != ''
+            """))
+    return linked
+
+
+def archive_doctype(doctype, retention_days=None, conditions=None, names=None, chunk_size=CHUNK_SIZE):
+    """
+    Move rows of a doctype older than its retention, or the given names, to the archive
+
+    Walks the table in name order, archiving and deleting one chunk per
+    transaction. Rows other records still link to are skipped. Returns the
+    number of rows archived.
+    """
+    date_field, default_retention, default_conditions = ARCHIVE_POLICIES.get(doctype, ("creation", 365, ""))
+    values = {"chunk_size": cint(chunk_size)}
+    if names is not None:
+        if not names:
+            return 0
+        conditions = "AND name IN %(names)s"
+        values["names"] = list(names)
+    else:
+        conditions = f"AND `{date_field}` < %(cutoff)s " + (default_conditions if conditions is None else conditions)
+        values["cutoff"] = add_days(nowdate(), -cint(retention_days or default_retention))
+
+    archived = 0
+    last_name = ""
+    try:
+        linked = get_linked_names(doctype)
+        while True:
+            rows = frappe.db.sql(f"""
+                SELECT * FROM `tab{doctype}`
+                WHERE name > %(last_name)s
+                {conditions}
+                ORDER BY name
+                LIMIT %(chunk_size)s
+            """, dict(values, last_name=last_name), as_dict=True)
+            if not rows:
+                break
+
+            last_name = rows[-1].name
+            rows = [row for row in rows if row.name not in linked]
+            if not rows:
+                continue
+
+            archive_rows(doctype, rows, date_field)
+            delete_rows(doctype, [row.name for row in rows])
+            frappe.db.commit()
+
+            archived += len(rows)
+            time.sleep(CHUNK_PAUSE)
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Archiving {doctype} failed after {last_name or 'start'}: {str(e)}", "AI Archive")
+
+    return archived
+
+
+def archive_forecast_details(retention_days=90, chunk_size=CHUNK_SIZE):
+    """
+    Move long forecast_details text of stale AI Inventory Forecasts to the archive
+
+    The forecasts themselves are live per item/warehouse state and stay in
+    place; only their detail text is archived and replaced by a note.
+    """
+    cutoff = add_days(nowdate(), -cint(retention_days))
+    archived = 0
+    last_name = ""
+    try:
+        while True:
+            rows = frappe.db.sql("""
+                SELECT name, item_code, warehouse, company, last_forecast_date, forecast_details, modified, creation
+                FROM `tabAI Inventory Forecast`
+                WHERE name > %(last_name)s
+                AND last_forecast_date < %(cutoff)s
+                AND LENGTH(forecast_details) > 1000
+                ORDER BY name
+                LIMIT %(chunk_size)s
+            """, {"last_name": last_name, "cutoff": cutoff, "chunk_size": cint(chunk_size)}, as_dict=True)
+            if not rows:
+                break
+
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(str(getdate(row.last_forecast_date))[:7], []).append(row)
+            for month, month_rows in by_month.items():
+                write_partition("AI Inventory Forecast Details", month, month_rows)
+
+            frappe.db.sql("""
+                UPDATE `tabAI Inventory Forecast`
+                SET forecast_details = %(note)s
+                WHERE name IN %(names)s
+            """, {"note": ARCHIVED_DETAILS_NOTE, "names": [row.name for row in rows]})
+            frappe.db.commit()
+
+            archived += len(rows)
+            last_name = rows[-1].name
+            time.sleep(CHUNK_PAUSE)
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Archiving forecast details failed after {last_name or 'start'}: {str(e)}", "AI Archive")
+
+    return archived
+
+
+def archive_old_records():
+    """Apply every archive policy in ARCHIVE_POLICIES (monthly)"""
+    results = {}
+    for doctype in ARCHIVE_POLICIES:
+        if frappe.db.table_exists(doctype):
+            results[doctype] = archive_doctype(doctype)
+
+    frappe.logger().info(f"AI archive run: {results}")
+    return {"success": True, "archived": results, "timestamp": now()}
+
+
+def read_archive(doctype, from_date=None, to_date=None, filters=None, limit=None):
+    """
+    Archived rows of a doctype, optionally limited to a month range and equality filters
+
+    Partitions are selected by month from the directory layout. A row archived
+    twice (a run interrupted between writing and deleting) is returned once.
+    """
+    from_month = str(getdate(from_date))[:7] if from_date else None
+    to_month = str(getdate(to_date))[:7] if to_date else None
+    filters = filters or {}
+
+    rows = {}
+    for month_dir in sorted(glob.glob(get_archive_path(frappe.scrub(doctype), "*"))):
+        month = os.path.basename(month_dir)
+        if (from_month and month < from_month) or (to_month and month > to_month):
+            continue
+
+        for path in sorted(glob.glob(os.path.join(month_dir, "*.jsonl.*"))):
+            if path.endswith(".tmp"):
+                continue
+            for row in read_partition(path):
+                if all(str(row.get(field)) == str(value) for field, value in filters.items()):
+                    rows[row["name"]] = row
+
+        if limit and len(rows) >= cint(limit):
+            break
+
+    rows = list(rows.values())
+    return rows[:cint(limit)] if limit else rows
+
+
+@frappe.whitelist()
+def get_archived_records(doctype, from_date=None, to_date=None, filters=None, limit=500):
+    """Historical rows of an archived doctype for reports and the desk"""
+    frappe.has_permission(doctype if doctype != "AI Inventory Forecast Details" else "AI Inventory Forecast",
+                          "read", throw=True)
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+
+    return read_archive(doctype, from_date, to_date, filters, limit)
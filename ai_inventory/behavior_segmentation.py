@@ -0,0 +1,211 @@
+import frappe
+from frappe.utils import cint, flt, now
+import os
+from ai_inventory.lazy_imports import is_available, lazy_from, lazy_import
+
+# Forecast validation imports this module, so sklearn is only loaded once a model is used
+np = lazy_import("numpy")
+joblib = lazy_import("joblib")
+MiniBatchKMeans = lazy_from("sklearn.cluster", "MiniBatchKMeans")
+StandardScaler = lazy_from("sklearn.preprocessing", "StandardScaler")
+SKLEARN_AVAILABLE = is_available("sklearn") and is_available("joblib")
+
+# Named from the highest consumption centroid down
+CLUSTER_NAMES = [
+    'High Volume/Low Risk',
+    'Medium Volume/Medium Risk',
+    'Stable/Predictable',
+    'Irregular/Seasonal',
+    'Low Volume/High Risk',
+    'Critical/Volatile'
+]
+MIN_ITEMS = 5
+MAX_COVER_DAYS = 365
+BATCH_SIZE = 1024
+DRIFT_THRESHOLD = 1.5  # refit when changed items sit this much further from their centroid than at fit time
+FORECAST_FIELDS = ["name", "predicted_consumption", "forecast_period_days", "current_stock", "confidence_score"]
+
+_model_cache = {}
+
+
+def get_model_path():
+    """Site specific location of the persisted segmentation, next to the other AI models"""
+    return frappe.get_site_path("private", "files", "ai_models", "item_behavior_segments.pkl")
+
+
+def get_feature_vector(row):
+    """Consumption rate, stock, confidence and cover of one forecast row"""
+    period = cint(row.get("forecast_period_days")) or 30
+    daily = max(0, flt(row.get("predicted_consumption"))) / period
+    stock = max(0, flt(row.get("current_stock")))
+    cover = min(stock / daily, MAX_COVER_DAYS) if daily > 0 else MAX_COVER_DAYS
+
+    return [np.log1p(daily * 30), np.log1p(stock), flt(row.get("confidence_score", 50)) / 100, np.log1p(cover)]
+
+
+def load_state():
+    """Persisted scaler, MiniBatchKMeans model and segment labels, cached per process"""
+    path = get_model_path()
+    if not SKLEARN_AVAILABLE or not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    cached = _model_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    state = joblib.load(path)
+    _model_cache[path] = (mtime, state)
+    return state
+
+
+def save_state(state):
+    """Persist the segmentation and drop the cached copy"""
+    path = get_model_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(state, path)
+    _model_cache.pop(path, None)
+
+
+def nearest_segments(state, X):
+    """Index of and distance to the nearest persisted centroid for each row"""
+    scaled = state["scaler"].transform(X)
+    centers = state["model"].cluster_centers_
+    distances = np.linalg.norm(scaled[:, None, :] - centers[None, :, :], axis=2)
+    clusters = distances.argmin(axis=1)
+    return clusters, distances[np.arange(len(clusters)), clusters]
+
+
+def get_segments(rows):
+    """Segment labels for arbitrary rows from the persisted centroids, None if there is no model"""
+    state = load_state()
+    if not state or not rows:
+        return None
+
+    clusters, _ = nearest_segments(state, np.array([get_feature_vector(row) for row in rows]))
+    return [state["labels"][cluster] for cluster in clusters]
+
+
+def assign_forecast_segment(doc, method):
+    """Label a saved forecast with its nearest segment without refitting"""
+    try:
+        segments = get_segments([doc])
+        if segments:
+            doc.behavior_segment = segments[0]
+    except Exception as e:
+        frappe.log_error(f"Segment assignment failed for {doc.name}: {str(e)}", "Behavior Segmentation")
+
+
+def write_segments(names, labels):
+    """Store labels with one UPDATE per segment, leaving modified untouched"""
+    by_label = {}
+    for name, label in zip(names, labels):
+        by_label.setdefault(label, []).append(name)
+
+    for label, label_names in by_label.items():
+        for start in range(0, len(label_names), 1000):
+            frappe.db.sql("""
+                UPDATE `tabAI Inventory Forecast`
+                SET behavior_segment = %s
+                WHERE name IN %s
+            """, (label, label_names[start:start + 1000]))
+
+
+def get_forecast_rows(modified_after=None):
+    """Feature columns of all forecasts, or only those changed after a timestamp"""
+    conditions = "docstatus < 2"
+    values = {}
+    if modified_after:
+        conditions += " AND modified > %(modified_after)s"
+        values["modified_after"] = modified_after
+
+    return frappe.db.sql(f"""
+        SELECT {", ".join(FORECAST_FIELDS)}
+        FROM `tabAI Inventory Forecast`
+        WHERE {conditions}
+    """, values, as_dict=True)
+
+
+def refit_item_segments():
+    """Fit the segmentation from scratch over every forecast and relabel them all"""
+    try:
+        if not SKLEARN_AVAILABLE:
+            return {"success": False, "error": "scikit-learn is not installed"}
+
+        timestamp = now()
+        rows = get_forecast_rows()
+        if len(rows) < MIN_ITEMS:
+            return {"success": False, "error": f"Need at least {MIN_ITEMS} forecasts to segment"}
+
+        X = np.array([get_feature_vector(row) for row in rows])
+        scaler = StandardScaler().fit(X)
+        n_clusters = min(len(CLUSTER_NAMES), max(3, len(rows) // 10))
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=BATCH_SIZE, n_init=3, random_state=42)
+        model.fit(scaler.transform(X))
+
+        labels = [None] * n_clusters
+        for rank, cluster in enumerate(np.argsort(-model.cluster_centers_[:, 0])):
+            labels[cluster] = CLUSTER_NAMES[rank]
+
+        state = {
+            "scaler": scaler,
+            "model": model,
+            "labels": labels,
+            "baseline_distance": 0,
+            "fitted_at": timestamp,
+            "last_update": timestamp,
+            "drift_ratio": 1.0
+        }
+        clusters, distances = nearest_segments(state, X)
+        state["baseline_distance"] = float(distances.mean())
+
+        write_segments([row.name for row in rows], [labels[cluster] for cluster in clusters])
+        frappe.db.commit()
+        save_state(state)
+
+        return {"success": True, "items": len(rows), "segments": n_clusters}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Segmentation refit failed: {str(e)}", "Behavior Segmentation")
+        return {"success": False, "error": str(e)}
+
+
+def update_item_segments():
+    """
+    Fold forecasts changed since the last run into the model with partial_fit
+    and relabel only those, refitting fully when the changed items have drifted
+    """
+    try:
+        state = load_state()
+        if not state:
+            return refit_item_segments()
+
+        timestamp = now()
+        rows = get_forecast_rows(state["last_update"])
+        if not rows:
+            return {"success": True, "items": 0}
+
+        X = np.array([get_feature_vector(row) for row in rows])
+        if len(rows) >= state["model"].n_clusters:
+            state["model"].partial_fit(state["scaler"].transform(X))
+
+        clusters, distances = nearest_segments(state, X)
+        write_segments([row.name for row in rows], [state["labels"][cluster] for cluster in clusters])
+        frappe.db.commit()
+
+        baseline = state["baseline_distance"] or 1
+        state["drift_ratio"] = float(distances.mean() / baseline)
+        state["last_update"] = timestamp
+        save_state(state)
+
+        if state["drift_ratio"] > DRIFT_THRESHOLD:
+            frappe.logger().info(f"Segment drift {state['drift_ratio']:.2f} above threshold, refitting")
+            return refit_item_segments()
+
+        return {"success": True, "items": len(rows), "drift_ratio": round(state["drift_ratio"], 3)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Segmentation update failed: {str(e)}", "Behavior Segmentation")
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,87 @@
+"""
+Buffered, sampled sink for informational events from hot loops
+
+    log_event("forecast.accuracy", item_code=item_code, accuracy=accuracy)
+
+Events are held in frappe.local and written to the site's ai_inventory log
+file in one go once the current transaction commits or rolls back, so hot
+loops no longer insert Error Log rows inside the business transaction.
+Per event name only the first SAMPLE_FIRST occurrences of a transaction are
+written in full, then every SAMPLE_EVERY-th; the rest are only counted in a
+summary line. Debug events are dropped unless ai_inventory_debug_events is
+set in site_config.
+
+frappe.log_error stays for real failures.
+"""
+
+import frappe
+import json
+import time
+
+SAMPLE_FIRST = 5
+SAMPLE_EVERY = 100
+BUFFER_LIMIT = 1000  # events held before an early flush, for long jobs that rarely commit
+LOG_FILE = "ai_inventory"
+LEVELS = ("debug", "info", "warning")
+
+
+def get_logger():
+    return frappe.logger(LOG_FILE, allow_site=True, file_count=10)
+
+
+def log_event(event, message=None, level="info", **fields):
+    """Buffer one event for the current transaction, subject to sampling"""
+    try:
+        if level == "debug" and not frappe.conf.get("ai_inventory_debug_events"):
+            return
+
+        buffer = getattr(frappe.local, "ai_inventory_event_log", None)
+        if buffer is None:
+            buffer = frappe.local.ai_inventory_event_log = {"events": [], "counts": {}}
+            if getattr(frappe.local, "db", None):
+                frappe.db.after_commit.add(flush_events)
+                frappe.db.after_rollback.add(flush_events)
+
+        seen = buffer["counts"][event] = buffer["counts"].get(event, 0) + 1
+        if seen > SAMPLE_FIRST and seen % SAMPLE_EVERY:
+            return
+
+        buffer["events"].append({
+            "ts": round(time.time(), 3),
+            "event": event,
+            "level": level if level in LEVELS else "info",
+            "message": message,
+            "occurrence": seen,
+            **fields
+        })
+
+        if len(buffer["events"]) >= BUFFER_LIMIT or not getattr(frappe.local, "db", None):
+            flush_events(keep_counts=True)
+    except Exception:
+        pass  # Logging must never break the operation it describes
+
+
+def flush_events(keep_counts=False):
+    """Write the buffered events and a per-event summary to the log file"""
+    buffer = getattr(frappe.local, "ai_inventory_event_log", None)
+    if not buffer:
+        return
+
+    events, counts = buffer["events"], buffer["counts"]
+    if keep_counts:
+        buffer["events"] = []
+    else:
+        frappe.local.ai_inventory_event_log = None
+
+    try:
+        logger = get_logger()
+        for entry in events:
+            getattr(logger, entry["level"])(json.dumps(entry, default=str))
+
+        if not keep_counts:
+            suppressed = {event: count for event, count in counts.items() if count > SAMPLE_FIRST}
+            if suppressed:
+                logger.info(json.dumps({"ts": round(time.time(), 3), "event": "event_log.summary",
+                                        "level": "info", "counts": suppressed}))
+    except Exception:
+        pass
@@ -0,0 +1,223 @@
+import frappe
+from frappe.utils import cint, getdate, now
+import json
+from ai_inventory.instrumentation import instrument
+from ai_inventory.series import reserve_series
+from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import apply_named_forecasts_impact
+
+NAMING_SERIES = "AIF-.YYYY.-"
+SERIES_DIGITS = 5
+ITEM_CHUNK_SIZE = 500
+PAIR_CHUNK_SIZE = 500
+CHECKPOINT_KEY = "ai_inventory_forecast_generator"
+
+# Only item/warehouse pairs that ever held stock have a Bin, so the catalogue
+# is never crossed with every warehouse.
+CANDIDATES = """
+    FROM `tabBin` b
+    INNER JOIN `tabItem` i ON i.name = b.item_code
+    INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
+    WHERE i.is_stock_item = 1
+    AND i.disabled = 0
+    AND w.disabled = 0
+    AND w.is_group = 0
+    {conditions}
+    AND NOT EXISTS (
+        SELECT 1 FROM `tabAI Inventory Forecast` f
+        WHERE f.item_code = b.item_code
+        AND f.warehouse = b.warehouse
+    )
+"""
+
+
+def reserve_names(count):
+    """Take a block of count names from the forecast naming series, returning (prefix, last used number)"""
+    prefix = f"AIF-{getdate().year}-"
+    return prefix, reserve_series(prefix, count)
+
+
+def insert_missing_forecasts(conditions, values):
+    """
+    Insert a forecast row for every candidate pair matching conditions
+
+    Counts the candidates per company first, reserves that many series names
+    and inserts them with one INSERT ... SELECT, then adds the new rows to the
+    inventory impact aggregate. Returns {company: created}.
+    """
+    counts = dict(frappe.db.sql(f"""
+        SELECT w.company, COUNT(*)
+        {CANDIDATES.format(conditions=conditions)}
+        GROUP BY w.company
+    """, values))
+    total = sum(counts.values())
+    if not total:
+        return {}
+
+    prefix, start = reserve_names(total)
+    timestamp = now()
+    frappe.db.sql(f"""
+        INSERT INTO `tabAI Inventory Forecast`
+            (name, naming_series, item_code, item_name, item_group, warehouse, company,
+             current_stock, valuation_rate, forecast_period_days, lead_time_days, predicted_consumption,
+             movement_type, confidence_score, reorder_alert, auto_create_po, forecast_details,
+             creation, modified, owner, modified_by, docstatus)
+        SELECT
+            CONCAT(%(prefix)s, LPAD(serial, GREATEST(%(digits)s, LENGTH(serial)), '0')),
+            %(naming_series)s, item_code, item_name, item_group, warehouse, company,
+            actual_qty, valuation_rate, 30, 14, 0,
+            'Non Moving', 0, 0, 0, 'Auto-created forecast for stocked item',
+            %(now)s, %(now)s, %(user)s, %(user)s, 0
+        FROM (
+            SELECT
+                b.item_code, i.item_name, i.item_group, b.warehouse, w.company,
+                IFNULL(b.actual_qty, 0) AS actual_qty, IFNULL(b.valuation_rate, 0) AS valuation_rate,
+                %(start)s + ROW_NUMBER() OVER (ORDER BY b.item_code, b.warehouse) AS serial
+            {CANDIDATES.format(conditions=conditions)}
+            LIMIT %(total)s
+        ) missing
+    """, dict(values, prefix=prefix, digits=SERIES_DIGITS, naming_series=NAMING_SERIES,
+              now=timestamp, user=frappe.session.user, start=start, total=total))
+
+    apply_named_forecasts_impact(f"{prefix}{serial:0{SERIES_DIGITS}d}" for serial in range(start + 1, start + total + 1))
+
+    return counts
+
+
+def get_scope_key(company=None, with_stock_only=False):
+    """Suffix separating runs of different scopes, for checkpoints and job ids"""
+    return f"{company or 'all'}::{'with_stock' if cint(with_stock_only) else 'all_bins'}"
+
+
+def get_checkpoint(company=None, with_stock_only=False):
+    """Saved progress of an interrupted generation run of one scope"""
+    try:
+        return json.loads(frappe.db.get_global(f"{CHECKPOINT_KEY}::{get_scope_key(company, with_stock_only)}") or "{}")
+    except ValueError:
+        return {}
+
+
+def set_checkpoint(checkpoint, company=None, with_stock_only=False):
+    frappe.db.set_global(f"{CHECKPOINT_KEY}::{get_scope_key(company, with_stock_only)}",
+                         json.dumps(checkpoint) if checkpoint else "")
+
+
+@instrument("sync.generate_missing_forecasts")
+def generate_missing_forecasts(company=None, with_stock_only=False, chunk_size=ITEM_CHUNK_SIZE, max_chunks=None):
+    """
+    Create the missing forecasts for the whole catalogue in item chunks
+
+    Each chunk is committed together with a checkpoint holding the last item
+    processed, so a run that is stopped or times out resumes where it left
+    off when called again with the same scope. Every scope keeps its own
+    checkpoint, so the daily full run and per-company or with-stock runs do
+    not reset each other.
+    """
+    scope = {"company": company, "with_stock_only": cint(with_stock_only)}
+    checkpoint = get_checkpoint(company, with_stock_only)
+    if checkpoint.get("scope") != scope:
+        checkpoint = {"scope": scope, "last_item": "", "created": {}, "started_at": now()}
+
+    conditions = "AND b.item_code IN %(item_codes)s"
+    if company:
+        conditions += " AND w.company = %(company)s"
+    if with_stock_only:
+        conditions += " AND (b.actual_qty > 0 OR b.planned_qty > 0 OR b.ordered_qty > 0)"
+
+    try:
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            item_codes = frappe.db.sql_list("""
+                SELECT name FROM `tabItem`
+                WHERE is_stock_item = 1 AND disabled = 0 AND name > %s
+                ORDER BY name
+                LIMIT %s
+            """, (checkpoint["last_item"], cint(chunk_size)))
+            if not item_codes:
+                break
+
+            for row_company, count in insert_missing_forecasts(
+                    conditions, {"item_codes": item_codes, "company": company}).items():
+                checkpoint["created"][row_company] = checkpoint["created"].get(row_company, 0) + count
+
+            checkpoint["last_item"] = item_codes[-1]
+            checkpoint["updated_at"] = now()
+            set_checkpoint(checkpoint, company, with_stock_only)
+            frappe.db.commit()
+            chunks += 1
+
+        completed = max_chunks is None or chunks < max_chunks
+        if completed:
+            set_checkpoint(None, company, with_stock_only)
+            frappe.db.commit()
+
+        return {
+            "success": True,
+            "completed": completed,
+            "forecasts_created": sum(checkpoint["created"].values()),
+            "company_breakdown": checkpoint["created"],
+            "last_item": checkpoint["last_item"]
+        }
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Missing forecast generation failed after {checkpoint['last_item']}: {str(e)}",
+                         "Forecast Generator")
+        return {"success": False, "error": str(e), "last_item": checkpoint["last_item"]}
+
+
+def create_missing_forecasts(item_codes=None, warehouses=None, pairs=None):
+    """
+    Create missing forecasts for specific items, warehouses or (item, warehouse) pairs
+
+    Used by the item, warehouse and stock movement hooks; does not commit.
+    Returns the number of forecasts created.
+    """
+    created = 0
+    if pairs:
+        pairs = [tuple(pair) for pair in pairs]
+        for start in range(0, len(pairs), PAIR_CHUNK_SIZE):
+            chunk = pairs[start:start + PAIR_CHUNK_SIZE]
+            created += sum(insert_missing_forecasts("""
+                AND b.item_code IN %(item_codes)s
+                AND b.warehouse IN %(warehouses)s
+                AND (b.item_code, b.warehouse) IN %(pairs)s
+            """, {
+                "item_codes": list({pair[0] for pair in chunk}),
+                "warehouses": list({pair[1] for pair in chunk}),
+                "pairs": chunk
+            }).values())
+
+    if item_codes:
+        for start in range(0, len(item_codes), ITEM_CHUNK_SIZE):
+            created += sum(insert_missing_forecasts("AND b.item_code IN %(item_codes)s", {
+                "item_codes": list(item_codes[start:start + ITEM_CHUNK_SIZE])
+            }).values())
+
+    if warehouses:
+        created += sum(insert_missing_forecasts("AND b.warehouse IN %(warehouses)s", {
+            "warehouses": list(warehouses)
+        }).values())
+
+    return created
+
+
+@frappe.whitelist()
+def enqueue_missing_forecast_generation(company=None, with_stock_only=False):
+    """Run generate_missing_forecasts as one deduplicated background job"""
+    frappe.enqueue(
+        'ai_inventory.forecast_generator.generate_missing_forecasts',
+        company=company or None,
+        with_stock_only=cint(with_stock_only),
+        queue='long',
+        timeout=7200,
+        job_id=f"ai_inventory_forecast_generator::{get_scope_key(company, with_stock_only)}",
+        deduplicate=True
+    )
+
+    checkpoint = get_checkpoint(company or None, with_stock_only)
+    return {
+        "status": "success",
+        "message": "Forecast generation queued in the background"
+                   + (f", resuming after item {checkpoint['last_item']}" if checkpoint.get("last_item") else ""),
+        "checkpoint": checkpoint
+    }
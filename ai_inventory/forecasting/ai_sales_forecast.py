@@ -8,32 +8,25 @@ from frappe.utils import nowdate, add_days, getdate
 import warnings
 warnings.filterwarnings('ignore')
 
-# Try to import ML libraries with fallback
-try:
-    import pandas as pd
-    import numpy as np
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    frappe.log_error("pandas/numpy not available. Using fallback methods.", "AI Sales Forecasting")
+import os
+from ai_inventory.lazy_imports import is_available, lazy_from, lazy_import
+from ai_inventory.instrumentation import instrument
+from ai_inventory.event_log import log_event
 
-try:
-    import joblib
-    import os
-    JOBLIB_AVAILABLE = True
-except ImportError:
-    JOBLIB_AVAILABLE = False
+# ML libraries are imported on first use; availability is checked without importing them
+PANDAS_AVAILABLE = is_available("pandas") and is_available("numpy")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
-# Try to import ML libraries with fallback
-try:
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.linear_model import LinearRegression
-    from sklearn.preprocessing import LabelEncoder
-    from sklearn.metrics import mean_absolute_error, mean_squared_error
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    frappe.log_error("scikit-learn not available. Using simple forecasting.", "AI Sales Forecasting")
+JOBLIB_AVAILABLE = is_available("joblib")
+joblib = lazy_import("joblib")
+
+SKLEARN_AVAILABLE = is_available("sklearn")
+RandomForestRegressor = lazy_from("sklearn.ensemble", "RandomForestRegressor")
+LinearRegression = lazy_from("sklearn.linear_model", "LinearRegression")
+LabelEncoder = lazy_from("sklearn.preprocessing", "LabelEncoder")
+mean_absolute_error = lazy_from("sklearn.metrics", "mean_absolute_error")
+mean_squared_error = lazy_from("sklearn.metrics", "mean_squared_error")
 
 class SalesForecastingEngine:
     def __init__(self):
@@ -45,6 +38,7 @@ class SalesForecastingEngine:
             
         self.models = {}
         self.encoders = {}
+        self.encoders_refitted = False
         self.model_path = frappe.get_site_path("private", "files", "ai_models")
         
         # Create models directory if it doesn't exist
@@ -100,11 +94,15 @@ class SalesForecastingEngine:
             ORDER BY so.transaction_date
         """, (start_date,), as_dict=True)
         
-        frappe.log_error(f"Extracted {len(sales_data)} sales records and {len(order_data)} order records", "AI Sales Forecasting")
+        log_event("sales_forecast.extract", sales_records=len(sales_data), order_records=len(order_data))
         return sales_data, order_data
     
-    def prepare_features(self, data):
-        """Prepare features for machine learning"""
+    def prepare_features(self, data, refit_unseen=False):
+        """Prepare features for machine learning
+        
+        With refit_unseen, an existing encoder that meets labels it does not
+        know is refitted and encoders_refitted is set instead of encoding them as 0.
+        """
         if not data:
             return pd.DataFrame()
             
@@ -148,6 +146,9 @@ class SalesForecastingEngine:
                         if col not in self.encoders:
                             self.encoders[col] = LabelEncoder()
                             df[f'{col}_encoded'] = self.encoders[col].fit_transform(df[col].fillna('Unknown'))
+                        elif refit_unseen and not set(df[col].fillna('Unknown')).issubset(self.encoders[col].classes_):
+                            df[f'{col}_encoded'] = self.encoders[col].fit_transform(df[col].fillna('Unknown'))
+                            self.encoders_refitted = True
                         else:
                             df[f'{col}_encoded'] = self.encoders[col].transform(df[col].fillna('Unknown'))
                     except Exception as e:
@@ -190,12 +191,13 @@ class SalesForecastingEngine:
         
         return group
     
-    def train_models(self):
-        """Train forecasting models for different items and customers"""
+    @instrument("forecast.sales.train_models")
+    def train_models(self, item_codes=None):
+        """Train forecasting models for different items and customers, or only for item_codes"""
         if not SKLEARN_AVAILABLE:
             return {"error": "scikit-learn not available. Using simple forecasting instead."}
             
-        frappe.log_error("Starting model training", "AI Sales Forecasting")
+        log_event("sales_forecast.training_started")
         
         # Extract data
         sales_data, order_data = self.extract_historical_data()
@@ -203,12 +205,23 @@ class SalesForecastingEngine:
         if not sales_data:
             return {"error": "No historical sales data found for training"}
         
+        # A subset is trained against the saved encodings so the other items'
+        # models stay valid; when those are missing or meet new labels they are
+        # refitted and every item has to be retrained
+        if item_codes and not self.load_encoders():
+            item_codes = None
+        
         # Prepare features
-        df = self.prepare_features(sales_data)
+        df = self.prepare_features(sales_data, refit_unseen=bool(item_codes))
         
         if df.empty:
             return {"error": "No data available after preprocessing"}
         
+        if item_codes and self.encoders_refitted:
+            log_event("sales_forecast.full_retrain", "Encoders changed, retraining all items",
+                      requested_items=len(item_codes))
+            item_codes = None
+        
         # Feature columns
         feature_cols = [
             'year', 'month', 'quarter', 'day_of_week', 'day_of_year', 'week_of_year',
@@ -226,6 +239,9 @@ class SalesForecastingEngine:
         
         # Train models for each item
         items_with_forecast = df['item_code'].unique()
+        if item_codes:
+            item_codes = set(item_codes)
+            items_with_forecast = [item for item in items_with_forecast if item in item_codes]
         model_performance = {}
         
         for item in items_with_forecast:
@@ -292,9 +308,23 @@ class SalesForecastingEngine:
         # Update dashboard with training results
         self._update_training_stats(model_performance)
         
-        frappe.log_error(f"Training completed for {len(model_performance)} items", "AI Sales Forecasting")
+        log_event("sales_forecast.training_completed", items=len(model_performance))
         return model_performance
     
+    def load_encoders(self):
+        """Load the saved label encoders, returning whether there were any"""
+        encoder_path = os.path.join(self.model_path, "encoders.pkl")
+        if not JOBLIB_AVAILABLE or not os.path.exists(encoder_path):
+            return False
+        
+        try:
+            self.encoders = joblib.load(encoder_path)
+            return bool(self.encoders)
+        except Exception as e:
+            frappe.log_error(f"Error loading encoders: {str(e)}", "AI Sales Forecasting")
+            self.encoders = {}
+            return False
+    
     def load_models(self):
         """Load trained models from disk"""
         if not SKLEARN_AVAILABLE:
@@ -320,6 +350,7 @@ class SalesForecastingEngine:
             frappe.log_error(f"Error loading models: {str(e)}", "AI Sales Forecasting")
             return False
     
+    @instrument("forecast.sales.generate_forecasts")
     def generate_forecasts(self, forecast_days=None):
         """Generate sales forecasts"""
         if not forecast_days:
@@ -425,7 +456,7 @@ class SalesForecastingEngine:
     
     def _generate_simple_forecasts(self, forecast_days):
         """Generate simple forecasts when ML models are not available"""
-        frappe.log_error("Generating simple forecasts (ML models not available)", "AI Sales Forecasting")
+        log_event("sales_forecast.simple_forecasts", "ML models not available")
         
         # Ensure forecast_days is an integer
         forecast_days = int(forecast_days) if forecast_days else 30
@@ -1119,8 +1150,7 @@ def scheduled_forecast_generation():
         if config.auto_submit_sales_orders:
             auto_create_sales_orders()
         
-        frappe.log_error(f"Scheduled forecast generation completed: {forecasts_created} forecasts", 
-                        "AI Sales Forecasting")
+        log_event("sales_forecast.scheduled_generation", forecasts_created=forecasts_created)
         
     except Exception as e:
         frappe.log_error(f"Scheduled forecast generation failed: {str(e)}", 
@@ -1144,8 +1174,8 @@ def scheduled_model_training():
             engine = SalesForecastingEngine()
             performance = engine.train_models()
             
-            frappe.log_error(f"Scheduled model training completed for {len(performance) if isinstance(performance, dict) else 0} items", 
-                            "AI Sales Forecasting")
+            log_event("sales_forecast.scheduled_training",
+                      items=len(performance) if isinstance(performance, dict) else 0)
         
     except Exception as e:
         frappe.log_error(f"Scheduled model training failed: {str(e)}", 
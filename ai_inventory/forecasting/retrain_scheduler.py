@@ -0,0 +1,147 @@
+# ai_inventory/forecasting/retrain_scheduler.py
+# Debounced, drift-triggered retraining of the sales forecasting models
+#
+# Sales invoice hooks only record signals: new sales lines per item and the
+# error of any forecast the sale settles. The hourly schedule_retraining job
+# launches at most one training per RETRAIN_WINDOW, and only for the items
+# whose rolling error drifted or whose new sales volume crossed a threshold.
+
+import frappe
+from frappe.utils import flt, now
+import time
+from ai_inventory.event_log import log_event
+
+RETRAIN_WINDOW = 6 * 3600  # seconds between two trainings
+ERROR_ALPHA = 0.2  # weight of the newest error in the rolling error
+MIN_ERROR_SAMPLES = 5
+DRIFT_RATIO = 1.5  # retrain when the rolling error is 50% above its value at the last training
+MAX_ERROR = 40  # or, for items never trained, above this percentage
+NEW_LINES_THRESHOLD = 50  # or when this many sales lines arrived since the last training
+RETRAIN_JOB_ID = "ai_inventory_sales_retrain"
+# Both listed in persistent_cache_keys, so drift tracking survives clear-cache
+STATE_KEY = "ai_inventory_retrain_state"
+DIRTY_KEY = "ai_inventory_retrain_dirty"
+LAST_RUN_KEY = "ai_inventory_last_retrain"
+
+
+def collect_retrain_signal(item_code, new_lines=0, error=None):
+    """Record new sales lines or a settled forecast error for the current transaction"""
+    if not item_code:
+        return
+
+    pending = getattr(frappe.local, "ai_inventory_retrain_signals", None)
+    if pending is None:
+        pending = frappe.local.ai_inventory_retrain_signals = {}
+        frappe.db.after_commit.add(flush_retrain_signals)
+        frappe.db.after_rollback.add(reset_retrain_signals)
+
+    entry = pending.setdefault(item_code, {"lines": 0, "errors": []})
+    entry["lines"] += new_lines
+    if error is not None:
+        entry["errors"].append(flt(error))
+
+
+def reset_retrain_signals():
+    """Discard signals collected in a transaction that was rolled back"""
+    frappe.local.ai_inventory_retrain_signals = None
+
+
+def flush_retrain_signals():
+    """Fold the committed signals into the per-item state and mark retraining dirty"""
+    pending = getattr(frappe.local, "ai_inventory_retrain_signals", None)
+    reset_retrain_signals()
+
+    if not pending:
+        return
+
+    try:
+        cache = frappe.cache()
+        for item_code, entry in pending.items():
+            state = cache.hget(STATE_KEY, item_code) or {"lines": 0, "error": None, "samples": 0, "baseline": None}
+            state["lines"] += entry["lines"]
+            for error in entry["errors"]:
+                state["error"] = error if state["error"] is None else (
+                    ERROR_ALPHA * error + (1 - ERROR_ALPHA) * state["error"])
+                state["samples"] += 1
+            cache.hset(STATE_KEY, item_code, state)
+
+        cache.set_value(DIRTY_KEY, 1)
+    except Exception as e:
+        frappe.logger().error(f"Retrain signal flush failed: {str(e)[:100]}")
+
+
+def needs_retraining(state):
+    """Whether an item's rolling error drifted or enough new sales arrived"""
+    if state["lines"] >= NEW_LINES_THRESHOLD:
+        return True
+
+    if state["error"] is None or state["samples"] < MIN_ERROR_SAMPLES:
+        return False
+
+    if state["baseline"]:
+        return state["error"] > state["baseline"] * DRIFT_RATIO
+    return state["error"] > MAX_ERROR
+
+
+def schedule_retraining():
+    """Enqueue one training for the items that need it, at most once per window (hourly)"""
+    try:
+        cache = frappe.cache()
+        if not cache.get_value(DIRTY_KEY):
+            return {"queued": False, "reason": "no new signals"}
+
+        last_run = flt(frappe.db.get_global(LAST_RUN_KEY))
+        if time.time() - last_run < RETRAIN_WINDOW:
+            return {"queued": False, "reason": "within retrain window"}
+
+        cache.delete_value(DIRTY_KEY)
+        states = cache.hgetall(STATE_KEY) or {}
+        item_codes = sorted(
+            item_code.decode() if isinstance(item_code, bytes) else item_code
+            for item_code, state in states.items() if needs_retraining(state)
+        )
+        if not item_codes:
+            return {"queued": False, "reason": "no drift"}
+
+        frappe.enqueue(
+            'ai_inventory.forecasting.retrain_scheduler.run_retraining',
+            item_codes=item_codes,
+            queue='long',
+            timeout=1800,
+            job_id=RETRAIN_JOB_ID,
+            deduplicate=True
+        )
+        frappe.db.set_global(LAST_RUN_KEY, str(time.time()))
+        frappe.db.commit()
+
+        log_event("sales_forecast.retrain_scheduled", items=len(item_codes))
+        return {"queued": True, "items": item_codes}
+
+    except Exception as e:
+        frappe.log_error(f"Error scheduling model retraining: {str(e)}", "AI Forecasting Trigger")
+        return {"queued": False, "error": str(e)}
+
+
+def run_retraining(item_codes):
+    """
+    Train the models of item_codes and restart their drift tracking
+
+    train_models reuses the saved encoders for a subset and falls back to
+    retraining every item when the encodings had to change.
+    """
+    from ai_inventory.forecasting.ai_sales_forecast import SalesForecastingEngine
+
+    performance = SalesForecastingEngine().train_models(item_codes=item_codes)
+
+    # Items without enough history are reset too, so they do not relaunch every window
+    cache = frappe.cache()
+    for item_code in item_codes:
+        state = cache.hget(STATE_KEY, item_code)
+        if state:
+            state.update(lines=0, baseline=state["error"], samples=0)
+            cache.hset(STATE_KEY, item_code, state)
+
+    log_event("sales_forecast.retrain_completed", items=len(item_codes),
+              trained=len(performance) if isinstance(performance, dict) and "error" not in performance else 0,
+              completed_at=now())
+    return performance
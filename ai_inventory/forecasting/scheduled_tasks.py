@@ -5,6 +5,7 @@
 import frappe
 from frappe.utils import flt, add_days, nowdate
 from ai_inventory.forecasting.core import SalesForecastingEngine
+from ai_inventory.event_log import log_event
 
 @frappe.whitelist()
 def scheduled_forecast_generation():
@@ -23,8 +24,7 @@ def scheduled_forecast_generation():
             from ai_inventory.forecasting.core import auto_create_sales_orders
             auto_create_sales_orders()
         
-        frappe.log_error(f"Scheduled forecast generation completed: {forecasts_created} forecasts", 
-                        "AI Sales Forecasting")
+        log_event("sales_forecast.scheduled_generation", forecasts_created=forecasts_created)
         
     except Exception as e:
         frappe.log_error(f"Scheduled forecast generation failed: {str(e)}", 
@@ -48,8 +48,7 @@ def scheduled_model_training():
             engine = SalesForecastingEngine()
             performance = engine.train_models()
             
-            frappe.log_error(f"Scheduled model training completed for {len(performance)} items", 
-                            "AI Sales Forecasting")
+            log_event("sales_forecast.scheduled_training", items=len(performance))
         
     except Exception as e:
         frappe.log_error(f"Scheduled model training failed: {str(e)}", 
@@ -5,23 +5,77 @@
 
 import frappe
 from frappe import _
+from frappe.utils import flt
+import hashlib
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
+from ai_inventory.instrumentation import instrument
+
+# Fields of AI Financial Forecast that feed the synced forecast doctypes
+SYNC_HASH_FIELDS = ["company", "forecast_type", "forecast_start_date", "predicted_amount",
+                    "confidence_score", "prediction_model", "forecast_details"]
+SYNC_BATCH_SIZE = 100
+SYNC_COMMIT_SIZE = 20  # forecasts per transaction within a batch
+SYNC_SAVEPOINT = "ai_forecast_sync"
+
+TARGET_DOCTYPES = {
+    "Cash Flow": "AI Cashflow Forecast",
+    "Revenue": "AI Revenue Forecast",
+    "Expense": "AI Expense Forecast"
+}
+
+def get_forecast_sync_hash(forecast):
+    """Content hash of the sync-relevant fields of an AI Financial Forecast"""
+    values = []
+    for field in SYNC_HASH_FIELDS:
+        value = forecast.get(field)
+        if isinstance(value, (int, float)):
+            values.append(f"{flt(value):.6f}")
+        else:
+            values.append(str(value or ""))
+    
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()
+
+def save_sync_hashes(sync_hashes):
+    """Record the last successfully synced hash for many forecasts in one statement"""
+    if not sync_hashes:
+        return
+    
+    names = list(sync_hashes)
+    case_sql = " ".join(["WHEN %s THEN %s"] * len(names))
+    values = [value for name in names for value in (name, sync_hashes[name])]
+    values.append(frappe.utils.now())
+    values.extend(names)
+    
+    frappe.db.sql(f"""
+        UPDATE `tabAI Financial Forecast`
+        SET sync_hash = CASE name {case_sql} END,
+            last_sync_date = %s
+        WHERE name IN ({", ".join(["%s"] * len(names))})
+    """, values)
 
 @frappe.whitelist()
-def sync_all_forecasts(company=None, forecast_start_date=None):
+@instrument("sync.financial_forecasts")
+def sync_all_forecasts(company=None, forecast_start_date=None, force=False):
     """
     Sync all forecast types with AI Financial Forecasts
     
+    Forecasts whose sync-relevant fields are unchanged since their last
+    successful sync are skipped. Changed forecasts are grouped by company
+    and processed in batches, in parallel background jobs when there is
+    more than one batch.
+    
     Args:
         company: Specific company to sync (optional)
         forecast_start_date: Specific start date to sync (optional)
+        force: Resync forecasts even when their content hash is unchanged
     
     Returns:
         Dict with sync results
     """
     try:
+        force = frappe.utils.cint(force)
         filters = {}
         if company:
             filters["company"] = company
@@ -31,60 +85,56 @@ def sync_all_forecasts(company=None, forecast_start_date=None):
         # Get all AI Financial Forecasts to sync
         financial_forecasts = frappe.get_all("AI Financial Forecast",
                                            filters=filters,
-                                           fields=["name", "company", "forecast_type", "forecast_start_date", 
-                                                  "predicted_amount", "confidence_score", "prediction_model"],
+                                           fields=["name", "sync_hash"] + SYNC_HASH_FIELDS,
                                            order_by="creation desc")
         
-        sync_results = {
-            "total_forecasts": len(financial_forecasts),
-            "synced_successfully": 0,
-            "sync_errors": 0,
-            "results_by_type": {},
-            "error_details": []
-        }
-        
+        # Only forecasts whose content changed since the last sync need work
+        changed_by_company = {}
         for forecast in financial_forecasts:
-            try:
-                result = sync_single_forecast(forecast.name)
-                
-                if result.get("success"):
-                    sync_results["synced_successfully"] += 1
-                    
-                    # Track by type
-                    ftype = forecast.forecast_type
-                    if ftype not in sync_results["results_by_type"]:
-                        sync_results["results_by_type"][ftype] = {"success": 0, "errors": 0}
-                    sync_results["results_by_type"][ftype]["success"] += 1
-                else:
-                    sync_results["sync_errors"] += 1
-                    error_msg = result.get("error", "Unknown error")
-                    sync_results["error_details"].append({
-                        "forecast_id": forecast.name,
-                        "error": error_msg
-                    })
-                    frappe.log_error(f"Sync failed for forecast {forecast.name}: {error_msg}")
-                    
-                    # Track by type
-                    ftype = forecast.forecast_type
-                    if ftype not in sync_results["results_by_type"]:
-                        sync_results["results_by_type"][ftype] = {"success": 0, "errors": 0}
-                    sync_results["results_by_type"][ftype]["errors"] += 1
-                    
-            except Exception as e:
-                sync_results["sync_errors"] += 1
-                error_msg = f"Exception during sync: {str(e)}"
-                sync_results["error_details"].append({
-                    "forecast_id": forecast.name,
-                    "error": error_msg
-                })
-                frappe.log_error(f"Sync exception for forecast {forecast.name}: {str(e)}")
+            if force or forecast.sync_hash != get_forecast_sync_hash(forecast):
+                changed_by_company.setdefault(forecast.company, []).append(forecast.name)
+        
+        batches = []
+        for forecast_ids in changed_by_company.values():
+            for i in range(0, len(forecast_ids), SYNC_BATCH_SIZE):
+                batches.append(forecast_ids[i:i + SYNC_BATCH_SIZE])
+        
+        changed_count = sum(len(batch) for batch in batches)
+        skipped_count = len(financial_forecasts) - changed_count
+        
+        if len(batches) > 1:
+            # Let the workers process company batches in parallel
+            for batch in batches:
+                frappe.enqueue(
+                    "ai_inventory.forecasting.sync_manager.sync_forecast_batch",
+                    forecast_ids=batch,
+                    queue="long",
+                    timeout=3600
+                )
+            
+            return {
+                "success": True,
+                "message": f"Queued {changed_count} changed forecasts in {len(batches)} batches. "
+                           f"{skipped_count} unchanged forecasts skipped.",
+                "results": {
+                    "total_forecasts": len(financial_forecasts),
+                    "changed_forecasts": changed_count,
+                    "skipped_unchanged": skipped_count,
+                    "queued_batches": len(batches)
+                }
+            }
+        
+        sync_results = sync_forecast_batch(batches[0] if batches else [], create_log=False)
+        sync_results["total_forecasts"] = len(financial_forecasts)
+        sync_results["skipped_unchanged"] = skipped_count
         
         # Update sync log
         create_sync_log(sync_results)
         
         return {
             "success": True,
-            "message": f"Sync completed. {sync_results['synced_successfully']}/{sync_results['total_forecasts']} forecasts synced successfully.",
+            "message": f"Sync completed. {sync_results['synced_successfully']}/{changed_count} changed forecasts synced successfully "
+                       f"({skipped_count} unchanged skipped).",
             "results": sync_results
         }
         
@@ -94,6 +144,171 @@ def sync_all_forecasts(company=None, forecast_start_date=None):
             "error": str(e)
         }
 
+@instrument("sync.financial_forecast_batch")
+def sync_forecast_batch(forecast_ids, create_log=True):
+    """
+    Sync a batch of forecasts from one company, committing every SYNC_COMMIT_SIZE
+    
+    Existing target records are looked up once for the whole batch. Each
+    forecast runs under its own savepoint, so a failed one is rolled back
+    without discarding the others, and the sync hashes of a sub-batch are
+    written in the same transaction as its target records. The target
+    records themselves are still saved through their controllers, whose
+    validate computes their derived totals and risk fields.
+    """
+    sync_results = {
+        "total_forecasts": len(forecast_ids),
+        "synced_successfully": 0,
+        "sync_errors": 0,
+        "results_by_type": {},
+        "error_details": []
+    }
+    
+    if not forecast_ids:
+        return sync_results
+    
+    frappe.flags.in_forecast_batch_sync = True
+    frappe.local.forecast_sync_context = build_sync_context(forecast_ids)
+    forecast_types = frappe.local.forecast_sync_context["forecast_types"]
+    pending_hashes = {}
+    
+    def record_error(forecast_id, error_msg):
+        sync_results["sync_errors"] += 1
+        sync_results["results_by_type"][forecast_types.get(forecast_id)]["errors"] += 1
+        sync_results["error_details"].append({
+            "forecast_id": forecast_id,
+            "error": error_msg
+        })
+    
+    def discard_transaction():
+        # The open transaction is gone, and with it the writes of every forecast
+        # synced since the last commit; their hashes stay unsaved so they sync again
+        frappe.db.rollback()
+        for forecast_id in pending_hashes:
+            sync_results["synced_successfully"] -= 1
+            sync_results["results_by_type"][forecast_types.get(forecast_id)]["success"] -= 1
+            record_error(forecast_id, "Rolled back with its sub-batch")
+        pending_hashes.clear()
+        frappe.local.forecast_sync_context = build_sync_context(forecast_ids)
+    
+    try:
+        for i, forecast_id in enumerate(forecast_ids, 1):
+            type_results = sync_results["results_by_type"].setdefault(
+                forecast_types.get(forecast_id), {"success": 0, "errors": 0})
+            frappe.db.savepoint(SYNC_SAVEPOINT)
+            
+            try:
+                result = sync_single_forecast(forecast_id)
+            except Exception as e:
+                result = {"success": False, "error": f"Exception during sync: {str(e)}"}
+            
+            if result.get("success"):
+                try:
+                    frappe.db.release_savepoint(SYNC_SAVEPOINT)
+                except Exception:
+                    # Savepoints vanish when the database aborts the transaction itself
+                    record_error(forecast_id, "Transaction aborted during sync")
+                    discard_transaction()
+                    continue
+                
+                sync_results["synced_successfully"] += 1
+                type_results["success"] += 1
+                pending_hashes[forecast_id] = result.get("sync_hash")
+            else:
+                error_msg = result.get("error", "Unknown error")
+                record_error(forecast_id, error_msg)
+                frappe.log_error(f"Sync failed for forecast {forecast_id}: {error_msg}")
+                
+                try:
+                    frappe.db.rollback(save_point=SYNC_SAVEPOINT)
+                    # Targets created under the savepoint no longer exist
+                    frappe.local.forecast_sync_context = build_sync_context(forecast_ids)
+                except Exception:
+                    discard_transaction()
+            
+            if i % SYNC_COMMIT_SIZE == 0 or i == len(forecast_ids):
+                save_sync_hashes({name: value for name, value in pending_hashes.items() if value})
+                frappe.db.commit()
+                pending_hashes.clear()
+        
+    finally:
+        frappe.flags.in_forecast_batch_sync = False
+        frappe.local.forecast_sync_context = None
+    
+    if create_log:
+        create_sync_log(sync_results)
+    
+    return sync_results
+
+def build_sync_context(forecast_ids):
+    """Preload the lookups a batch of forecast syncs would otherwise repeat per record"""
+    forecasts = frappe.get_all("AI Financial Forecast",
+                              filters={"name": ["in", forecast_ids]},
+                              fields=["name", "company", "forecast_type", "forecast_start_date"])
+    
+    context = {
+        "forecast_types": {f.name: f.forecast_type for f in forecasts},
+        "targets": {},
+        "accuracy_tracked": set(),
+        "inventory": {}
+    }
+    
+    # Existing cashflow/revenue/expense records keyed by (company, forecast_date)
+    for forecast_type, doctype in TARGET_DOCTYPES.items():
+        keys = {(f.company, f.forecast_start_date) for f in forecasts if f.forecast_type == forecast_type}
+        context["targets"][doctype] = {}
+        if not keys:
+            continue
+        
+        existing = frappe.get_all(doctype,
+                                 filters={
+                                     "company": ["in", list({k[0] for k in keys})],
+                                     "forecast_date": ["in", list({k[1] for k in keys})]
+                                 },
+                                 fields=["name", "company", "forecast_date"],
+                                 order_by="creation asc")
+        for row in existing:
+            context["targets"][doctype].setdefault((row.company, str(row.forecast_date)), row.name)
+    
+    # Accuracy records already created for these forecasts
+    context["accuracy_tracked"] = {
+        (row.forecast_reference, str(row.measurement_date))
+        for row in frappe.get_all("AI Forecast Accuracy",
+                                  filters={"forecast_reference": ["in", forecast_ids]},
+                                  fields=["forecast_reference", "measurement_date"])
+    }
+    
+    return context
+
+def get_sync_context():
+    """Batch lookup context, or None outside sync_forecast_batch"""
+    return getattr(frappe.local, "forecast_sync_context", None)
+
+def find_existing_target(doctype, company, forecast_date):
+    """Find the target record for a forecast, using the batch context when available"""
+    context = get_sync_context()
+    if context is not None:
+        return context["targets"].get(doctype, {}).get((company, str(forecast_date)))
+    
+    existing = frappe.get_all(doctype,
+                            filters={
+                                "company": company,
+                                "forecast_date": forecast_date
+                            },
+                            limit=1)
+    return existing[0].name if existing else None
+
+def remember_target(doctype, company, forecast_date, name):
+    """Register a newly created target record in the batch context"""
+    context = get_sync_context()
+    if context is not None:
+        context["targets"].setdefault(doctype, {})[(company, str(forecast_date))] = name
+
+def commit_sync():
+    """Commit now unless a batch sync will commit its sub-batch"""
+    if not frappe.flags.in_forecast_batch_sync:
+        frappe.db.commit()
+
 @frappe.whitelist()
 def sync_single_forecast(financial_forecast_id):
     """
@@ -113,6 +328,7 @@ def sync_single_forecast(financial_forecast_id):
             "success": True,
             "forecast_id": financial_forecast_id,
             "forecast_type": forecast_doc.forecast_type,
+            "sync_hash": get_forecast_sync_hash(forecast_doc),
             "synced_to": [],
             "errors": []
         }
@@ -164,7 +380,8 @@ def sync_single_forecast(financial_forecast_id):
                     "message": result.get("message", "")
                 }
                 # Update the related inventory forecast field
-                if result.get("inventory_forecast_id"):
+                if result.get("inventory_forecast_id") and \
+                        result.get("inventory_forecast_id") != forecast_doc.related_inventory_forecast:
                     try:
                         # Get a fresh copy to avoid modification conflicts
                         fresh_doc = frappe.get_doc("AI Financial Forecast", forecast_doc.name)
@@ -201,6 +418,11 @@ def sync_single_forecast(financial_forecast_id):
                 error_summary = error_summary[:120] + "..."
             sync_result["error"] = error_summary
         
+        # Remember what was synced; batch syncs write all hashes at once
+        if sync_result["success"] and not frappe.flags.in_forecast_batch_sync:
+            frappe.db.set_value("AI Financial Forecast", financial_forecast_id,
+                                "sync_hash", sync_result["sync_hash"], update_modified=False)
+        
         return sync_result
         
     except Exception as e:
@@ -217,16 +439,11 @@ def sync_to_cashflow(forecast_doc):
             return {"success": False, "error": "Not a cash flow forecast"}
         
         # Check if exists - use forecast_start_date for comparison
-        existing = frappe.get_all("AI Cashflow Forecast",
-                                filters={
-                                    "company": forecast_doc.company,
-                                    "forecast_date": forecast_doc.forecast_start_date
-                                },
-                                limit=1)
+        existing = find_existing_target("AI Cashflow Forecast", forecast_doc.company, forecast_doc.forecast_start_date)
         
         if existing:
             # Update existing
-            cashflow_doc = frappe.get_doc("AI Cashflow Forecast", existing[0].name)
+            cashflow_doc = frappe.get_doc("AI Cashflow Forecast", existing)
         else:
             # Create new
             cashflow_doc = frappe.get_doc({
@@ -273,8 +490,9 @@ def sync_to_cashflow(forecast_doc):
         else:
             cashflow_doc.flags.ignore_permissions = True
             cashflow_doc.insert()
+            remember_target("AI Cashflow Forecast", forecast_doc.company, forecast_doc.forecast_start_date, cashflow_doc.name)
         
-        frappe.db.commit()
+        commit_sync()
         
         return {
             "success": True,
@@ -347,16 +565,11 @@ def sync_to_revenue(forecast_doc):
             return {"success": False, "error": "Not a revenue forecast"}
         
         # Check if exists - use forecast_start_date for comparison
-        existing = frappe.get_all("AI Revenue Forecast",
-                                filters={
-                                    "company": forecast_doc.company,
-                                    "forecast_date": forecast_doc.forecast_start_date
-                                },
-                                limit=1)
+        existing = find_existing_target("AI Revenue Forecast", forecast_doc.company, forecast_doc.forecast_start_date)
         
         if existing:
             # Update existing
-            revenue_doc = frappe.get_doc("AI Revenue Forecast", existing[0].name)
+            revenue_doc = frappe.get_doc("AI Revenue Forecast", existing)
         else:
             # Create new
             revenue_doc = frappe.get_doc({
@@ -410,8 +623,9 @@ def sync_to_revenue(forecast_doc):
         else:
             revenue_doc.flags.ignore_permissions = True
             revenue_doc.insert()
+            remember_target("AI Revenue Forecast", forecast_doc.company, forecast_doc.forecast_start_date, revenue_doc.name)
         
-        frappe.db.commit()
+        commit_sync()
         
         return {
             "success": True,
@@ -431,16 +645,11 @@ def sync_to_expense(forecast_doc):
             return {"success": False, "error": "Not an expense forecast"}
         
         # Check if exists - use forecast_start_date for comparison
-        existing = frappe.get_all("AI Expense Forecast",
-                                filters={
-                                    "company": forecast_doc.company,
-                                    "forecast_date": forecast_doc.forecast_start_date
-                                },
-                                limit=1)
+        existing = find_existing_target("AI Expense Forecast", forecast_doc.company, forecast_doc.forecast_start_date)
         
         if existing:
             # Update existing
-            expense_doc = frappe.get_doc("AI Expense Forecast", existing[0].name)
+            expense_doc = frappe.get_doc("AI Expense Forecast", existing)
         else:
             # Create new - ensure all required fields are set
             expense_data = {
@@ -494,8 +703,9 @@ def sync_to_expense(forecast_doc):
         else:
             expense_doc.flags.ignore_permissions = True
             expense_doc.insert()
+            remember_target("AI Expense Forecast", forecast_doc.company, forecast_doc.forecast_start_date, expense_doc.name)
         
-        frappe.db.commit()
+        commit_sync()
         
         return {
             "success": True,
@@ -508,6 +718,92 @@ def sync_to_expense(forecast_doc):
         frappe.log_error(f"Expense sync error for forecast {forecast_doc.name}: {str(e)}")
         return {"success": False, "error": f"Expense sync failed: {str(e)}"}
 
+def get_inventory_sync_candidates(company, forecast_type):
+    """Default warehouse and impacted items for a company, memoized per sync batch"""
+    context = get_sync_context()
+    cache_key = (company, forecast_type)
+    if context is not None and cache_key in context["inventory"]:
+        return context["inventory"][cache_key]
+    
+    # Get items that might be impacted by this financial forecast
+    items_to_forecast = []
+    
+    # Get default warehouse for the company
+    default_warehouse = None
+    
+    # Try to get warehouse from company settings first
+    try:
+        company_doc = frappe.get_doc("Company", company)
+        # Check if company has a default warehouse field
+        if hasattr(company_doc, 'default_warehouse') and company_doc.default_warehouse:
+            default_warehouse = company_doc.default_warehouse
+    except Exception:
+        pass
+    
+    # If no default warehouse found, get the first available warehouse for the company
+    if not default_warehouse:
+        warehouses = frappe.get_all("Warehouse", 
+                                  filters={"company": company, "disabled": 0},
+                                  fields=["name"],
+                                  order_by="creation asc",
+                                  limit=1)
+        if warehouses:
+            default_warehouse = warehouses[0].name
+    
+    if forecast_type == "Revenue":
+        # For revenue forecasts, find top-selling items
+        items_to_forecast = frappe.db.sql("""
+            SELECT DISTINCT si_item.item_code, si_item.item_name,
+                   SUM(si_item.amount) as total_revenue,
+                   AVG(si_item.qty) as avg_qty
+            FROM `tabSales Invoice Item` si_item
+            INNER JOIN `tabSales Invoice` si ON si.name = si_item.parent
+            WHERE si.company = %s 
+            AND si.posting_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
+            AND si.docstatus = 1
+            GROUP BY si_item.item_code
+            ORDER BY total_revenue DESC
+            LIMIT 10
+        """, (company,), as_dict=True)
+        
+    elif forecast_type == "Expense":
+        # For expense forecasts, find high-cost purchase items
+        items_to_forecast = frappe.db.sql("""
+            SELECT DISTINCT pi_item.item_code, pi_item.item_name,
+                   SUM(pi_item.amount) as total_cost,
+                   AVG(pi_item.qty) as avg_qty
+            FROM `tabPurchase Invoice Item` pi_item
+            INNER JOIN `tabPurchase Invoice` pi ON pi.name = pi_item.parent
+            WHERE pi.company = %s 
+            AND pi.posting_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
+            AND pi.docstatus = 1
+            GROUP BY pi_item.item_code
+            ORDER BY total_cost DESC
+            LIMIT 10
+        """, (company,), as_dict=True)
+        
+    elif forecast_type == "Cash Flow":
+        # For cash flow forecasts, find items with high inventory value
+        items_to_forecast = frappe.db.sql("""
+            SELECT DISTINCT sle.item_code, item.item_name,
+                   SUM(ABS(sle.actual_qty * sle.valuation_rate)) as inventory_value,
+                   AVG(ABS(sle.actual_qty)) as avg_movement
+            FROM `tabStock Ledger Entry` sle
+            INNER JOIN `tabItem` item ON item.name = sle.item_code
+            WHERE sle.company = %s 
+            AND sle.posting_date >= DATE_SUB(CURDATE(), INTERVAL 1 MONTH)
+            GROUP BY sle.item_code
+            HAVING inventory_value > 1000
+            ORDER BY inventory_value DESC
+            LIMIT 5
+        """, (company,), as_dict=True)
+    
+    candidates = (default_warehouse, items_to_forecast)
+    if context is not None:
+        context["inventory"][cache_key] = candidates
+    
+    return candidates
+
 def sync_to_inventory_forecast(financial_forecast):
     """
     Sync AI Financial Forecast to AI Inventory Forecast
@@ -519,83 +815,16 @@ def sync_to_inventory_forecast(financial_forecast):
             # If it's a string, get the document
             financial_forecast = frappe.get_doc("AI Financial Forecast", financial_forecast)
         
-        # Get items that might be impacted by this financial forecast
-        items_to_forecast = []
-        
-        # Get default warehouse for the company
-        default_warehouse = None
-        
-        # Try to get warehouse from company settings first
-        try:
-            company_doc = frappe.get_doc("Company", financial_forecast.company)
-            # Check if company has a default warehouse field
-            if hasattr(company_doc, 'default_warehouse') and company_doc.default_warehouse:
-                default_warehouse = company_doc.default_warehouse
-        except Exception:
-            pass
+        # Get default warehouse and items that might be impacted by this financial forecast
+        default_warehouse, items_to_forecast = get_inventory_sync_candidates(
+            financial_forecast.company, financial_forecast.forecast_type
+        )
         
-        # If no default warehouse found, get the first available warehouse for the company
         if not default_warehouse:
-            warehouses = frappe.get_all("Warehouse", 
-                                      filters={"company": financial_forecast.company, "disabled": 0},
-                                      fields=["name"],
-                                      order_by="creation asc",
-                                      limit=1)
-            if warehouses:
-                default_warehouse = warehouses[0].name
-            else:
-                return {
-                    "success": False,
-                    "error": f"No warehouse found for company {financial_forecast.company}. Please create a warehouse first."
-                }
-        
-        if financial_forecast.forecast_type == "Revenue":
-            # For revenue forecasts, find top-selling items
-            items_to_forecast = frappe.db.sql("""
-                SELECT DISTINCT si_item.item_code, si_item.item_name,
-                       SUM(si_item.amount) as total_revenue,
-                       AVG(si_item.qty) as avg_qty
-                FROM `tabSales Invoice Item` si_item
-                INNER JOIN `tabSales Invoice` si ON si.name = si_item.parent
-                WHERE si.company = %s 
-                AND si.posting_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
-                AND si.docstatus = 1
-                GROUP BY si_item.item_code
-                ORDER BY total_revenue DESC
-                LIMIT 10
-            """, (financial_forecast.company,), as_dict=True)
-            
-        elif financial_forecast.forecast_type == "Expense":
-            # For expense forecasts, find high-cost purchase items
-            items_to_forecast = frappe.db.sql("""
-                SELECT DISTINCT pi_item.item_code, pi_item.item_name,
-                       SUM(pi_item.amount) as total_cost,
-                       AVG(pi_item.qty) as avg_qty
-                FROM `tabPurchase Invoice Item` pi_item
-                INNER JOIN `tabPurchase Invoice` pi ON pi.name = pi_item.parent
-                WHERE pi.company = %s 
-                AND pi.posting_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
-                AND pi.docstatus = 1
-                GROUP BY pi_item.item_code
-                ORDER BY total_cost DESC
-                LIMIT 10
-            """, (financial_forecast.company,), as_dict=True)
-            
-        elif financial_forecast.forecast_type == "Cash Flow":
-            # For cash flow forecasts, find items with high inventory value
-            items_to_forecast = frappe.db.sql("""
-                SELECT DISTINCT sle.item_code, item.item_name,
-                       SUM(ABS(sle.actual_qty * sle.valuation_rate)) as inventory_value,
-                       AVG(ABS(sle.actual_qty)) as avg_movement
-                FROM `tabStock Ledger Entry` sle
-                INNER JOIN `tabItem` item ON item.name = sle.item_code
-                WHERE sle.company = %s 
-                AND sle.posting_date >= DATE_SUB(CURDATE(), INTERVAL 1 MONTH)
-                GROUP BY sle.item_code
-                HAVING inventory_value > 1000
-                ORDER BY inventory_value DESC
-                LIMIT 5
-            """, (financial_forecast.company,), as_dict=True)
+            return {
+                "success": False,
+                "error": f"No warehouse found for company {financial_forecast.company}. Please create a warehouse first."
+            }
         
         if not items_to_forecast:
             return {
@@ -721,12 +950,17 @@ def create_accuracy_tracking(forecast_doc):
     """Create accuracy tracking record"""
     try:
         # Check if accuracy record exists
-        existing = frappe.get_all("AI Forecast Accuracy",
-                                filters={
-                                    "forecast_reference": forecast_doc.name,
-                                    "measurement_date": forecast_doc.forecast_start_date
-                                },
-                                limit=1)
+        context = get_sync_context()
+        accuracy_key = (forecast_doc.name, str(forecast_doc.forecast_start_date))
+        if context is not None:
+            existing = accuracy_key in context["accuracy_tracked"]
+        else:
+            existing = frappe.get_all("AI Forecast Accuracy",
+                                    filters={
+                                        "forecast_reference": forecast_doc.name,
+                                        "measurement_date": forecast_doc.forecast_start_date
+                                    },
+                                    limit=1)
         
         if existing:
             return {"success": True, "action": "already_exists"}
@@ -756,7 +990,9 @@ def create_accuracy_tracking(forecast_doc):
         
         accuracy_doc.flags.ignore_permissions = True
         accuracy_doc.insert()
-        frappe.db.commit()
+        if context is not None:
+            context["accuracy_tracked"].add(accuracy_key)
+        commit_sync()
         
         return {
             "success": True,
@@ -774,7 +1010,8 @@ def create_sync_log(sync_results, forecast_reference=None):
         # Calculate success rate
         total = sync_results.get("total_forecasts", 0)
         successful = sync_results.get("synced_successfully", 0)
-        success_rate = (successful / total * 100) if total > 0 else 0
+        attempted = total - sync_results.get("skipped_unchanged", 0)
+        success_rate = (successful / attempted * 100) if attempted > 0 else 100 if total > 0 else 0
         
         log_doc = frappe.get_doc({
             "doctype": "AI Forecast Sync Log",
@@ -784,7 +1021,8 @@ def create_sync_log(sync_results, forecast_reference=None):
             "sync_timestamp": frappe.utils.now(),
             "sync_type": "Manual Sync",  # Default to Manual Sync
             "sync_status": "Completed" if total > 0 and sync_results.get("sync_errors", 0) == 0 else "Failed",
-            "sync_message": f"Sync completed. {successful} successful, {sync_results.get('sync_errors', 0)} failed.",
+            "sync_message": f"Sync completed. {successful} successful, {sync_results.get('sync_errors', 0)} failed, "
+                            f"{sync_results.get('skipped_unchanged', 0)} unchanged skipped.",
             "sync_duration": sync_results.get("sync_duration", 0),
             "total_items": total,
             "successful_items": successful,
@@ -4,6 +4,8 @@
 
 import frappe
 from frappe.utils import nowdate, add_days
+from ai_inventory.event_log import log_event
+from ai_inventory.forecasting.retrain_scheduler import collect_retrain_signal
 
 def on_sales_invoice_submit(doc, method):
     """Trigger when sales invoice is submitted"""
@@ -12,8 +14,8 @@ def on_sales_invoice_submit(doc, method):
         for item in doc.items:
             update_forecast_accuracy(item.item_code, doc.customer, doc.posting_date, item.qty)
             
-        # Check if we need to retrain models
-        check_retrain_trigger()
+            # New sales count towards retraining; schedule_retraining decides when
+            collect_retrain_signal(item.item_code, new_lines=1)
         
     except Exception as e:
         frappe.log_error(f"Error in sales invoice trigger: {str(e)}", "AI Forecasting Trigger")
@@ -60,7 +62,9 @@ def update_forecast_accuracy(item_code, customer, posting_date, actual_qty):
             })
             
             # Log the accuracy for monitoring
-            frappe.log_error(f"Forecast accuracy: {accuracy:.1f}% for {item_code}", "AI Forecast Accuracy")
+            log_event("forecast.accuracy", item_code=item_code, customer=customer, forecast=forecast['name'],
+                      predicted=predicted, actual=actual_qty, accuracy=round(accuracy, 1))
+            collect_retrain_signal(item_code, error=100 - accuracy)
             
     except Exception as e:
         frappe.log_error(f"Error updating forecast accuracy: {str(e)}", "AI Forecasting Trigger")
@@ -107,26 +111,3 @@ def update_forecast_processing_status(sales_order):
                 
     except Exception as e:
         frappe.log_error(f"Error updating forecast processing status: {str(e)}", "AI Forecasting Trigger")
-
-def check_retrain_trigger():
-    """Check if models need retraining based on activity"""
-    try:
-        config = frappe.get_single("AI Sales Dashboard")
-        
-        # Count total forecasts in last 30 days
-        total_forecasts = frappe.db.sql("""
-            SELECT COUNT(*) as total
-            FROM `tabAI Sales Forecast`
-            WHERE forecast_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-        """)
-        
-        if total_forecasts and total_forecasts[0][0] > 100:  # If many forecasts, schedule retraining
-            # Schedule retraining
-            frappe.enqueue('ai_inventory.forecasting.ai_sales_forecast.train_models',
-                         queue='long',
-                         timeout=1800)
-            frappe.log_error("Scheduled model retraining due to high forecast activity", "AI Forecasting")
-            
-    except Exception as e:
-        frappe.log_error(f"Error checking retrain trigger: {str(e)}", "AI Forecasting Trigger")
-
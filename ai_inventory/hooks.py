@@ -14,10 +14,24 @@ doc_events = {
         "on_submit": "ai_inventory.hooks_handlers.on_stock_ledger_entry_submit_safe"
     },
     "Purchase Order": {
-        "on_submit": "ai_inventory.hooks_handlers.on_purchase_order_submit_safe"
+        "on_submit": [
+            "ai_inventory.hooks_handlers.on_purchase_order_submit_safe",
+            "ai_inventory.supplier_stats.on_purchase_order_submit",
+            "ai_inventory.supplier_ranking.on_purchase_order_submit",
+            "ai_inventory.price_prediction.on_purchase_order_submit"
+        ],
+        "on_cancel": [
+            "ai_inventory.supplier_stats.on_purchase_order_cancel",
+            "ai_inventory.supplier_ranking.on_purchase_order_cancel",
+            "ai_inventory.price_prediction.on_purchase_order_cancel"
+        ]
     },
     "Purchase Receipt": {
-        "on_submit": "ai_inventory.hooks_handlers.on_purchase_receipt_submit_safe"
+        "on_submit": [
+            "ai_inventory.hooks_handlers.on_purchase_receipt_submit_safe",
+            "ai_inventory.supplier_stats.on_purchase_receipt_submit"
+        ],
+        "on_cancel": "ai_inventory.supplier_stats.on_purchase_receipt_cancel"
     },
     "Item": {
         "after_insert": "ai_inventory.hooks_handlers.on_item_after_insert_safe",
@@ -27,8 +41,19 @@ doc_events = {
         "after_insert": "ai_inventory.hooks_handlers.on_warehouse_after_insert_safe"
     },
     "AI Inventory Forecast": {
-        "validate": "ai_inventory.hooks_handlers.validate_ai_inventory_forecast_safe",
-        "on_save": "ai_inventory.hooks_handlers.on_ai_inventory_forecast_save_safe"
+        "validate": [
+            "ai_inventory.hooks_handlers.validate_ai_inventory_forecast_safe",
+            "ai_inventory.behavior_segmentation.assign_forecast_segment"
+        ],
+        "on_save": "ai_inventory.hooks_handlers.on_ai_inventory_forecast_save_safe",
+        "on_update": [
+            "ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact.on_inventory_forecast_update",
+            "ai_inventory.stock_alerts.clear_threshold_cache"
+        ],
+        "on_trash": [
+            "ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact.on_inventory_forecast_trash",
+            "ai_inventory.stock_alerts.clear_threshold_cache"
+        ]
     },
     "Bin": {
         "on_update": "ai_inventory.hooks_handlers.on_bin_update_safe"
@@ -40,8 +65,14 @@ doc_events = {
         "on_submit": "ai_inventory.forecasting.triggers.on_sales_order_submit"
     },
     "Sales Invoice": {
-        "on_submit": "ai_inventory.forecasting.triggers.on_sales_invoice_submit",
-        "on_cancel": "ai_inventory.forecasting.triggers.on_sales_invoice_cancel"
+        "on_submit": [
+            "ai_inventory.forecasting.triggers.on_sales_invoice_submit",
+            "ai_inventory.ai_accounts_forecast.data_pipeline.revenue_cube.on_sales_invoice_submit"
+        ],
+        "on_cancel": [
+            "ai_inventory.forecasting.triggers.on_sales_invoice_cancel",
+            "ai_inventory.ai_accounts_forecast.data_pipeline.revenue_cube.on_sales_invoice_cancel"
+        ]
     },
     # Financial Forecasting Integration
     "AI Financial Forecast": {
@@ -65,32 +96,36 @@ doc_events = {
 
 # Scheduled Tasks
 scheduler_events = {
-    # Real-time monitoring (every 5 minutes)
-    "cron": {
-        "*/5 * * * *": [
-            "ai_inventory.scheduled_tasks.real_time_stock_monitor"
-        ]
-    },
-    
     # Hourly tasks
     "hourly": [
         "ai_inventory.scheduled_tasks.hourly_critical_stock_check",
         "ai_inventory.scheduled_tasks.check_financial_alerts",
-        "ai_inventory.hooks_handlers.process_forecast_update_queue"
+        "ai_inventory.hooks_handlers.process_forecast_update_queue",
+        "ai_inventory.instrumentation.persist_metrics",
+        "ai_inventory.forecasting.retrain_scheduler.schedule_retraining"
     ],
     
     # Daily tasks (6 AM)
     "daily": [
+        "ai_inventory.lead_time_metrics.rebuild_lead_time_metrics",
         "ai_inventory.scheduled_tasks.daily_ai_forecast",
         "ai_inventory.hooks_handlers.daily_create_missing_forecasts",
+        "ai_inventory.supplier_stats.rebuild_supplier_stats",
+        "ai_inventory.supplier_ranking.rebuild_supplier_ranking",
         "ai_inventory.ml_supplier_analyzer.daily_ml_supplier_analysis",
-        "ai_inventory.ai_accounts_forecast.scheduler.forecast_scheduler.daily_forecast_update"
+        "ai_inventory.behavior_segmentation.update_item_segments",
+        "ai_inventory.abc_xyz_classification.classify_inventory",
+        "ai_inventory.ai_accounts_forecast.scheduler.forecast_scheduler.daily_forecast_update",
+        "ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact.rebuild_inventory_impact_summary",
+        "ai_inventory.ai_accounts_forecast.data_pipeline.revenue_cube.rebuild_revenue_cube"
     ],
     
     # Weekly tasks (Sunday 7 AM)
     "weekly": [
         "ai_inventory.scheduled_tasks.weekly_forecast_analysis",
         "ai_inventory.ml_supplier_analyzer.weekly_supplier_segmentation",
+        "ai_inventory.price_prediction.rebuild_price_history",
+        "ai_inventory.behavior_segmentation.refit_item_segments",
         "ai_inventory.ai_accounts_forecast.scheduler.forecast_scheduler.weekly_health_check"
     ],
     
@@ -102,6 +137,13 @@ scheduler_events = {
     ]
 }
 
+# Cache keys holding state rather than derived data, kept across bench clear-cache and migrate
+persistent_cache_keys = [
+    "ai_inventory_stock_alert_state*",
+    "ai_inventory_metric_batches*",
+    "ai_inventory_retrain_*"
+]
+
 # Installation Hooks - CRITICAL: This ensures packages are installed BEFORE DocType creation
 before_install = "ai_inventory.install.before_install"
 after_install = "ai_inventory.install.after_install"
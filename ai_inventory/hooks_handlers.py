@@ -6,15 +6,151 @@ from frappe.utils import now, nowdate, add_days, flt
 import json
 import time
 import os
+from ai_inventory.forecast_generator import (
+    create_missing_forecasts,
+    enqueue_missing_forecast_generation,
+    generate_missing_forecasts
+)
+from ai_inventory.stock_alerts import evaluate_stock_alerts
+from ai_inventory.instrumentation import instrument
+from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import apply_forecasts_impact
+
+HOOKS_FLAG_TTL = 30  # seconds between checks of the disable flag file
+SIGNIFICANT_MOVEMENT_QTY = 10  # net movement per transaction that triggers a forecast rerun
+PAIR_CONDITIONS = """
+    f.item_code IN %(item_codes)s
+    AND f.warehouse IN %(warehouses)s
+    AND (f.item_code, f.warehouse) IN %(pairs)s
+"""
+
+_hooks_enabled_cache = {}
 
 def check_hooks_enabled():
-    """Check if AI hooks are temporarily disabled"""
+    """Check if AI hooks are temporarily disabled
+    
+    The flag file is looked up at most once every HOOKS_FLAG_TTL seconds per
+    site and process instead of on every document event.
+    """
     try:
-        flag_file = frappe.get_site_path("ai_hooks_disabled.flag")
-        return not os.path.exists(flag_file)
+        site = getattr(frappe.local, "site", None)
+        cached = _hooks_enabled_cache.get(site)
+        if cached and time.monotonic() - cached[0] < HOOKS_FLAG_TTL:
+            return cached[1]
+        
+        enabled = not os.path.exists(frappe.get_site_path("ai_hooks_disabled.flag"))
+        _hooks_enabled_cache[site] = (time.monotonic(), enabled)
+        return enabled
     except:
         return True
 
+def clear_hooks_enabled_cache():
+    """Forget the memoized disable flag, e.g. right after toggling it"""
+    _hooks_enabled_cache.clear()
+
+# =============================================================================
+# STOCK MOVEMENT BATCHING
+# =============================================================================
+
+def collect_stock_movement(item_code, warehouse, qty_change=0):
+    """Record a touched (item, warehouse) pair for the current transaction
+    
+    Movements are summed per pair, and a single flush is registered to run
+    after the transaction commits, so a stock document with hundreds of rows
+    costs one set-based update instead of hundreds of lookups and commits.
+    """
+    if not item_code or not warehouse:
+        return
+    
+    pending = getattr(frappe.local, "ai_inventory_stock_movements", None)
+    
+    if pending is None:
+        pending = frappe.local.ai_inventory_stock_movements = {}
+        frappe.db.after_commit.add(flush_stock_movements)
+        frappe.db.after_rollback.add(reset_stock_movements)
+    
+    pending[(item_code, warehouse)] = pending.get((item_code, warehouse), 0) + flt(qty_change)
+
+def reset_stock_movements():
+    """Discard movements collected in a transaction that was rolled back"""
+    frappe.local.ai_inventory_stock_movements = None
+
+@instrument("hooks.flush_stock_movements")
+def flush_stock_movements():
+    """Refresh current stock of all touched forecasts, queue reruns for significant movements
+    and push critical stock alerts for pairs that crossed their reorder threshold"""
+    pending = getattr(frappe.local, "ai_inventory_stock_movements", None)
+    reset_stock_movements()
+    
+    if not pending:
+        return
+    
+    try:
+        # Pairs that received stock for the first time get their forecast here
+        create_missing_forecasts(pairs=list(pending))
+        update_forecast_stock(list(pending))
+        
+        significant = [pair for pair, qty_change in pending.items() if abs(qty_change) > SIGNIFICANT_MOVEMENT_QTY]
+        if significant:
+            for forecast_name in get_forecast_names(significant):
+                queue_forecast_update(forecast_name, delay=2)
+        
+        frappe.db.commit()
+        
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.logger().error(f"AI Forecast stock refresh failed: {str(e)[:100]}")
+    
+    try:
+        evaluate_stock_alerts(list(pending))
+    except Exception as e:
+        frappe.logger().error(f"Critical stock alert check failed: {str(e)[:100]}")
+
+def update_forecast_stock(pairs):
+    """Copy Bin actual_qty into the forecasts of the given (item, warehouse) pairs
+    
+    Matches forecasts of the warehouse's company as well as forecasts without
+    a company, like the per-row update this replaces.
+    """
+    timestamp = now()
+    for start in range(0, len(pairs), 500):
+        chunk = pairs[start:start + 500]
+        values = {
+            "now": timestamp,
+            "item_codes": list({pair[0] for pair in chunk}),
+            "warehouses": list({pair[1] for pair in chunk}),
+            "pairs": [tuple(pair) for pair in chunk]
+        }
+        
+        # Move the chunk's inventory impact across the stock change
+        apply_forecasts_impact(PAIR_CONDITIONS, values, sign=-1)
+        frappe.db.sql("""
+            UPDATE `tabAI Inventory Forecast` f
+            INNER JOIN `tabWarehouse` w ON w.name = f.warehouse
+            LEFT JOIN `tabBin` b ON b.item_code = f.item_code AND b.warehouse = f.warehouse
+            SET f.current_stock = IFNULL(b.actual_qty, 0),
+                f.modified = %(now)s
+            WHERE f.item_code IN %(item_codes)s
+            AND f.warehouse IN %(warehouses)s
+            AND (f.item_code, f.warehouse) IN %(pairs)s
+            AND (f.company = w.company OR IFNULL(f.company, '') = '')
+        """, values)
+        apply_forecasts_impact(PAIR_CONDITIONS, values)
+
+def get_forecast_names(pairs):
+    """Forecast names for (item, warehouse) pairs from one query"""
+    pairs = [tuple(pair) for pair in pairs]
+    return frappe.db.sql_list("""
+        SELECT name
+        FROM `tabAI Inventory Forecast`
+        WHERE item_code IN %(item_codes)s
+        AND warehouse IN %(warehouses)s
+        AND (item_code, warehouse) IN %(pairs)s
+    """, {
+        "item_codes": list({pair[0] for pair in pairs}),
+        "warehouses": list({pair[1] for pair in pairs}),
+        "pairs": pairs
+    })
+
 # =============================================================================
 # MAIN HOOK FUNCTIONS - THREAD SAFE VERSIONS
 # =============================================================================
@@ -32,62 +168,23 @@ def on_stock_ledger_entry_submit_safe(doc, method):
 def on_stock_ledger_entry_submit(doc, method):
     """
     Triggered when Stock Ledger Entry is submitted
-    Updates AI Inventory Forecast records for affected items - THREAD SAFE
+    Collects the movement; forecasts are refreshed once after commit
     """
     try:
         # Skip if in bulk operation or hooks disabled
         if frappe.flags.in_bulk_operation or not check_hooks_enabled():
             return
-            
-        # Get company from warehouse
-        warehouse_company = frappe.db.get_value("Warehouse", doc.warehouse, "company")
         
-        # Use safe forecast update to avoid document conflicts
-        safe_forecast_update_from_stock_entry(doc.item_code, doc.warehouse, warehouse_company, doc.actual_qty)
+        collect_stock_movement(doc.item_code, doc.warehouse, doc.actual_qty)
         
     except Exception as e:
         # Use simple logging to avoid cascade errors
         frappe.logger().error(f"AI Forecast update failed on stock movement: {str(e)[:100]}")
 
 def safe_forecast_update_from_stock_entry(item_code, warehouse, company, qty_change):
-    """Thread-safe forecast update from stock entry"""
+    """Thread-safe forecast update from stock entry, deferred to the end of the transaction"""
     try:
-        # Check if there's an AI Inventory Forecast for this item-warehouse-company combo
-        forecast_name = frappe.db.exists("AI Inventory Forecast", {
-            "item_code": item_code,
-            "warehouse": warehouse,
-            "company": company
-        })
-        
-        # Also check for forecasts without company set
-        if not forecast_name:
-            forecast_name = frappe.db.exists("AI Inventory Forecast", {
-                "item_code": item_code,
-                "warehouse": warehouse,
-                "company": ["in", [None, ""]]
-            })
-        
-        if forecast_name:
-            # Update current stock using direct SQL to avoid document conflicts
-            frappe.db.sql("""
-                UPDATE `tabAI Inventory Forecast`
-                SET current_stock = (
-                    SELECT COALESCE(b.actual_qty, 0)
-                    FROM `tabBin` b
-                    WHERE b.item_code = %s AND b.warehouse = %s
-                ),
-                modified = %s
-                WHERE name = %s
-            """, (item_code, warehouse, now(), forecast_name))
-            
-            # If it's a significant movement, queue forecast update
-            if abs(qty_change) > 10:  # Configurable threshold
-                queue_forecast_update(forecast_name, delay=2)  # 2 second delay
-            
-            frappe.db.commit()
-            
-        frappe.logger().info(f"Safe AI Forecast updated for {item_code} in {company}")
-        
+        collect_stock_movement(item_code, warehouse, qty_change)
     except Exception as e:
         frappe.logger().error(f"Safe forecast update failed: {str(e)[:100]}")
 
@@ -136,71 +233,54 @@ def on_item_after_insert(doc, method):
             queue_item_forecast_creation(doc.name)
             return
         
-        # Create forecasts for all active warehouses
-        created_count = create_forecasts_for_new_item(doc.name)
-        
-        if created_count > 0:
-            frappe.logger().info(f"Created {created_count} AI Forecasts for new item: {doc.name}")
+        # Create forecasts for all active warehouses once the item is committed
+        collect_new_item(doc.name)
         
     except Exception as e:
         # Use simple logging to avoid cascade errors
         frappe.logger().error(f"Failed to create forecasts for new item {doc.name}: {str(e)[:100]}")
 
+def collect_new_item(item_code):
+    """Defer forecast creation for an item until the current transaction commits"""
+    pending = getattr(frappe.local, "ai_inventory_new_items", None)
+    
+    if pending is None:
+        pending = frappe.local.ai_inventory_new_items = set()
+        frappe.db.after_commit.add(flush_new_items)
+        frappe.db.after_rollback.add(reset_new_items)
+    
+    pending.add(item_code)
+
+def reset_new_items():
+    """Discard items collected in a transaction that was rolled back"""
+    frappe.local.ai_inventory_new_items = None
+
+@instrument("hooks.flush_new_items")
+def flush_new_items():
+    """Create forecasts for the items inserted or turned into stock items in the transaction"""
+    pending = getattr(frappe.local, "ai_inventory_new_items", None)
+    reset_new_items()
+    
+    for item_code in sorted(pending or []):
+        created_count = create_forecasts_for_new_item(item_code)
+        if created_count > 0:
+            frappe.logger().info(f"Created {created_count} AI Forecasts for new item: {item_code}")
+
 def create_forecasts_for_new_item(item_code):
-    """Create AI Inventory Forecasts for a new item across all warehouses"""
+    """Create AI Inventory Forecasts for an item in every warehouse that holds its stock"""
     try:
-        created_count = 0
-        
-        # Get all active warehouses
-        warehouses = frappe.get_all("Warehouse", 
-            filters={}, 
-            fields=["name", "company"]
-        )
-        
-        for warehouse in warehouses:
-            try:
-                # Check if forecast already exists
-                existing = frappe.db.exists("AI Inventory Forecast", {
-                    "item_code": item_code,
-                    "warehouse": warehouse.name,
-                    "company": warehouse.company
-                })
-                
-                if not existing:
-                    # Create new forecast with VALID movement type
-                    forecast = frappe.get_doc({
-                        "doctype": "AI Inventory Forecast",
-                        "item_code": item_code,
-                        "warehouse": warehouse.name,
-                        "company": warehouse.company,
-                        "forecast_period_days": 30,
-                        "lead_time_days": 14,
-                        "current_stock": 0,
-                        "predicted_consumption": 0,
-                        "movement_type": "Non Moving",  # FIXED: Use valid movement type
-                        "confidence_score": 0,
-                        "forecast_details": f"Auto-created forecast for new item {item_code}"
-                    })
-                    
-                    # Skip forecast run during creation to avoid delays
-                    forecast.flags.skip_forecast = True
-                    forecast.insert(ignore_permissions=True)
-                    created_count += 1
-                    
-                    # Queue forecast update for later
-                    queue_forecast_update(forecast.name, delay=5)
-                    
-            except Exception as e:
-                # Use simple logging to avoid cascade errors
-                frappe.logger().error(f"Failed to create forecast for {item_code} in {warehouse.name}: {str(e)[:100]}")
-                continue
-        
-        # Commit after each item to ensure data is saved
+        created_count = create_missing_forecasts(item_codes=[item_code])
         frappe.db.commit()
-        
+
+        if created_count:
+            # Queue forecast update for later
+            for forecast_name in frappe.get_all("AI Inventory Forecast", filters={"item_code": item_code}, pluck="name"):
+                queue_forecast_update(forecast_name, delay=5)
+
         return created_count
-        
+
     except Exception as e:
+        frappe.db.rollback()
         frappe.logger().error(f"Failed to create forecasts for item {item_code}: {str(e)[:100]}")
         return 0
 
@@ -249,7 +329,7 @@ def on_item_on_update(doc, method):
             if doc.is_stock_item != old_doc.is_stock_item:
                 if doc.is_stock_item:
                     # Item became stock item - create forecasts
-                    create_forecasts_for_new_item(doc.name)
+                    collect_new_item(doc.name)
                 else:
                     # Item is no longer stock item - disable forecasts
                     disable_item_forecasts(doc.name)
@@ -324,49 +404,9 @@ def on_warehouse_after_insert(doc, method):
         frappe.logger().error(f"Failed to create forecasts for new warehouse {doc.name}: {str(e)[:100]}")
 
 def create_forecasts_for_new_warehouse(warehouse, company):
-    """Create AI Inventory Forecasts for all items in a new warehouse"""
+    """Create AI Inventory Forecasts for all items that hold stock in a warehouse"""
     try:
-        created_count = 0
-        
-        # Get all active stock items
-        items = frappe.get_all("Item", 
-            filters={"is_stock_item": 1, }, 
-            fields=["name"]
-        )
-        
-        for item in items:
-            try:
-                # Check if forecast already exists
-                existing = frappe.db.exists("AI Inventory Forecast", {
-                    "item_code": item.name,
-                    "warehouse": warehouse,
-                    "company": company
-                })
-                
-                if not existing:
-                    # Create new forecast with VALID movement type
-                    forecast = frappe.get_doc({
-                        "doctype": "AI Inventory Forecast",
-                        "item_code": item.name,
-                        "warehouse": warehouse,
-                        "company": company,
-                        "forecast_period_days": 30,
-                        "lead_time_days": 14,
-                        "current_stock": 0,
-                        "predicted_consumption": 0,
-                        "movement_type": "Non Moving",  # FIXED: Use valid movement type
-                        "confidence_score": 0,
-                        "forecast_details": f"Auto-created forecast for warehouse {warehouse}"
-                    })
-                    
-                    # Skip forecast run during creation
-                    forecast.flags.skip_forecast = True
-                    forecast.insert(ignore_permissions=True)
-                    created_count += 1
-                    
-            except Exception as e:
-                frappe.logger().error(f"Failed to create forecast for {item.name} in {warehouse}: {str(e)[:100]}")
-                continue
+        created_count = create_missing_forecasts(warehouses=[warehouse])
         
         # Commit after warehouse creation
         frappe.db.commit()
@@ -374,6 +414,7 @@ def create_forecasts_for_new_warehouse(warehouse, company):
         return created_count
         
     except Exception as e:
+        frappe.db.rollback()
         frappe.logger().error(f"Failed to create forecasts for warehouse {warehouse}: {str(e)[:100]}")
         return 0
 
@@ -398,55 +439,9 @@ def queue_warehouse_forecast_creation(warehouse, company):
 
 @frappe.whitelist()
 def handle_bulk_item_import():
-    """Handle bulk item import - create forecasts for all new items"""
+    """Handle bulk item import - create forecasts for all new items in one background job"""
     try:
-        # Set bulk operation flag
-        frappe.flags.in_bulk_operation = True
-        
-        # Get all stock items without forecasts
-        items_without_forecasts = frappe.db.sql("""
-            SELECT DISTINCT i.name, i.item_name
-            FROM `tabItem` i
-            WHERE i.is_stock_item = 1 
-            AND i.disabled = 0
-            AND NOT EXISTS (
-                SELECT 1 FROM `tabAI Inventory Forecast` aif 
-                WHERE aif.item_code = i.name
-            )
-            LIMIT 1000
-        """, as_dict=True)
-        
-        if not items_without_forecasts:
-            return {
-                "status": "info",
-                "message": "All items already have forecasts",
-                "items_processed": 0
-            }
-        
-        total_created = 0
-        
-        # Process items in batches
-        batch_size = 50
-        for i in range(0, len(items_without_forecasts), batch_size):
-            batch = items_without_forecasts[i:i + batch_size]
-            
-            for item in batch:
-                try:
-                    created_count = create_forecasts_for_new_item(item.name)
-                    total_created += created_count
-                except Exception as e:
-                    frappe.logger().error(f"Bulk import forecast creation failed for {item.name}: {str(e)[:100]}")
-                    continue
-            
-            # Commit after each batch
-            frappe.db.commit()
-        
-        return {
-            "status": "success",
-            "message": f"Created forecasts for {len(items_without_forecasts)} items. Total forecasts: {total_created}",
-            "items_processed": len(items_without_forecasts),
-            "forecasts_created": total_created
-        }
+        return enqueue_missing_forecast_generation()
         
     except Exception as e:
         error_msg = f"Bulk import handler failed: {str(e)}"
@@ -455,8 +450,6 @@ def handle_bulk_item_import():
             "status": "error",
             "message": error_msg
         }
-    finally:
-        frappe.flags.in_bulk_operation = False
 
 # =============================================================================
 # API FUNCTIONS WITH SAFETY CHECKS
@@ -464,181 +457,31 @@ def handle_bulk_item_import():
 
 @frappe.whitelist()
 def bulk_create_forecasts_for_existing_items(company=None):
-    """Bulk create AI Inventory Forecast records - THREAD SAFE"""
+    """Create AI Inventory Forecast records for every stocked item/warehouse in one background job
+    
+    Progress is checkpointed per item chunk, so queuing it again after an
+    interruption resumes instead of starting over.
+    """
     try:
-        # Set bulk operation flag
-        frappe.flags.in_bulk_operation = True
-        
-        # Build query with optional company filter
-        company_filter = ""
-        params = []
-        if company:
-            company_filter = "AND w.company = %s"
-            params.append(company)
-        
-        # Get all stock items that don't have forecasts for specified company
-        items_without_forecasts = frappe.db.sql(f"""
-            SELECT DISTINCT 
-                i.name as item_code, 
-                i.item_name,
-                w.name as warehouse,
-                w.company
-            FROM `tabItem` i
-            CROSS JOIN `tabWarehouse` w
-            WHERE i.is_stock_item = 1 
-            AND i.disabled = 0
-            AND w.disabled = 0
-            {company_filter}
-            AND NOT EXISTS (
-                SELECT 1 FROM `tabAI Inventory Forecast` aif 
-                WHERE aif.item_code = i.name 
-                AND aif.warehouse = w.name
-                AND aif.company = w.company
-            )
-            LIMIT 500
-        """, params, as_dict=True)
-        
-        total_created = 0
-        processed_items = 0
-        company_counts = {}
-        
-        for item in items_without_forecasts:
-            try:
-                # Create forecast with VALID movement type
-                forecast = frappe.get_doc({
-                    "doctype": "AI Inventory Forecast",
-                    "item_code": item.item_code,
-                    "warehouse": item.warehouse,
-                    "company": item.company,
-                    "forecast_period_days": 30,
-                    "lead_time_days": 14,
-                    "movement_type": "Non Moving"  # FIXED: Use valid movement type
-                })
-                
-                forecast.flags.skip_forecast = True
-                forecast.insert(ignore_permissions=True)
-                total_created += 1
-                
-                # Track by company
-                company_counts[item.company] = company_counts.get(item.company, 0) + 1
-                
-            except Exception as e:
-                frappe.logger().error(f"Failed to create forecast for {item.item_code}: {str(e)[:100]}")
-            
-            processed_items += 1
-            
-            # Commit every 25 items to avoid timeout
-            if processed_items % 25 == 0:
-                frappe.db.commit()
-        
-        # Final commit
-        frappe.db.commit()
-        
-        company_summary = ", ".join([f"{comp}: {count}" for comp, count in company_counts.items()])
-        
-        return {
-            "status": "success",
-            "message": f"Created {total_created} forecast records{' in ' + company if company else ''}\nCompany breakdown: {company_summary}",
-            "items_processed": processed_items,
-            "forecasts_created": total_created,
-            "company_breakdown": company_counts,
-            "company": company
-        }
+        return enqueue_missing_forecast_generation(company)
         
     except Exception as e:
         frappe.logger().error(f"Safe bulk creation failed: {str(e)[:100]}")
         return {"status": "error", "message": str(e)}
-    finally:
-        frappe.flags.in_bulk_operation = False
 
 @frappe.whitelist()
 def auto_create_forecasts_for_items_with_stock(company=None):
-    """Create forecasts only for items that have actual stock - THREAD SAFE"""
+    """Queue forecast creation for the item/warehouse pairs that have stock now
+    
+    The run walks the whole catalogue, so it goes to a background job like
+    the full bulk creation rather than running inside the request.
+    """
     try:
-        # Set bulk operation flag
-        frappe.flags.in_bulk_operation = True
-        
-        # Build query with optional company filter
-        company_filter = ""
-        params = []
-        if company:
-            company_filter = "AND w.company = %s"
-            params.append(company)
-        
-        # Get items that have stock but no forecasts for specified company
-        items_with_stock = frappe.db.sql(f"""
-            SELECT DISTINCT 
-                b.item_code, 
-                b.warehouse,
-                w.company,
-                i.item_name,
-                b.actual_qty
-            FROM `tabBin` b
-            INNER JOIN `tabItem` i ON i.name = b.item_code
-            INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
-            WHERE i.is_stock_item = 1 
-            AND i.disabled = 0
-            AND w.disabled = 0
-            {company_filter}
-            AND (b.actual_qty > 0 OR b.planned_qty > 0 OR b.ordered_qty > 0)
-            AND NOT EXISTS (
-                SELECT 1 FROM `tabAI Inventory Forecast` aif 
-                WHERE aif.item_code = b.item_code 
-                AND aif.warehouse = b.warehouse
-                AND aif.company = w.company
-            )
-            LIMIT 300
-        """, params, as_dict=True)
-        
-        created_count = 0
-        company_counts = {}
-        
-        for item in items_with_stock:
-            try:
-                # Create forecast for this specific item-warehouse-company combination
-                forecast = frappe.get_doc({
-                    "doctype": "AI Inventory Forecast",
-                    "item_code": item.item_code,
-                    "warehouse": item.warehouse,
-                    "company": item.company,
-                    "forecast_period_days": 30,
-                    "lead_time_days": 14,
-                    "current_stock": item.actual_qty,
-                    "movement_type": "Non Moving"  # FIXED: Use valid movement type
-                })
-                
-                forecast.flags.skip_forecast = True
-                forecast.insert(ignore_permissions=True)
-                created_count += 1
-                
-                # Track by company
-                company_counts[item.company] = company_counts.get(item.company, 0) + 1
-                
-                # Commit every 25 records
-                if created_count % 25 == 0:
-                    frappe.db.commit()
-                    
-            except Exception as e:
-                frappe.logger().error(f"Failed to create forecast: {str(e)[:100]}")
-        
-        # Final commit
-        frappe.db.commit()
-        
-        company_summary = ", ".join([f"{comp}: {count}" for comp, count in company_counts.items()])
-        
-        return {
-            "status": "success", 
-            "message": f"Created {created_count} forecasts{' in ' + company if company else ''}\nCompany breakdown: {company_summary}",
-            "forecasts_created": created_count,
-            "company_breakdown": company_counts,
-            "company": company
-        }
+        return enqueue_missing_forecast_generation(company, with_stock_only=1)
         
     except Exception as e:
         frappe.logger().error(f"Auto-create for items with stock failed: {str(e)[:100]}")
         return {"status": "error", "message": str(e)}
-    finally:
-        frappe.flags.in_bulk_operation = False
 
 @frappe.whitelist()
 def trigger_immediate_forecast_update(item_code, warehouse):
@@ -672,13 +515,13 @@ def trigger_immediate_forecast_update(item_code, warehouse):
 # =============================================================================
 
 def daily_create_missing_forecasts():
-    """Daily task to ensure all stock items have forecast records"""
+    """Daily task to ensure all stocked item/warehouse pairs have forecast records"""
     try:
-        # Create forecasts for items with stock
-        result = auto_create_forecasts_for_items_with_stock()
+        # Resumes an interrupted run from its checkpoint
+        result = generate_missing_forecasts()
         
-        if result.get("status") == "success" and result.get("forecasts_created", 0) > 0:
-            frappe.logger().info(f"Daily forecast creation: {result['message']}")
+        if result.get("success") and result.get("forecasts_created", 0) > 0:
+            frappe.logger().info(f"Daily forecast creation: {result['forecasts_created']} created")
             
     except Exception as e:
         frappe.logger().error(f"Daily create missing forecasts failed: {str(e)[:100]}")
@@ -743,7 +586,7 @@ def validate_ai_inventory_forecast_safe(doc, method):
         return
     try:
         if not doc.company and doc.warehouse:
-            doc.company = frappe.db.get_value("Warehouse", doc.warehouse, "company")
+            doc.company = frappe.get_cached_value("Warehouse", doc.warehouse, "company")
     except Exception as e:
         frappe.logger().error(f"Safe forecast validation failed: {str(e)[:100]}")
 
@@ -761,11 +604,10 @@ def on_bin_update_safe(doc, method):
     if not check_hooks_enabled():
         return
     try:
-        if hasattr(doc, '_doc_before_save'):
-            old_qty = flt(doc._doc_before_save.actual_qty)
-            new_qty = flt(doc.actual_qty)
-            if abs(new_qty - old_qty) > 10:
-                frappe.logger().info(f"Significant stock change for {doc.item_code}: {old_qty} -> {new_qty}")
+        # Bins also change on ordered/reserved qty; only actual stock feeds the forecasts
+        old_doc = doc.get_doc_before_save()
+        if not old_doc or flt(old_doc.actual_qty) != flt(doc.actual_qty):
+            collect_stock_movement(doc.item_code, doc.warehouse)
     except Exception as e:
         frappe.logger().error(f"Safe bin update hook failed: {str(e)[:100]}")
 
@@ -0,0 +1,86 @@
+"""
+Worker startup benchmark for the lazy ML imports
+
+Imports each module in a fresh interpreter and records wall time and peak
+RSS, once as it loads now (lazy) and once with the heavy libraries forced in
+the way the old top-level imports did (eager).
+
+    bench execute ai_inventory.import_benchmark.run
+    python -m ai_inventory.import_benchmark          (from the bench env)
+"""
+
+import json
+import subprocess
+import sys
+
+BENCHMARK_MODULES = [
+    "ai_inventory.hooks",
+    "ai_inventory.hooks_handlers",
+    "ai_inventory.ml_supplier_analyzer",
+    "ai_inventory.price_prediction",
+    "ai_inventory.behavior_segmentation",
+    "ai_inventory.utils.inventory_analytics",
+    "ai_inventory.ai_accounts_forecast.algorithms.time_series_models",
+    "ai_inventory.forecasting.ai_sales_forecast",
+    "ai_inventory.ai_inventory.doctype.ai_sales_forecast.ai_sales_forecast",
+]
+HEAVY_LIBRARIES = ["numpy", "pandas", "scipy.stats", "sklearn.ensemble", "sklearn.cluster",
+                   "statsmodels.tsa.arima.model", "joblib"]
+
+_PROBE = """
+import importlib, json, resource, sys, time
+import frappe
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+if sys.argv[2] == "eager":
+    for name in sys.argv[3:]:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+elapsed = time.perf_counter() - start
+scale = 1 if sys.platform == "darwin" else 1024
+from ai_inventory.lazy_imports import loaded_libraries
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1048576,
+    "added_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) * scale / 1048576,
+    "libraries": loaded_libraries()
+}))
+"""
+
+
+def measure(module, mode):
+    """Import one module in a clean interpreter and return its timing and memory"""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, module, mode] + HEAVY_LIBRARIES,
+        capture_output=True, text=True, timeout=300
+    )
+    if result.returncode != 0:
+        return {"error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(modules=None):
+    """Compare eager and lazy import cost for each module and print a table"""
+    results = []
+    for module in modules or BENCHMARK_MODULES:
+        eager = measure(module, "eager")
+        lazy = measure(module, "lazy")
+        results.append({"module": module, "eager": eager, "lazy": lazy})
+
+    print(f"{'module':<70} {'eager s':>8} {'lazy s':>8} {'eager MB':>9} {'lazy MB':>8}  libraries loaded (lazy)")
+    for row in results:
+        eager, lazy = row["eager"], row["lazy"]
+        if "error" in eager or "error" in lazy:
+            print(f"{row['module']:<70} error: {eager.get('error') or lazy.get('error')}")
+            continue
+        print(f"{row['module']:<70} {eager['seconds']:>8.3f} {lazy['seconds']:>8.3f} "
+              f"{eager['added_rss_mb']:>9.1f} {lazy['added_rss_mb']:>8.1f}  {', '.join(lazy['libraries']) or '-'}")
+
+    return results
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:] or None)
@@ -0,0 +1,280 @@
+"""
+Hot path timing for hooks, forecasting engines, syncs and reports
+
+    @instrument("hooks.flush_stock_movements")
+    def flush_stock_movements(): ...
+
+    with instrument("forecast.sync"):
+        ...
+
+Each call records its latency, the number of queries it ran and the rows it
+wrote into a per-process ring buffer. Once a minute a process publishes its
+buffer to Redis as per-operation aggregates, and the hourly persist_metrics
+job merges those into one AI Performance Metric row per operation and hour.
+"""
+
+import frappe
+from frappe.utils import add_to_date, cint, flt, now_datetime
+import collections
+import functools
+import hashlib
+import json
+import random
+import threading
+import time
+
+RING_SIZE = 5000
+PUBLISH_INTERVAL = 60  # seconds between pushes of a process's ring buffer to Redis
+MAX_SAMPLES = 200  # latency samples kept per operation and hour for percentiles
+MAX_QUEUED_BATCHES = 5000
+BATCH_QUEUE_KEY = "ai_inventory_metric_batches"  # listed in persistent_cache_keys, survives clear-cache
+SLOW_OPERATION_MS = 2000
+
+_rings = {}
+_last_publish = {}
+_lock = threading.Lock()
+
+
+def _db_counters():
+    """(queries, rows written) of the current database session, None when not available"""
+    try:
+        if not getattr(frappe.local, "db", None) or frappe.db.db_type != "mariadb":
+            return None
+        counters = dict(frappe.db.sql("""
+            SHOW SESSION STATUS
+            WHERE Variable_name IN ('Questions', 'Handler_write', 'Handler_update', 'Handler_delete')
+        """))
+        return (
+            cint(counters.get("Questions")),
+            sum(cint(counters.get(name)) for name in ("Handler_write", "Handler_update", "Handler_delete"))
+        )
+    except Exception:
+        return None
+
+
+class instrument:
+    """Decorator and context manager timing one operation"""
+
+    def __init__(self, operation=None, track_db=True):
+        self.operation = operation
+        self.track_db = track_db
+
+    def __call__(self, func):
+        operation = self.operation or f"{func.__module__}.{func.__qualname__}"
+        track_db = self.track_db
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with instrument(operation, track_db):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        self._counters = _db_counters() if self.track_db else None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        queries = rows_written = 0
+        if self._counters:
+            counters = _db_counters()
+            if counters:
+                # The closing SHOW STATUS is counted in Questions
+                queries = max(0, counters[0] - self._counters[0] - 1)
+                rows_written = max(0, counters[1] - self._counters[1])
+
+        record(self.operation, duration_ms, queries, rows_written, exc_type is not None)
+        return False
+
+
+def record(operation, duration_ms, queries=0, rows_written=0, error=False):
+    """Add one sample to this process's ring buffer for the current site"""
+    try:
+        site = getattr(frappe.local, "site", None)
+        ring = _rings.get(site)
+        if ring is None:
+            ring = _rings.setdefault(site, collections.deque(maxlen=RING_SIZE))
+            _last_publish.setdefault(site, time.monotonic())
+
+        ring.append((operation, duration_ms, queries, rows_written, error, time.time()))
+
+        if time.monotonic() - _last_publish[site] >= PUBLISH_INTERVAL:
+            publish_samples()
+    except Exception:
+        pass  # Instrumentation must never break the operation it measures
+
+
+def get_period_start(timestamp):
+    """Hour bucket of a unix timestamp"""
+    return time.strftime("%Y-%m-%d %H:00:00", time.localtime(timestamp))
+
+
+def aggregate_samples(samples):
+    """Per (operation, hour) totals with a bounded latency sample"""
+    aggregates = {}
+    for operation, duration_ms, queries, rows_written, error, timestamp in samples:
+        key = f"{operation}\n{get_period_start(timestamp)}"
+        aggregate = aggregates.setdefault(key, {
+            "count": 0, "errors": 0, "total_ms": 0, "max_ms": 0, "queries": 0, "rows_written": 0, "samples": []
+        })
+        aggregate["count"] += 1
+        aggregate["errors"] += 1 if error else 0
+        aggregate["total_ms"] += duration_ms
+        aggregate["max_ms"] = max(aggregate["max_ms"], duration_ms)
+        aggregate["queries"] += queries
+        aggregate["rows_written"] += rows_written
+        aggregate["samples"].append(round(duration_ms, 2))
+
+    for aggregate in aggregates.values():
+        if len(aggregate["samples"]) > MAX_SAMPLES:
+            aggregate["samples"] = random.sample(aggregate["samples"], MAX_SAMPLES)
+
+    return aggregates
+
+
+def publish_samples():
+    """Push this process's buffered samples for the current site to Redis"""
+    site = getattr(frappe.local, "site", None)
+    with _lock:
+        ring = _rings.get(site)
+        samples = list(ring) if ring else []
+        if ring:
+            ring.clear()
+        _last_publish[site] = time.monotonic()
+
+    if not samples:
+        return
+
+    cache = frappe.cache()
+    cache.rpush(BATCH_QUEUE_KEY, json.dumps(aggregate_samples(samples)))
+    cache.ltrim(BATCH_QUEUE_KEY, -MAX_QUEUED_BATCHES, -1)
+
+
+def get_metric_name(operation, period_start):
+    return hashlib.md5(f"{operation}\n{period_start}".encode()).hexdigest()[:16]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list"""
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))]
+
+
+def persist_metrics():
+    """Merge the published batches into AI Performance Metric rows (hourly)"""
+    try:
+        publish_samples()
+
+        cache = frappe.cache()
+        batches = cache.lrange(BATCH_QUEUE_KEY, 0, -1) or []
+        if not batches:
+            return {"success": True, "operations": 0}
+        cache.ltrim(BATCH_QUEUE_KEY, len(batches), -1)
+
+        merged = {}
+        for batch in batches:
+            for key, aggregate in json.loads(batch).items():
+                merge_aggregate(merged, key, aggregate)
+
+        names = {get_metric_name(*key.split("\n", 1)): key for key in merged}
+        for row in frappe.db.sql("""
+            SELECT name, call_count, error_count, total_ms, max_ms, query_count, rows_written, latency_samples
+            FROM `tabAI Performance Metric`
+            WHERE name IN %(names)s
+        """, {"names": list(names)}, as_dict=True):
+            merge_aggregate(merged, names[row.name], {
+                "count": cint(row.call_count), "errors": cint(row.error_count),
+                "total_ms": flt(row.total_ms), "max_ms": flt(row.max_ms),
+                "queries": cint(row.query_count), "rows_written": cint(row.rows_written),
+                "samples": json.loads(row.latency_samples or "[]")
+            })
+
+        timestamp = now_datetime()
+        for key, aggregate in merged.items():
+            operation, period_start = key.split("\n", 1)
+            samples = aggregate["samples"]
+            if len(samples) > MAX_SAMPLES:
+                samples = random.sample(samples, MAX_SAMPLES)
+
+            frappe.db.sql("""
+                INSERT INTO `tabAI Performance Metric`
+                    (name, operation, period_start, call_count, error_count, total_ms, mean_ms, p50_ms, p95_ms,
+                     max_ms, query_count, rows_written, latency_samples,
+                     creation, modified, owner, modified_by, docstatus)
+                VALUES (%(name)s, %(operation)s, %(period_start)s, %(count)s, %(errors)s, %(total_ms)s, %(mean_ms)s,
+                        %(p50_ms)s, %(p95_ms)s, %(max_ms)s, %(queries)s, %(rows_written)s, %(samples)s,
+                        %(now)s, %(now)s, 'Administrator', 'Administrator', 0)
+                ON DUPLICATE KEY UPDATE
+                    call_count = VALUES(call_count),
+                    error_count = VALUES(error_count),
+                    total_ms = VALUES(total_ms),
+                    mean_ms = VALUES(mean_ms),
+                    p50_ms = VALUES(p50_ms),
+                    p95_ms = VALUES(p95_ms),
+                    max_ms = VALUES(max_ms),
+                    query_count = VALUES(query_count),
+                    rows_written = VALUES(rows_written),
+                    latency_samples = VALUES(latency_samples),
+                    modified = VALUES(modified)
+            """, {
+                "name": get_metric_name(operation, period_start),
+                "operation": operation[:140],
+                "period_start": period_start,
+                "count": aggregate["count"],
+                "errors": aggregate["errors"],
+                "total_ms": aggregate["total_ms"],
+                "mean_ms": aggregate["total_ms"] / max(aggregate["count"], 1),
+                "p50_ms": percentile(samples, 50),
+                "p95_ms": percentile(samples, 95),
+                "max_ms": aggregate["max_ms"],
+                "queries": aggregate["queries"],
+                "rows_written": aggregate["rows_written"],
+                "samples": json.dumps(samples),
+                "now": timestamp
+            })
+
+        frappe.db.commit()
+
+        return {"success": True, "operations": len(merged)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Performance metric flush failed: {str(e)}", "AI Instrumentation")
+        return {"success": False, "error": str(e)}
+
+
+def merge_aggregate(merged, key, aggregate):
+    target = merged.get(key)
+    if target is None:
+        merged[key] = dict(aggregate, samples=list(aggregate["samples"]))
+        return
+
+    for field in ("count", "errors", "total_ms", "queries", "rows_written"):
+        target[field] += aggregate[field]
+    target["max_ms"] = max(target["max_ms"], aggregate["max_ms"])
+    target["samples"].extend(aggregate["samples"])
+
+
+def get_metrics_summary(hours=24, limit=10):
+    """Per operation totals over the last hours, slowest total time first"""
+    return frappe.db.sql("""
+        SELECT
+            operation,
+            SUM(call_count) AS call_count,
+            SUM(error_count) AS error_count,
+            SUM(total_ms) AS total_ms,
+            SUM(total_ms) / GREATEST(SUM(call_count), 1) AS mean_ms,
+            MAX(p95_ms) AS p95_ms,
+            MAX(max_ms) AS max_ms,
+            SUM(query_count) / GREATEST(SUM(call_count), 1) AS queries_per_call,
+            SUM(rows_written) AS rows_written
+        FROM `tabAI Performance Metric`
+        WHERE period_start >= %(since)s
+        GROUP BY operation
+        ORDER BY total_ms DESC
+        LIMIT %(limit)s
+    """, {"since": add_to_date(now_datetime(), hours=-cint(hours)), "limit": cint(limit)}, as_dict=True)
@@ -0,0 +1,133 @@
+"""
+Lazy access to the heavy scientific libraries
+
+Hooks, controllers and report modules are imported into every web and
+background worker, so they must not import pandas, numpy, scipy, sklearn or
+statsmodels at module level. Modules bind proxies from here instead; the real
+library is imported the first time an attribute is used.
+
+    np = lazy_import("numpy")
+    ARIMA = lazy_from("statsmodels.tsa.arima.model", "ARIMA")
+    STATSMODELS_AVAILABLE = is_available("statsmodels")
+"""
+
+import importlib
+import importlib.util
+import threading
+
+_lock = threading.RLock()
+_availability = {}
+_reported_missing = set()
+
+
+def is_available(module_name):
+    """Whether a module can be imported, checked without importing it and cached"""
+    top_level = module_name.split(".")[0]
+    if top_level not in _availability:
+        try:
+            _availability[top_level] = importlib.util.find_spec(top_level) is not None
+        except (ImportError, ValueError):
+            _availability[top_level] = False
+    return _availability[top_level]
+
+
+def _report_missing(module_name, error):
+    """Log a missing optional library once per process, on first use rather than at import"""
+    top_level = module_name.split(".")[0]
+    if top_level in _reported_missing:
+        return
+    _reported_missing.add(top_level)
+    _availability[top_level] = False
+
+    try:
+        import frappe
+        frappe.log_error(f"{top_level} not available: {str(error)}", "AI Inventory Dependencies")
+    except Exception:
+        pass
+
+
+class LazyModule:
+    """Module proxy that imports on first attribute access"""
+
+    def __init__(self, module_name):
+        self.__dict__["_module_name"] = module_name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    try:
+                        module = importlib.import_module(self._module_name)
+                    except ImportError as e:
+                        _report_missing(self._module_name, e)
+                        raise
+                    self.__dict__["_module"] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module '{self._module_name}' ({state})>"
+
+
+class LazyAttribute:
+    """Proxy for a class or function inside a module, e.g. a sklearn estimator"""
+
+    def __init__(self, module_name, attribute):
+        self._module = LazyModule(module_name)
+        self._attribute = attribute
+
+    def resolve(self):
+        return getattr(self._module, self._attribute)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self.resolve())
+
+    def __repr__(self):
+        return f"<lazy {self._module._module_name}.{self._attribute}>"
+
+
+_modules = {}
+
+
+def lazy_import(module_name):
+    """Shared LazyModule for a module name"""
+    with _lock:
+        if module_name not in _modules:
+            _modules[module_name] = LazyModule(module_name)
+        return _modules[module_name]
+
+
+def lazy_from(module_name, attribute):
+    """LazyAttribute for `from module_name import attribute`"""
+    return LazyAttribute(module_name, attribute)
+
+
+def loaded_libraries():
+    """Heavy libraries actually imported in this process so far"""
+    import sys
+    return sorted(name for name in ("numpy", "pandas", "scipy", "sklearn", "statsmodels", "joblib")
+                  if name in sys.modules)
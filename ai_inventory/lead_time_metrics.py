@@ -0,0 +1,177 @@
+import frappe
+from frappe.utils import add_days, flt, now, nowdate
+import hashlib
+from ai_inventory.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+LOOKBACK_DAYS = 365
+DEFAULT_LEAD_TIME_DAYS = 14
+METRIC_FIELDS = ["line_count", "mean_lead_time", "p50_lead_time", "p90_lead_time",
+                 "mean_delay_days", "on_time_ratio", "quality_ratio"]
+
+
+def get_metric_name(company, metric_type, metric_key):
+    """Deterministic row name for a (company, type, supplier/item) metric"""
+    return hashlib.md5(f"{company}\n{metric_type}\n{metric_key}".encode()).hexdigest()[:16]
+
+
+def get_received_lines(company=None, days=LOOKBACK_DAYS):
+    """
+    One row per received Purchase Order line with its lead time and delay
+
+    A line received over several receipts counts as delivered on its first receipt.
+    """
+    values = {"from_date": add_days(nowdate(), -int(days or LOOKBACK_DAYS)), "company": company}
+    company_condition = "AND po.company = %(company)s" if company else ""
+
+    return frappe.db.sql(f"""
+        SELECT
+            po.company, po.supplier, poi.item_code,
+            DATEDIFF(MIN(pr.posting_date), po.transaction_date) AS lead_time,
+            DATEDIFF(MIN(pr.posting_date), IFNULL(poi.schedule_date, MIN(pr.posting_date))) AS delay_days,
+            SUM(pri.qty) AS accepted_qty,
+            SUM(pri.rejected_qty) AS rejected_qty
+        FROM `tabPurchase Receipt Item` pri
+        INNER JOIN `tabPurchase Receipt` pr ON pr.name = pri.parent
+        INNER JOIN `tabPurchase Order Item` poi ON poi.name = pri.purchase_order_item
+        INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
+        WHERE pr.docstatus = 1
+        AND po.docstatus = 1
+        AND pr.posting_date >= %(from_date)s
+        {company_condition}
+        GROUP BY poi.name, po.company, po.supplier, poi.item_code, po.transaction_date, poi.schedule_date
+    """, values, as_dict=True)
+
+
+def summarize_lines(lines):
+    """Lead time distribution and delivery ratios for a group of received lines"""
+    lead_times = np.array([max(0, flt(line.lead_time)) for line in lines])
+    delays = np.array([flt(line.delay_days) for line in lines])
+    accepted = sum(flt(line.accepted_qty) for line in lines)
+    received = accepted + sum(flt(line.rejected_qty) for line in lines)
+    p50, p90 = np.percentile(lead_times, [50, 90])
+
+    return {
+        "line_count": len(lines),
+        "mean_lead_time": flt(lead_times.mean(), 1),
+        "p50_lead_time": flt(p50, 1),
+        "p90_lead_time": flt(p90, 1),
+        "mean_delay_days": flt(np.maximum(delays, 0).mean(), 1),
+        "on_time_ratio": flt((delays <= 0).mean(), 3),
+        "quality_ratio": flt(accepted / received, 3) if received else 1.0
+    }
+
+
+def rebuild_lead_time_metrics(company=None, days=LOOKBACK_DAYS):
+    """Recompute supplier and item lead time metrics from one pass over received lines"""
+    try:
+        groups = {}
+        for line in get_received_lines(company, days):
+            if not line.company or line.lead_time is None:
+                continue
+            if line.supplier:
+                groups.setdefault((line.company, "Supplier", line.supplier), []).append(line)
+            if line.item_code:
+                groups.setdefault((line.company, "Item", line.item_code), []).append(line)
+
+        if company:
+            frappe.db.delete("AI Lead Time Metric", {"company": company})
+        else:
+            frappe.db.delete("AI Lead Time Metric")
+
+        timestamp = now()
+        fields = ["name", "company", "metric_type", "metric_key"] + METRIC_FIELDS + [
+            "last_rebuilt", "creation", "modified", "owner", "modified_by", "docstatus"
+        ]
+        rows = []
+        for key, lines in groups.items():
+            metrics = summarize_lines(lines)
+            rows.append([get_metric_name(*key), *key] + [metrics[field] for field in METRIC_FIELDS]
+                        + [timestamp, timestamp, timestamp, "Administrator", "Administrator", 0])
+        frappe.db.bulk_insert("AI Lead Time Metric", fields, rows, chunk_size=1000)
+
+        frappe.db.commit()
+        clear_lead_time_cache()
+
+        return {"success": True, "metrics": len(rows)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Lead time metrics rebuild failed: {str(e)}", "Lead Time Metrics")
+        return {"success": False, "error": str(e)}
+
+
+def get_lead_time_metrics(company, metric_type):
+    """
+    All metrics of one type for a company, {supplier or item: metrics}
+
+    Loaded once per request so per-item and per-supplier callers share a
+    single read.
+    """
+    cache = getattr(frappe.local, "lead_time_metrics", None)
+    if cache is None:
+        cache = frappe.local.lead_time_metrics = {}
+
+    if (company, metric_type) not in cache:
+        rows = frappe.db.sql(f"""
+            SELECT metric_key, {", ".join(METRIC_FIELDS)}
+            FROM `tabAI Lead Time Metric`
+            WHERE company = %s AND metric_type = %s
+        """, (company, metric_type), as_dict=True)
+        cache[(company, metric_type)] = {row.metric_key: row for row in rows}
+
+    return cache[(company, metric_type)]
+
+
+def get_lead_time_metric(company, metric_type, metric_key):
+    """
+    Metrics of one supplier or item, by primary key
+
+    Uses the per-request copy of the whole type when one is already loaded,
+    so single-document callers do not pay for reading the company's table.
+    """
+    loaded = (getattr(frappe.local, "lead_time_metrics", None) or {}).get((company, metric_type))
+    if loaded is not None:
+        return loaded.get(metric_key)
+
+    cache = getattr(frappe.local, "lead_time_metric_rows", None)
+    if cache is None:
+        cache = frappe.local.lead_time_metric_rows = {}
+
+    name = get_metric_name(company, metric_type, metric_key)
+    if name not in cache:
+        rows = frappe.db.sql(f"""
+            SELECT metric_key, {", ".join(METRIC_FIELDS)}
+            FROM `tabAI Lead Time Metric`
+            WHERE name = %s
+        """, name, as_dict=True)
+        cache[name] = rows[0] if rows else None
+
+    return cache[name]
+
+
+def clear_lead_time_cache():
+    """Drop the per-request copies after a rebuild"""
+    frappe.local.lead_time_metrics = {}
+    frappe.local.lead_time_metric_rows = {}
+
+
+def get_lead_time_days(company, item_code=None, supplier=None, default=DEFAULT_LEAD_TIME_DAYS, field="mean_lead_time",
+                       batch=False):
+    """
+    Observed lead time for an item, else its supplier, else the default
+
+    Callers looking up many items or suppliers pass batch=True to load the
+    company's metrics of each type once instead of one row per lookup.
+    """
+    if company:
+        for metric_type, key in (("Item", item_code), ("Supplier", supplier)):
+            if not key:
+                continue
+            metrics = (get_lead_time_metrics(company, metric_type).get(key) if batch
+                       else get_lead_time_metric(company, metric_type, key))
+            if metrics and metrics.line_count:
+                return max(1, flt(metrics.get(field)))
+
+    return default
@@ -1,63 +1,63 @@
 import frappe
 from frappe import _
-import pandas as pd
-import numpy as np
+from frappe.utils import flt
 from datetime import datetime, timedelta
+from ai_inventory.lazy_imports import is_available, lazy_from, lazy_import
+from ai_inventory.supplier_stats import get_supplier_stats
+from ai_inventory.supplier_ranking import get_ranked_suppliers
+from ai_inventory.price_prediction import predict_prices
+from ai_inventory.lead_time_metrics import get_lead_time_metrics
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+SKLEARN_AVAILABLE = is_available("sklearn")
+RandomForestClassifier = lazy_from("sklearn.ensemble", "RandomForestClassifier")
+StandardScaler = lazy_from("sklearn.preprocessing", "StandardScaler")
 
 class MLSupplierAnalyzer:
     def __init__(self):
-        try:
-            from sklearn.preprocessing import StandardScaler
-            from sklearn.ensemble import RandomForestClassifier
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-            self.scaler = StandardScaler()
-        except ImportError:
-            self.model = None
-            self.scaler = None
+        # sklearn is only imported when the model or scaler is first used
+        self._model = None
+        self._scaler = None
+
+    @property
+    def model(self):
+        if self._model is None and SKLEARN_AVAILABLE:
+            self._model = RandomForestClassifier(n_estimators=100, random_state=42)
+        return self._model
+
+    @property
+    def scaler(self):
+        if self._scaler is None and SKLEARN_AVAILABLE:
+            self._scaler = StandardScaler()
+        return self._scaler
 
     def get_supplier_data(self, company, days=365):
-        """Get historical supplier performance data - COMPLETELY FIXED"""
-        # Remove the try-catch that was swallowing exceptions
-        data = frappe.db.sql("""
-            SELECT 
-                po.supplier,
-                po.name as po_name,
-                po.transaction_date,
-                po.status,
-                poi.item_code,
-                poi.qty,
-                poi.rate
-            FROM `tabPurchase Order` po
-            INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
-            WHERE po.company = %s 
-            AND po.docstatus = 1
-            ORDER BY po.transaction_date DESC
-        """, (company,), as_dict=1)
-        
-        return data
+        """Get supplier performance aggregates for the last `days` days"""
+        supplier_data = get_supplier_stats(company, days)
+        lead_times = get_lead_time_metrics(company, "Supplier")
+
+        for row in supplier_data:
+            metrics = lead_times.get(row.supplier) or {}
+            row.quality_ratio = flt(metrics.get("quality_ratio", 1.0))
+            row.mean_delay_days = flt(metrics.get("mean_delay_days"))
+            row.p90_lead_time = flt(metrics.get("p90_lead_time"))
+
+        return supplier_data
 
     def prepare_features(self, supplier_data):
-        """Prepare feature matrix for ML model - FIXED"""
-        df = pd.DataFrame(supplier_data)
-        if df.empty:
+        """Prepare feature matrix for ML model from supplier aggregates"""
+        feature_df = pd.DataFrame([{
+            'supplier': row['supplier'],
+            'order_count': row['order_count'],
+            'total_value': row['line_value'],
+            'on_time_delivery': row['on_time_ratio'],
+            'quality_score': row.get('quality_ratio', 1.0),
+            'avg_delay_days': row.get('mean_delay_days', 0),
+        } for row in supplier_data])
+        if feature_df.empty:
             return None, None
 
-        # Calculate supplier metrics
-        supplier_metrics = []
-        for supplier in df.supplier.unique():
-            supplier_df = df[df.supplier == supplier]
-
-            metrics = {
-                'supplier': supplier,
-                'order_count': len(supplier_df),
-                'total_value': supplier_df.qty.sum() * supplier_df.rate.mean(),
-                'on_time_delivery': (supplier_df.status == 'Delivered').mean(),
-                'quality_score': 1.0,  # Default quality score
-                'avg_delay_days': 0,  # Default delay
-            }
-            supplier_metrics.append(metrics)
-
-        feature_df = pd.DataFrame(supplier_metrics)
         feature_df = feature_df.fillna(0)
 
         # Scale features
@@ -71,29 +71,21 @@ class MLSupplierAnalyzer:
 
         return X, feature_df.supplier.values
 
-    def analyze_suppliers(self, company):
-        """Analyze suppliers and return recommendations - COMPLETELY FIXED"""
-        # Get data using the fixed method
-        supplier_data = self.get_supplier_data(company)
+    def analyze_suppliers(self, company, days=365):
+        """Analyze suppliers and return recommendations"""
+        supplier_data = self.get_supplier_data(company, days)
         if not supplier_data:
             frappe.logger().info(f"No supplier data found for {company}")
             return []
-            
-        # Group data by supplier
-        supplier_groups = {}
-        for record in supplier_data:
-            supplier = record['supplier']
-            if supplier not in supplier_groups:
-                supplier_groups[supplier] = []
-            supplier_groups[supplier].append(record)
         
         # Analyze each supplier
         results = []
-        for supplier, orders in supplier_groups.items():
+        for stats in supplier_data:
+            supplier = stats['supplier']
             try:
                 # Calculate metrics
-                total_orders = len(orders)
-                total_value = sum(float(order.get('qty', 0)) * float(order.get('rate', 0)) for order in orders)
+                total_orders = int(stats['order_count'] or 0)
+                total_value = float(stats['line_value'] or 0)
                 
                 # Enhanced scoring algorithm
                 base_score = 50
@@ -119,7 +111,10 @@ class MLSupplierAnalyzer:
                     'score': round(float(score), 2),
                     'recommendation': self.get_recommendation(score),
                     'total_orders': total_orders,
-                    'total_value': total_value
+                    'total_value': total_value,
+                    'avg_rate': round(float(stats['rate_mean']), 2),
+                    'rate_std': round(float(stats['rate_variance']) ** 0.5, 2),
+                    'on_time_ratio': round(float(stats['on_time_ratio']), 3)
                 })
                 
             except Exception as e:
@@ -139,32 +134,23 @@ class MLSupplierAnalyzer:
         else:
             return _("Poor performer - Review relationship")
 
-    def save_analysis(self, company):
-        """Save supplier analysis results to database"""
+    def save_analysis(self, company, results=None):
+        """Save supplier analysis results to the scores table and propagate them to forecasts"""
         try:
-            results = self.analyze_suppliers(company)
-
-            # Update AI Inventory Forecasts
-            for result in results:
-                forecasts = frappe.get_all("AI Inventory Forecast",
-                    filters={
-                        "company": company,
-                        "supplier": result['supplier']
-                    },
-                    fields=["name"]
-                )
-
-                for forecast in forecasts:
-                    try:
-                        frappe.db.set_value("AI Inventory Forecast",
-                            forecast.name,
-                            {
-                                "supplier_score": result['score'],
-                                "supplier_recommendation": result['recommendation']
-                            }
-                        )
-                    except Exception as e:
-                        frappe.log_error(f"Failed to update forecast {forecast.name}: {str(e)}")
+            if results is None:
+                results = self.analyze_suppliers(company)
+
+            save_supplier_scores(results, company)
+
+            # One joined UPDATE instead of a lookup and set_value per forecast
+            frappe.db.sql("""
+                UPDATE `tabAI Inventory Forecast` f
+                INNER JOIN `tabAI Supplier Score` sc
+                    ON sc.company = f.company AND sc.supplier = f.supplier
+                SET f.supplier_score = sc.score,
+                    f.supplier_recommendation = sc.recommendation
+                WHERE f.company = %s
+            """, (company,))
 
             frappe.db.commit()
             return len(results)
@@ -176,21 +162,8 @@ class MLSupplierAnalyzer:
     def find_best_supplier_for_item(self, item_code, company):
         """Find the best supplier for a specific item"""
         try:
-            # Get suppliers who have supplied this item
-            suppliers = frappe.db.sql("""
-                SELECT DISTINCT po.supplier,
-                       COUNT(*) as order_count,
-                       AVG(poi.rate) as avg_rate,
-                       MAX(po.transaction_date) as last_order_date
-                FROM `tabPurchase Order` po
-                INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
-                WHERE poi.item_code = %s
-                AND po.company = %s
-                AND po.docstatus = 1
-                GROUP BY po.supplier
-                ORDER BY order_count DESC, last_order_date DESC
-                LIMIT 1
-            """, (item_code, company), as_dict=True)
+            # Get suppliers who have supplied this item from the ranking index
+            suppliers = get_ranked_suppliers([item_code], company, limit=1).get(item_code)
 
             if suppliers:
                 best_supplier = suppliers[0]
@@ -222,43 +195,13 @@ class MLSupplierAnalyzer:
             frappe.log_error(f"Find best supplier failed: {str(e)}")
             return None
 
-    def predict_item_price(self, item_code, supplier, company, qty=1):
-        """Predict price for an item from a supplier"""
+    def predict_item_price(self, item_code, supplier, company, qty=1, conversion_factor=1):
+        """Predict price for an item from a supplier, per the UOM of qty"""
         try:
-            # Get historical prices
-            historical_prices = frappe.db.sql("""
-                SELECT poi.rate, po.transaction_date, poi.qty
-                FROM `tabPurchase Order Item` poi
-                INNER JOIN `tabPurchase Order` po ON po.name = poi.parent
-                WHERE poi.item_code = %s
-                AND po.supplier = %s
-                AND po.company = %s
-                AND po.docstatus = 1
-                ORDER BY po.transaction_date DESC
-                LIMIT 10
-            """, (item_code, supplier, company), as_dict=True)
-
-            if historical_prices:
-                # Simple price prediction - average of recent prices
-                avg_price = sum(p['rate'] for p in historical_prices) / len(historical_prices)
-                confidence = min(90, len(historical_prices) * 10)
-
-                return {
-                    'status': 'success',
-                    'predicted_price': avg_price,
-                    'confidence': confidence,
-                    'historical_count': len(historical_prices)
-                }
-            else:
-                # Get standard rate from item master
-                standard_rate = frappe.db.get_value("Item", item_code, "standard_rate") or 0
-
-                return {
-                    'status': 'success',
-                    'predicted_price': standard_rate,
-                    'confidence': 30,
-                    'historical_count': 0
-                }
+            return predict_prices([{
+                "item_code": item_code, "supplier": supplier, "company": company, "qty": qty,
+                "conversion_factor": conversion_factor
+            }])[0]
 
         except Exception as e:
             frappe.log_error(f"Price prediction failed: {str(e)}")
@@ -334,7 +277,7 @@ def run_ml_supplier_analysis(company=None):
             }
 
         # Save results
-        saved_count = analyzer.save_analysis(company)
+        saved_count = analyzer.save_analysis(company, results)
 
         # Update supplier records with ML scores
         updated_suppliers = update_supplier_ml_scores(results, company)
@@ -493,64 +436,67 @@ def get_supplier_analytics_summary(company=None):
             "message": error_msg
         }
 
+def get_supplier_segment(score):
+    """Supplier segment written to the Supplier master for a score"""
+    if score >= 80:
+        return "Strategic"
+    elif score >= 60:
+        return "Preferred"
+    elif score >= 40:
+        return "Approved"
+    else:
+        return "Caution"
+
+def save_supplier_scores(results, company):
+    """Replace the company's rows in AI Supplier Score with the latest analysis"""
+    timestamp = frappe.utils.now()
+    fields = ["name", "company", "supplier", "score", "segment", "risk_score", "recommendation",
+              "total_orders", "total_value", "on_time_ratio", "last_scored",
+              "creation", "modified", "owner", "modified_by", "docstatus"]
+
+    frappe.db.delete("AI Supplier Score", {"company": company})
+    frappe.db.bulk_insert("AI Supplier Score", fields, [
+        [
+            frappe.generate_hash(length=10), company, result['supplier'], result['score'],
+            get_supplier_segment(result['score']),
+            # Risk score is the inverse of the performance score
+            max(0, 100 - result['score']),
+            result['recommendation'], result.get('total_orders', 0), result.get('total_value', 0),
+            result.get('on_time_ratio', 0), timestamp,
+            timestamp, timestamp, "Administrator", "Administrator", 0
+        ]
+        for result in results
+    ], chunk_size=1000)
+
 def update_supplier_ml_scores(results, company):
-    """Update supplier records with ML-calculated scores - COMPLETELY SAFE"""
+    """Copy the company's saved supplier scores onto the Supplier master in one statement"""
     try:
-        updated_count = 0
-
-        for result in results:
-            try:
-                supplier_name = result['supplier']
-                score = result['score']
-
-                # Check if supplier exists
-                if not frappe.db.exists("Supplier", supplier_name):
-                    continue
-
-                # Determine segment based on score
-                if score >= 80:
-                    segment = "Strategic"
-                elif score >= 60:
-                    segment = "Preferred"
-                elif score >= 40:
-                    segment = "Approved"
-                else:
-                    segment = "Caution"
-
-                # Calculate risk score (inverse of performance score)
-                risk_score = max(0, 100 - score)
-
-                # Check which fields exist in Supplier doctype and update safely
-                try:
-                    supplier_meta = frappe.get_meta("Supplier")
-                    
-                    if supplier_meta.has_field("supplier_segment"):
-                        frappe.db.set_value("Supplier", supplier_name, "supplier_segment", segment)
-
-                    if supplier_meta.has_field("risk_score"):
-                        frappe.db.set_value("Supplier", supplier_name, "risk_score", risk_score)
-
-                    if supplier_meta.has_field("deal_score"):
-                        frappe.db.set_value("Supplier", supplier_name, "deal_score", score)
-
-                    if supplier_meta.has_field("last_ml_update"):
-                        frappe.db.set_value("Supplier", supplier_name, "last_ml_update", frappe.utils.now())
-
-                    # Always update modified
-                    frappe.db.set_value("Supplier", supplier_name, "modified", frappe.utils.now())
-
-                    updated_count += 1
-
-                except Exception as field_error:
-                    frappe.log_error(f"Field update failed for {supplier_name}: {str(field_error)}")
-                    continue
+        suppliers = [result['supplier'] for result in results]
+        if not suppliers:
+            return 0
 
-            except Exception as e:
-                frappe.log_error(f"Failed to update supplier {result.get('supplier', 'Unknown')}: {str(e)}")
-                continue
+        # Only set the ML fields this site's Supplier doctype actually has
+        supplier_meta = frappe.get_meta("Supplier")
+        assignments = ["sup.modified = %(now)s"]
+        for fieldname, expression in (
+            ("supplier_segment", "sc.segment"),
+            ("risk_score", "sc.risk_score"),
+            ("deal_score", "sc.score"),
+            ("last_ml_update", "%(now)s"),
+        ):
+            if supplier_meta.has_field(fieldname):
+                assignments.append(f"sup.{fieldname} = {expression}")
+
+        frappe.db.sql(f"""
+            UPDATE `tabSupplier` sup
+            INNER JOIN `tabAI Supplier Score` sc ON sc.supplier = sup.name
+            SET {", ".join(assignments)}
+            WHERE sc.company = %(company)s
+            AND sc.supplier IN %(suppliers)s
+        """, {"company": company, "suppliers": suppliers, "now": frappe.utils.now()})
 
         frappe.db.commit()
-        return updated_count
+        return frappe.db.count("Supplier", {"name": ["in", suppliers]})
 
     except Exception as e:
         frappe.log_error(f"Failed to update supplier ML scores: {str(e)}")
@@ -655,11 +601,11 @@ def check_company_purchase_data(company):
         }
 
 @frappe.whitelist()
-def predict_purchase_price(item_code, supplier, company, qty=1):
+def predict_purchase_price(item_code, supplier, company, qty=1, conversion_factor=1):
     """Predict purchase price for an item from a supplier"""
     try:
         analyzer = MLSupplierAnalyzer()
-        result = analyzer.predict_item_price(item_code, supplier, company, qty)
+        result = analyzer.predict_item_price(item_code, supplier, company, qty, conversion_factor)
 
         if result.get('status') == 'success':
             return {
@@ -667,10 +613,11 @@ def predict_purchase_price(item_code, supplier, company, qty=1):
                 "predicted_price": result.get('predicted_price', 0),
                 "confidence": result.get('confidence', 0),
                 "historical_count": result.get('historical_count', 0),
+                "method": result.get('method'),
                 "message": f"Prediction based on {result.get('historical_count', 0)} historical records"
             }
         else:
-            standard_rate = frappe.db.get_value("Item", item_code, "standard_rate") or 0
+            standard_rate = flt(frappe.db.get_value("Item", item_code, "standard_rate")) * (flt(conversion_factor) or 1)
             return {
                 "status": "success",
                 "predicted_price": standard_rate,
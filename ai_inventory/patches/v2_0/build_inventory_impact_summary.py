@@ -0,0 +1,15 @@
+"""
+Patch to backfill forecast valuation rates and build the company inventory impact aggregate
+"""
+import frappe
+
+def execute():
+    """Build AI Inventory Impact Summary from existing AI Inventory Forecasts"""
+    from ai_inventory.ai_accounts_forecast.data_pipeline.inventory_impact import rebuild_inventory_impact_summary
+    
+    result = rebuild_inventory_impact_summary()
+    
+    if result.get("success"):
+        print(f"Built inventory impact summary with {result.get('buckets', 0)} buckets")
+    else:
+        print(f"Inventory impact summary build failed: {result.get('error')}")
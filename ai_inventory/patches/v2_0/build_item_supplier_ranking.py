@@ -0,0 +1,15 @@
+"""
+Patch to build the item to supplier ranking from submitted Purchase Orders
+"""
+import frappe
+
+def execute():
+    """Build AI Item Supplier Rank"""
+    from ai_inventory.supplier_ranking import rebuild_supplier_ranking
+    
+    result = rebuild_supplier_ranking()
+    
+    if result.get("success"):
+        print(f"Built item supplier ranking with {result.get('entries', 0)} entries")
+    else:
+        print(f"Item supplier ranking build failed: {result.get('error')}")
@@ -0,0 +1,15 @@
+"""
+Patch to build supplier and item lead time metrics from received Purchase Orders
+"""
+import frappe
+
+def execute():
+    """Build AI Lead Time Metric"""
+    from ai_inventory.lead_time_metrics import rebuild_lead_time_metrics
+    
+    result = rebuild_lead_time_metrics()
+    
+    if result.get("success"):
+        print(f"Built {result.get('metrics', 0)} lead time metrics")
+    else:
+        print(f"Lead time metrics build failed: {result.get('error')}")
@@ -0,0 +1,15 @@
+"""
+Patch to fill the purchase price history ring buffers from submitted Purchase Orders
+"""
+import frappe
+
+def execute():
+    """Build AI Price History"""
+    from ai_inventory.price_prediction import rebuild_price_history
+    
+    result = rebuild_price_history()
+    
+    if result.get("success"):
+        print(f"Built price history for {result.get('histories', 0)} item suppliers")
+    else:
+        print(f"Price history build failed: {result.get('error')}")
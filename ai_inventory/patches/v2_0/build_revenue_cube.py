@@ -0,0 +1,15 @@
+"""
+Patch to backfill the monthly revenue cube from submitted Sales Invoices
+"""
+import frappe
+
+def execute():
+    """Build AI Revenue Cube for the rebuild window"""
+    from ai_inventory.ai_accounts_forecast.data_pipeline.revenue_cube import rebuild_revenue_cube
+    
+    result = rebuild_revenue_cube()
+    
+    if result.get("success"):
+        print(f"Built revenue cube with {result.get('cells', 0)} cells")
+    else:
+        print(f"Revenue cube build failed: {result.get('error')}")
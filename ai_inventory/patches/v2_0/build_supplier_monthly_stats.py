@@ -0,0 +1,15 @@
+"""
+Patch to backfill supplier monthly statistics from submitted purchase documents
+"""
+import frappe
+
+def execute():
+    """Build AI Supplier Monthly Stats for the rebuild window"""
+    from ai_inventory.supplier_stats import rebuild_supplier_stats
+    
+    result = rebuild_supplier_stats()
+    
+    if result.get("success"):
+        print(f"Built supplier monthly stats with {result.get('buckets', 0)} buckets")
+    else:
+        print(f"Supplier monthly stats build failed: {result.get('error')}")
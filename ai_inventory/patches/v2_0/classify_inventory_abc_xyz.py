@@ -0,0 +1,15 @@
+"""
+Patch to set the initial ABC/XYZ class on every AI Inventory Forecast
+"""
+import frappe
+
+def execute():
+    """Classify AI Inventory Forecasts"""
+    from ai_inventory.abc_xyz_classification import classify_inventory
+    
+    result = classify_inventory()
+    
+    if result.get("success"):
+        print(f"Classified inventory forecasts: {result.get('classes', {})}")
+    else:
+        print(f"ABC/XYZ classification failed: {result.get('error')}")
@@ -0,0 +1,308 @@
+import frappe
+from frappe.utils import flt, getdate, now
+import hashlib
+import json
+from ai_inventory.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+RING_SIZE = 20
+RECENT_POINTS = 10
+MIN_REGRESSION_POINTS = 4
+MIN_DISTINCT_QTYS = 3
+STANDARD_RATE_CONFIDENCE = 30
+
+
+def get_history_name(company, item_code, supplier):
+    """Deterministic row name for a (company, item, supplier) price history"""
+    return hashlib.md5(f"{company}\n{item_code}\n{supplier}".encode()).hexdigest()[:16]
+
+
+def load_points(price_points):
+    """Decode a stored ring buffer into [date, stock qty, rate per stock UOM] points, oldest first"""
+    try:
+        return json.loads(price_points) if price_points else []
+    except ValueError:
+        return []
+
+
+def get_point(order_date, item):
+    """
+    One [date, stock qty, rate per stock UOM] point from a Purchase Order Item row
+
+    Orders of the same item may use different purchase UOMs, so points are
+    kept in stock UOM and lookups convert with the line's conversion factor.
+    """
+    conversion_factor = flt(item.conversion_factor) or 1
+    return [order_date, flt(item.stock_qty) or flt(item.qty) * conversion_factor,
+            flt(item.base_rate or item.rate) / conversion_factor]
+
+
+def get_purchase_order_points(doc):
+    """New price points per item from a Purchase Order"""
+    order_date = str(getdate(doc.transaction_date))
+    points = {}
+    for item in doc.get("items") or []:
+        if item.item_code and flt(item.base_rate or item.rate) > 0:
+            points.setdefault(item.item_code, []).append(get_point(order_date, item))
+    return points
+
+
+def get_histories(company, item_codes, supplier):
+    """Stored ring buffers for one supplier, keyed by item"""
+    rows = frappe.db.sql("""
+        SELECT item_code, price_points
+        FROM `tabAI Price History`
+        WHERE name IN %(names)s
+    """, {"names": [get_history_name(company, item_code, supplier) for item_code in item_codes]}, as_dict=True)
+    return {row.item_code: load_points(row.price_points) for row in rows}
+
+
+def save_history(company, item_code, supplier, points, timestamp):
+    """Upsert one key's ring buffer, keeping the newest RING_SIZE points"""
+    points = sorted(points, key=lambda point: point[0])[-RING_SIZE:]
+    if not points:
+        frappe.db.delete("AI Price History", {"name": get_history_name(company, item_code, supplier)})
+        return
+
+    frappe.db.sql("""
+        INSERT INTO `tabAI Price History`
+            (name, company, item_code, supplier, point_count, last_rate, last_order_date, price_points,
+             creation, modified, owner, modified_by, docstatus)
+        VALUES (%(name)s, %(company)s, %(item_code)s, %(supplier)s, %(point_count)s, %(last_rate)s,
+                %(last_order_date)s, %(price_points)s, %(now)s, %(now)s, 'Administrator', 'Administrator', 0)
+        ON DUPLICATE KEY UPDATE
+            point_count = VALUES(point_count),
+            last_rate = VALUES(last_rate),
+            last_order_date = VALUES(last_order_date),
+            price_points = VALUES(price_points),
+            modified = VALUES(modified)
+    """, {
+        "name": get_history_name(company, item_code, supplier),
+        "company": company, "item_code": item_code, "supplier": supplier,
+        "point_count": len(points), "last_rate": points[-1][2], "last_order_date": points[-1][0],
+        "price_points": json.dumps(points), "now": timestamp
+    })
+
+
+def on_purchase_order_submit(doc, method):
+    """Push a submitted Purchase Order's rates into its price histories"""
+    try:
+        new_points = get_purchase_order_points(doc)
+        if not new_points:
+            return
+
+        histories = get_histories(doc.company, new_points, doc.supplier)
+        timestamp = now()
+        for item_code, points in new_points.items():
+            save_history(doc.company, item_code, doc.supplier, histories.get(item_code, []) + points, timestamp)
+
+    except Exception as e:
+        frappe.log_error(f"Price history update failed for {doc.name}: {str(e)}", "Price History")
+
+
+def on_purchase_order_cancel(doc, method):
+    """Drop a cancelled Purchase Order's rates from its price histories"""
+    try:
+        removed_points = get_purchase_order_points(doc)
+        if not removed_points:
+            return
+
+        histories = get_histories(doc.company, removed_points, doc.supplier)
+        timestamp = now()
+        for item_code, points in removed_points.items():
+            if item_code not in histories:
+                continue
+            remaining = histories[item_code]
+            for point in points:
+                if point in remaining:
+                    remaining.remove(point)
+            # Older points pushed out of the buffer by this order come back with the weekly rebuild
+            save_history(doc.company, item_code, doc.supplier, remaining, timestamp)
+
+    except Exception as e:
+        frappe.log_error(f"Price history update failed for {doc.name}: {str(e)}", "Price History")
+
+
+def fit_quantity_breaks(qtys, rates):
+    """
+    Least squares fit of rate = a + b * log(qty)
+
+    Returns (a, b, r_squared) or None when the points cannot carry a curve.
+    """
+    qtys = np.asarray(qtys, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    usable = qtys > 0
+    if usable.sum() < MIN_REGRESSION_POINTS or np.unique(qtys[usable]).size < MIN_DISTINCT_QTYS:
+        return None
+
+    log_qty = np.log(qtys[usable])
+    rates = rates[usable]
+    slope, intercept = np.polyfit(log_qty, rates, 1)
+
+    total = ((rates - rates.mean()) ** 2).sum()
+    residual = ((rates - (intercept + slope * log_qty)) ** 2).sum()
+    r_squared = 1 - residual / total if total > 0 else 0
+
+    return intercept, slope, r_squared
+
+
+def predict_from_points(points, qty, conversion_factor=1):
+    """Price per line UOM for qty line UOMs from one key's ring buffer"""
+    conversion_factor = flt(conversion_factor) or 1
+    qty = flt(qty) * conversion_factor
+    recent = points[-RECENT_POINTS:]
+    recent_rates = [flt(point[2]) for point in recent]
+    prediction = {
+        "status": "success",
+        "predicted_price": sum(recent_rates) / len(recent_rates),
+        "confidence": min(90, len(recent) * 10),
+        "historical_count": len(recent),
+        "last_price": recent_rates[-1] * conversion_factor,
+        "method": "recent_average"
+    }
+
+    fit = fit_quantity_breaks([point[1] for point in points], [point[2] for point in points])
+    if fit and fit[2] > 0 and flt(qty) > 0:
+        intercept, slope, r_squared = fit
+        rates = [flt(point[2]) for point in points]
+        # Never extrapolate beyond the prices actually paid
+        predicted = min(max(intercept + slope * np.log(flt(qty)), min(rates)), max(rates))
+        prediction.update({
+            "predicted_price": float(predicted),
+            "confidence": min(90, int(prediction["confidence"] * (0.5 + r_squared / 2)) + 10),
+            "historical_count": len(points),
+            "method": "quantity_regression"
+        })
+
+    prediction["predicted_price"] = flt(prediction["predicted_price"] * conversion_factor, 2)
+    return prediction
+
+
+def predict_prices(lines):
+    """
+    Predict purchase prices for many (item_code, supplier, company, qty) lines at once
+
+    qty and the returned prices are in the line's UOM, given by an optional
+    conversion_factor to stock UOM (default 1). Reads every price history in
+    one query and the Item standard rate fallback in another. Returns
+    predictions in the order of the lines.
+    """
+    lines = [frappe._dict(line) for line in lines or []]
+    keys = {
+        get_history_name(line.company, line.item_code, line.supplier)
+        for line in lines if line.item_code and line.supplier and line.company
+    }
+
+    histories = {}
+    if keys:
+        for row in frappe.db.sql("""
+            SELECT name, price_points
+            FROM `tabAI Price History`
+            WHERE name IN %(names)s
+        """, {"names": list(keys)}, as_dict=True):
+            histories[row.name] = load_points(row.price_points)
+
+    predictions = []
+    missing_items = set()
+    for line in lines:
+        points = histories.get(get_history_name(line.company, line.item_code, line.supplier)) if line.item_code else None
+        if points:
+            predictions.append(predict_from_points(points, line.qty or 1, line.conversion_factor))
+        else:
+            predictions.append(None)
+            if line.item_code:
+                missing_items.add(line.item_code)
+
+    standard_rates = {}
+    if missing_items:
+        standard_rates = dict(frappe.db.sql("""
+            SELECT name, standard_rate FROM `tabItem` WHERE name IN %(items)s
+        """, {"items": list(missing_items)}))
+
+    for i, line in enumerate(lines):
+        if predictions[i] is None:
+            predictions[i] = {
+                "status": "success",
+                "predicted_price": flt(standard_rates.get(line.item_code)) * (flt(line.conversion_factor) or 1),
+                "confidence": STANDARD_RATE_CONFIDENCE,
+                "historical_count": 0,
+                "last_price": 0,
+                "method": "standard_rate"
+            }
+
+    return predictions
+
+
+@frappe.whitelist()
+def predict_purchase_prices(lines):
+    """Batch price prediction for a list of {item_code, supplier, company, qty, conversion_factor}"""
+    try:
+        if isinstance(lines, str):
+            lines = json.loads(lines)
+
+        predictions = predict_prices(lines)
+        for prediction in predictions:
+            prediction["message"] = f"Prediction based on {prediction['historical_count']} historical records"
+
+        return {"status": "success", "predictions": predictions}
+
+    except Exception as e:
+        frappe.log_error(f"Batch price prediction failed: {str(e)}", "Price Prediction")
+        return {"status": "error", "message": str(e)}
+
+
+def rebuild_price_history(company=None):
+    """Reload every ring buffer with the newest RING_SIZE submitted Purchase Order rates"""
+    try:
+        values = {"company": company, "ring_size": RING_SIZE}
+        company_condition = "AND po.company = %(company)s" if company else ""
+
+        rows = frappe.db.sql(f"""
+            SELECT company, item_code, supplier, transaction_date, qty, stock_qty, conversion_factor, base_rate, rate
+            FROM (
+                SELECT
+                    po.company, poi.item_code, po.supplier, po.transaction_date,
+                    poi.qty, poi.stock_qty, poi.conversion_factor, poi.base_rate, poi.rate,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY po.company, poi.item_code, po.supplier
+                        ORDER BY po.transaction_date DESC, po.creation DESC
+                    ) AS recency
+                FROM `tabPurchase Order` po
+                INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
+                WHERE po.docstatus = 1
+                AND IFNULL(NULLIF(poi.base_rate, 0), poi.rate) > 0
+                {company_condition}
+            ) lines
+            WHERE recency <= %(ring_size)s
+            ORDER BY company, item_code, supplier, recency DESC
+        """, values, as_dict=True)
+
+        histories = {}
+        for row in rows:
+            if row.company and row.item_code and row.supplier:
+                histories.setdefault((row.company, row.item_code, row.supplier), []).append(
+                    get_point(str(row.transaction_date), row))
+
+        if company:
+            frappe.db.delete("AI Price History", {"company": company})
+        else:
+            frappe.db.delete("AI Price History")
+
+        timestamp = now()
+        fields = ["name", "company", "item_code", "supplier", "point_count", "last_rate", "last_order_date",
+                  "price_points", "creation", "modified", "owner", "modified_by", "docstatus"]
+        frappe.db.bulk_insert("AI Price History", fields, [
+            [get_history_name(*key), *key, len(points), points[-1][2], points[-1][0], json.dumps(points),
+             timestamp, timestamp, "Administrator", "Administrator", 0]
+            for key, points in histories.items()
+        ], chunk_size=1000)
+
+        frappe.db.commit()
+
+        return {"success": True, "histories": len(histories)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Price history rebuild failed: {str(e)}", "Price History")
+        return {"success": False, "error": str(e)}
@@ -78,44 +78,36 @@ function get_ml_price_predictions_for_po(frm) {
         </div>
     `);
     
-    // Get predictions for all items
-    let predictions_promises = [];
+    // Get predictions for all items in one request
+    let lines = frm.doc.items
+        .map((item, index) => ({ item: item, index: index }))
+        .filter((line) => line.item.item_code);
     
-    frm.doc.items.forEach((item, index) => {
-        if (item.item_code) {
-            let promise = new Promise((resolve) => {
-                frappe.call({
-                    method: 'ai_inventory.ml_supplier_analyzer.predict_purchase_price',
-                    args: {
-                        item_code: item.item_code,
-                        supplier: frm.doc.supplier,
-                        company: frm.doc.company,
-                        qty: item.qty || 1
-                    },
-                    callback: function(r) {
-                        resolve({
-                            index: index,
-                            item_code: item.item_code,
-                            current_rate: item.rate || 0,
-                            prediction: r.message || {}
-                        });
-                    },
-                    error: function() {
-                        resolve({
-                            index: index,
-                            item_code: item.item_code,
-                            current_rate: item.rate || 0,
-                            prediction: { status: 'error', message: 'Prediction failed' }
-                        });
-                    }
-                });
-            });
-            predictions_promises.push(promise);
-        }
-    });
+    let build_results = (predictions) => lines.map((line, position) => ({
+        index: line.index,
+        item_code: line.item.item_code,
+        current_rate: line.item.rate || 0,
+        prediction: predictions[position] || { status: 'error', message: 'Prediction failed' }
+    }));
     
-    Promise.all(predictions_promises).then((results) => {
-        display_price_predictions(predictions_wrapper, results, frm, dialog);
+    frappe.call({
+        method: 'ai_inventory.price_prediction.predict_purchase_prices',
+        args: {
+            lines: lines.map((line) => ({
+                item_code: line.item.item_code,
+                supplier: frm.doc.supplier,
+                company: frm.doc.company,
+                qty: line.item.qty || 1,
+                conversion_factor: line.item.conversion_factor || 1
+            }))
+        },
+        callback: function(r) {
+            let predictions = (r.message && r.message.status === 'success') ? r.message.predictions : [];
+            display_price_predictions(predictions_wrapper, build_results(predictions), frm, dialog);
+        },
+        error: function() {
+            display_price_predictions(predictions_wrapper, build_results([]), frm, dialog);
+        }
     });
 }
 
@@ -273,7 +265,8 @@ function get_ml_price_prediction_for_item(frm, row, cdt, cdn) {
             item_code: row.item_code,
             supplier: frm.doc.supplier,
             company: frm.doc.company,
-            qty: row.qty || 1
+            qty: row.qty || 1,
+            conversion_factor: row.conversion_factor || 1
         },
         callback: function(r) {
             if (r.message && r.message.status === 'success') {
@@ -4,105 +4,20 @@
 import frappe
 from frappe.utils import now, nowdate, add_days
 
-def real_time_stock_monitor():
-    """Real-time stock monitoring (every 5 minutes)"""
-    try:
-        # Get critical alerts
-        critical_alerts = frappe.db.sql("""
-            SELECT 
-                item_code, warehouse, company, current_stock, reorder_level
-            FROM `tabAI Inventory Forecast`
-            WHERE reorder_alert = 1 
-            AND movement_type IN ('Fast Moving', 'Critical')
-            AND current_stock <= reorder_level * 0.5
-            LIMIT 10
-        """, as_dict=True)
-        
-        if critical_alerts:
-            # Send real-time notifications
-            for alert in critical_alerts:
-                try:
-                    frappe.publish_realtime(
-                        event="critical_stock_alert",
-                        message={
-                            "item_code": alert.item_code,
-                            "warehouse": alert.warehouse,
-                            "company": alert.company,
-                            "current_stock": alert.current_stock,
-                            "reorder_level": alert.reorder_level
-                        },
-                        room="stock_managers"
-                    )
-                except:
-                    pass  # Skip if realtime fails
-        
-        frappe.logger().info(f"Real-time monitor: {len(critical_alerts)} critical alerts")
-        
-    except Exception as e:
-        frappe.log_error(title="Real-time stock monitor failed", message=frappe.get_traceback())
-
 def check_financial_alerts():
     """Check and create financial alerts (hourly)"""
     try:
-        from ai_inventory.ai_inventory.doctype.ai_financial_alert.ai_financial_alert import create_financial_alert
+        from ai_inventory.ai_accounts_forecast.managers.alert_engine import FinancialAlertEngine
         
-        # Get all active financial forecasts
-        forecasts = frappe.get_all("AI Financial Forecast",
-            filters={"docstatus": ["!=", 2]},
-            fields=["name", "company", "forecast_type", "predicted_amount", "confidence_score", "forecast_start_date"]
-        )
+        # Evaluate all alert rules over the forecast table in one pass
+        result = FinancialAlertEngine().run()
         
-        alerts_created = 0
-        
-        for forecast in forecasts:
-            try:
-                forecast_doc = frappe.get_doc("AI Financial Forecast", forecast.name)
-                
-                # Check balance alerts for cash flow forecasts
-                if forecast.forecast_type == "Cash Flow":
-                    alert_result = forecast_doc.check_balance_alerts()
-                    if alert_result.get("success") and alert_result.get("alert_count", 0) > 0:
-                        alerts_created += alert_result.get("alert_count", 0)
-                
-                # Check for low confidence scores
-                if forecast.confidence_score and forecast.confidence_score < 50:
-                    alert_data = {
-                        "company": forecast.company,
-                        "title": "Low Confidence Forecast",
-                        "message": f"Forecast {forecast.name} has low confidence score: {forecast.confidence_score}%",
-                        "priority": "Medium",
-                        "alert_type": "Forecast Quality",
-                        "related_forecast": forecast.name,
-                        "forecast_type": forecast.forecast_type,
-                        "confidence_level": forecast.confidence_score,
-                        "recommended_action": "Review forecast parameters and data quality"
-                    }
-                    
-                    # Check if similar alert already exists today
-                    existing_alert = frappe.get_all("AI Financial Alert",
-                        filters={
-                            "related_forecast": forecast.name,
-                            "alert_type": "Forecast Quality",
-                            "alert_date": nowdate(),
-                            "status": ["in", ["Open", "Investigating"]]
-                        },
-                        limit=1
-                    )
-                    
-                    if not existing_alert:
-                        create_result = create_financial_alert(alert_data)
-                        if create_result.get("success"):
-                            alerts_created += 1
-                            
-            except Exception as e:
-                frappe.log_error(
-                    title=f"Financial alert check failed for {forecast.name}",
-                    message=frappe.get_traceback()
-                )
-        
-        frappe.logger().info(f"Financial alert check: {alerts_created} alerts created")
+        frappe.logger().info(
+            f"Financial alert check: {result.get('alerts_created', 0)} alerts created "
+            f"from {result.get('forecasts_evaluated', 0)} forecasts"
+        )
         
-        return {"success": True, "alerts_created": alerts_created}
+        return result
         
     except Exception as e:
         frappe.log_error(title="Financial alert check failed", message=frappe.get_traceback())
@@ -199,43 +114,29 @@ def weekly_forecast_analysis():
 def optimize_forecast_performance():
     """Monthly forecast performance optimization"""
     try:
-        # Archive old forecast details to improve performance
-        cutoff_date = add_days(nowdate(), -90)
+        from ai_inventory.archive import archive_forecast_details
         
-        archived_count = frappe.db.sql("""
-            UPDATE `tabAI Inventory Forecast`
-            SET forecast_details = 'Archived - details cleared for performance'
-            WHERE last_forecast_date < %s
-            AND LENGTH(forecast_details) > 1000
-        """, (cutoff_date,))
+        # Move old forecast details to the archive instead of overwriting them
+        archived_count = archive_forecast_details(90)
         
-        frappe.db.commit()
+        frappe.logger().info(f"Monthly optimization: Archived details of {archived_count} forecasts")
         
-        frappe.logger().info(f"Monthly optimization: Archived details for performance")
-        
-        return {"status": "success", "message": "Monthly optimization completed"}
+        return {"status": "success", "message": "Monthly optimization completed", "archived": archived_count}
         
     except Exception as e:
         frappe.log_error(title="Monthly optimization failed", message=frappe.get_traceback())
         return {"status": "error", "message": str(e)}
 
 def cleanup_old_forecast_data():
-    """Monthly cleanup of old forecast data"""
+    """Monthly archival of old sync log, accuracy, sales/financial forecast and AI error log rows"""
     try:
-        # Clean up very old error logs related to AI Inventory
-        old_date = add_days(nowdate(), -30)
-        
-        frappe.db.sql("""
-            DELETE FROM `tabError Log`
-            WHERE creation < %s
-            AND error LIKE '%AI Inventory%'
-        """, (old_date,))
+        from ai_inventory.archive import archive_old_records
         
-        frappe.db.commit()
+        result = archive_old_records()
         
-        frappe.logger().info("Monthly cleanup: Removed old AI Inventory error logs")
+        frappe.logger().info(f"Monthly cleanup: Archived {result['archived']}")
         
-        return {"status": "success", "message": "Monthly cleanup completed"}
+        return {"status": "success", "message": "Monthly cleanup completed", "archived": result["archived"]}
         
     except Exception as e:
         frappe.log_error(title="Monthly cleanup failed", message=frappe.get_traceback())
@@ -0,0 +1,13 @@
+import frappe
+from frappe.utils import cint
+
+
+def reserve_series(key, count):
+    """Advance a tabSeries counter by count with one locked update, returning its previous value"""
+    frappe.db.sql("""
+        INSERT INTO `tabSeries` (name, current) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE name = name
+    """, key)
+    current = cint(frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s FOR UPDATE", key)[0][0])
+    frappe.db.sql("UPDATE `tabSeries` SET current = current + %s WHERE name = %s", (count, key))
+    return current
@@ -0,0 +1,139 @@
+import frappe
+from frappe.utils import flt, now
+
+ALERT_MOVEMENT_TYPES = ("Fast Moving", "Critical")
+CRITICAL_RATIO = 0.5  # alert once stock falls to half the reorder level
+CLEAR_RATIO = 0.6  # and clear it only after stock is back above 60% of it, so it does not flap
+THRESHOLD_CACHE_KEY = "ai_inventory_reorder_thresholds"
+THRESHOLD_CACHE_TTL = 3600  # the whole hash expires, catching writers that bypass clear_threshold_cache
+ALERT_STATE_KEY = "ai_inventory_stock_alert_state"  # listed in persistent_cache_keys, survives clear-cache
+
+
+def get_pair_key(item_code, warehouse):
+    return f"{item_code}::{warehouse}"
+
+
+def get_thresholds(pairs):
+    """
+    Reorder threshold per (item, warehouse), from the cache or one forecast query
+
+    Pairs that should never alert are cached as an empty dict so they are not
+    looked up again until their forecast changes or the hash expires.
+    """
+    cache = frappe.cache()
+    thresholds = {}
+    missing = []
+    for pair in pairs:
+        threshold = cache.hget(THRESHOLD_CACHE_KEY, get_pair_key(*pair))
+        if threshold is None:
+            missing.append(pair)
+        else:
+            thresholds[pair] = threshold
+
+    if missing:
+        rows = frappe.db.sql("""
+            SELECT name, item_code, warehouse, company, reorder_level, movement_type
+            FROM `tabAI Inventory Forecast`
+            WHERE item_code IN %(item_codes)s
+            AND warehouse IN %(warehouses)s
+            AND (item_code, warehouse) IN %(pairs)s
+        """, {
+            "item_codes": list({pair[0] for pair in missing}),
+            "warehouses": list({pair[1] for pair in missing}),
+            "pairs": missing
+        }, as_dict=True)
+        forecasts = {(row.item_code, row.warehouse): row for row in rows}
+
+        for pair in missing:
+            row = forecasts.get(pair)
+            threshold = {}
+            if row and row.movement_type in ALERT_MOVEMENT_TYPES and flt(row.reorder_level) > 0:
+                threshold = {"forecast": row.name, "company": row.company, "reorder_level": flt(row.reorder_level)}
+            cache.hset(THRESHOLD_CACHE_KEY, get_pair_key(*pair), threshold)
+            thresholds[pair] = threshold
+
+        key = cache.make_key(THRESHOLD_CACHE_KEY)
+        if cache.ttl(key) < 0:
+            cache.expire(key, THRESHOLD_CACHE_TTL)
+
+    return thresholds
+
+
+def clear_threshold_cache(doc=None, method=None):
+    """Drop a forecast's cached threshold when it is saved or deleted, or all of them"""
+    if doc:
+        frappe.cache().hdel(THRESHOLD_CACHE_KEY, get_pair_key(doc.item_code, doc.warehouse))
+    else:
+        frappe.cache().delete_value(THRESHOLD_CACHE_KEY)
+
+
+def get_stock_levels(pairs):
+    """Bin actual_qty for (item, warehouse) pairs from one query"""
+    return {
+        (row[0], row[1]): flt(row[2])
+        for row in frappe.db.sql("""
+            SELECT item_code, warehouse, actual_qty
+            FROM `tabBin`
+            WHERE item_code IN %(item_codes)s
+            AND warehouse IN %(warehouses)s
+            AND (item_code, warehouse) IN %(pairs)s
+        """, {
+            "item_codes": list({pair[0] for pair in pairs}),
+            "warehouses": list({pair[1] for pair in pairs}),
+            "pairs": pairs
+        })
+    }
+
+
+def evaluate_stock_alerts(pairs):
+    """
+    Compare the stock of touched pairs with their reorder thresholds
+
+    Only threshold crossings are reported: a pair alerts when it falls to
+    CRITICAL_RATIO of its reorder level and clears when it climbs back above
+    CLEAR_RATIO. All crossings go out in a single realtime event.
+    """
+    pairs = [tuple(pair) for pair in pairs]
+    if not pairs:
+        return {"alerts": [], "cleared": []}
+
+    thresholds = get_thresholds(pairs)
+    alerting_pairs = [pair for pair in pairs if thresholds.get(pair)]
+    if not alerting_pairs:
+        return {"alerts": [], "cleared": []}
+
+    cache = frappe.cache()
+    stock_levels = get_stock_levels(alerting_pairs)
+    alerts, cleared = [], []
+    for pair in alerting_pairs:
+        threshold = thresholds[pair]
+        current_stock = stock_levels.get(pair, 0)
+        key = get_pair_key(*pair)
+        alerting = cache.hget(ALERT_STATE_KEY, key)
+        entry = {
+            "item_code": pair[0],
+            "warehouse": pair[1],
+            "company": threshold["company"],
+            "current_stock": current_stock,
+            "reorder_level": threshold["reorder_level"],
+            "forecast": threshold["forecast"]
+        }
+
+        if not alerting and current_stock <= threshold["reorder_level"] * CRITICAL_RATIO:
+            cache.hset(ALERT_STATE_KEY, key, 1)
+            alerts.append(entry)
+        elif alerting and current_stock > threshold["reorder_level"] * CLEAR_RATIO:
+            cache.hdel(ALERT_STATE_KEY, key)
+            cleared.append(entry)
+
+    if alerts or cleared:
+        try:
+            frappe.publish_realtime(
+                event="critical_stock_alerts",
+                message={"alerts": alerts, "cleared": cleared, "timestamp": now()},
+                room="stock_managers"
+            )
+        except Exception:
+            pass  # Skip if realtime fails
+
+    return {"alerts": alerts, "cleared": cleared}
@@ -0,0 +1,207 @@
+import frappe
+from frappe.utils import flt, getdate, now
+import hashlib
+
+RANKING_ORDER = "order_count DESC, last_order_date DESC"
+
+
+def get_rank_name(company, item_code, supplier):
+    """Deterministic row name for a (company, item, supplier) entry"""
+    return hashlib.md5(f"{company}\n{item_code}\n{supplier}".encode()).hexdigest()[:16]
+
+
+def rerank_items(company, item_codes):
+    """Renumber supplier_rank for the given items in one statement"""
+    if not item_codes:
+        return
+
+    frappe.db.sql(f"""
+        UPDATE `tabAI Item Supplier Rank` r
+        INNER JOIN (
+            SELECT name, ROW_NUMBER() OVER (
+                PARTITION BY company, item_code ORDER BY {RANKING_ORDER}
+            ) AS new_rank
+            FROM `tabAI Item Supplier Rank`
+            WHERE company = %(company)s
+            AND item_code IN %(item_codes)s
+        ) ranked ON ranked.name = r.name
+        SET r.supplier_rank = ranked.new_rank
+    """, {"company": company, "item_codes": list(item_codes)})
+
+
+def get_purchase_order_lines(doc):
+    """Per-item line totals of a Purchase Order"""
+    lines = {}
+    for item in doc.get("items") or []:
+        line = lines.setdefault(item.item_code, {"order_count": 0, "total_qty": 0, "rate_sum": 0, "last_rate": 0})
+        rate = flt(item.base_rate or item.rate)
+        line["order_count"] += 1
+        line["total_qty"] += flt(item.stock_qty or item.qty)
+        line["rate_sum"] += rate
+        line["last_rate"] = rate
+    return lines
+
+
+def on_purchase_order_submit(doc, method):
+    """Patch the ranking for the items on a submitted Purchase Order"""
+    try:
+        lines = get_purchase_order_lines(doc)
+        timestamp = now()
+
+        for item_code, line in lines.items():
+            frappe.db.sql("""
+                INSERT INTO `tabAI Item Supplier Rank`
+                    (name, company, item_code, supplier, supplier_rank, order_count, total_qty,
+                     rate_sum, avg_rate, last_rate, last_order_date,
+                     creation, modified, owner, modified_by, docstatus)
+                VALUES (%(name)s, %(company)s, %(item_code)s, %(supplier)s, 0, %(order_count)s, %(total_qty)s,
+                        %(rate_sum)s, %(rate_sum)s / %(order_count)s, %(last_rate)s, %(order_date)s,
+                        %(now)s, %(now)s, 'Administrator', 'Administrator', 0)
+                ON DUPLICATE KEY UPDATE
+                    last_rate = IF(VALUES(last_order_date) >= IFNULL(last_order_date, VALUES(last_order_date)),
+                                   VALUES(last_rate), last_rate),
+                    last_order_date = GREATEST(IFNULL(last_order_date, VALUES(last_order_date)), VALUES(last_order_date)),
+                    order_count = order_count + VALUES(order_count),
+                    total_qty = total_qty + VALUES(total_qty),
+                    rate_sum = rate_sum + VALUES(rate_sum),
+                    avg_rate = rate_sum / order_count,
+                    modified = VALUES(modified)
+            """, dict(line,
+                name=get_rank_name(doc.company, item_code, doc.supplier),
+                company=doc.company, item_code=item_code, supplier=doc.supplier,
+                order_date=getdate(doc.transaction_date), now=timestamp))
+
+        rerank_items(doc.company, lines.keys())
+
+    except Exception as e:
+        frappe.log_error(f"Supplier ranking update failed for {doc.name}: {str(e)}", "Supplier Ranking")
+
+
+def on_purchase_order_cancel(doc, method):
+    """Take a cancelled Purchase Order back out of the ranking"""
+    try:
+        lines = get_purchase_order_lines(doc)
+
+        for item_code, line in lines.items():
+            frappe.db.sql("""
+                UPDATE `tabAI Item Supplier Rank`
+                SET order_count = order_count - %(order_count)s,
+                    total_qty = total_qty - %(total_qty)s,
+                    rate_sum = rate_sum - %(rate_sum)s,
+                    avg_rate = IF(order_count > 0, rate_sum / order_count, 0),
+                    modified = %(now)s
+                WHERE name = %(name)s
+            """, dict(line, name=get_rank_name(doc.company, item_code, doc.supplier), now=now()))
+
+        # Last rate and date of a removed order are restored by the nightly rebuild
+        frappe.db.delete("AI Item Supplier Rank", {
+            "company": doc.company,
+            "item_code": ["in", list(lines)],
+            "order_count": ["<=", 0]
+        })
+        rerank_items(doc.company, lines.keys())
+
+    except Exception as e:
+        frappe.log_error(f"Supplier ranking update failed for {doc.name}: {str(e)}", "Supplier Ranking")
+
+
+def get_ranked_suppliers(item_codes, company=None, limit=5):
+    """
+    Ranked suppliers for many items in one indexed lookup
+
+    Returns {item_code: [entries best first]}. Without a company, entries
+    from every company are merged and each supplier is listed once.
+    """
+    if isinstance(item_codes, str):
+        item_codes = [item_codes]
+    item_codes = list({code for code in item_codes if code})
+    if not item_codes:
+        return {}
+
+    conditions = "item_code IN %(item_codes)s"
+    if company:
+        conditions += " AND company = %(company)s AND supplier_rank <= %(limit)s"
+
+    rows = frappe.db.sql(f"""
+        SELECT item_code, supplier, supplier_rank, order_count, total_qty,
+               avg_rate, last_rate, last_order_date
+        FROM `tabAI Item Supplier Rank`
+        WHERE {conditions}
+        ORDER BY item_code, {RANKING_ORDER}
+    """, {"item_codes": item_codes, "company": company, "limit": limit}, as_dict=True)
+
+    ranked = {}
+    for row in rows:
+        entries = ranked.setdefault(row.item_code, [])
+        if len(entries) < limit and row.supplier not in {entry.supplier for entry in entries}:
+            entries.append(row)
+
+    return ranked
+
+
+def get_most_recent_supplier(entries):
+    """The entry last ordered from, out of an item's ranked suppliers"""
+    dated = [entry for entry in entries or [] if entry.last_order_date]
+    return max(dated, key=lambda entry: entry.last_order_date) if dated else None
+
+
+def rebuild_supplier_ranking(company=None):
+    """Recompute the whole (company, item) -> supplier ranking from submitted Purchase Orders"""
+    try:
+        values = {"company": company}
+        company_condition = "AND po.company = %(company)s" if company else ""
+
+        rows = frappe.db.sql(f"""
+            SELECT
+                company, item_code, supplier,
+                COUNT(*) AS order_count,
+                SUM(qty) AS total_qty,
+                SUM(rate) AS rate_sum,
+                AVG(rate) AS avg_rate,
+                MAX(CASE WHEN recency = 1 THEN rate END) AS last_rate,
+                MAX(transaction_date) AS last_order_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY company, item_code ORDER BY COUNT(*) DESC, MAX(transaction_date) DESC
+                ) AS supplier_rank
+            FROM (
+                SELECT
+                    po.company, poi.item_code, po.supplier, po.transaction_date,
+                    IFNULL(NULLIF(poi.stock_qty, 0), poi.qty) AS qty,
+                    IFNULL(NULLIF(poi.base_rate, 0), poi.rate) AS rate,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY po.company, poi.item_code, po.supplier
+                        ORDER BY po.transaction_date DESC, po.creation DESC
+                    ) AS recency
+                FROM `tabPurchase Order` po
+                INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
+                WHERE po.docstatus = 1
+                {company_condition}
+            ) lines
+            GROUP BY company, item_code, supplier
+        """, values, as_dict=True)
+
+        if company:
+            frappe.db.delete("AI Item Supplier Rank", {"company": company})
+        else:
+            frappe.db.delete("AI Item Supplier Rank")
+
+        timestamp = now()
+        fields = ["name", "company", "item_code", "supplier", "supplier_rank", "order_count", "total_qty",
+                  "rate_sum", "avg_rate", "last_rate", "last_order_date", "last_rebuilt",
+                  "creation", "modified", "owner", "modified_by", "docstatus"]
+        frappe.db.bulk_insert("AI Item Supplier Rank", fields, [
+            [get_rank_name(row.company, row.item_code, row.supplier), row.company, row.item_code, row.supplier,
+             row.supplier_rank, row.order_count, flt(row.total_qty), flt(row.rate_sum), flt(row.avg_rate),
+             flt(row.last_rate), row.last_order_date, timestamp,
+             timestamp, timestamp, "Administrator", "Administrator", 0]
+            for row in rows if row.company and row.item_code and row.supplier
+        ], chunk_size=1000)
+
+        frappe.db.commit()
+
+        return {"success": True, "entries": len(rows)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Supplier ranking rebuild failed: {str(e)}", "Supplier Ranking")
+        return {"success": False, "error": str(e)}
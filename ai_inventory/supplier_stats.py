@@ -0,0 +1,207 @@
+import frappe
+from frappe.utils import add_days, add_months, flt, get_first_day, getdate, now, nowdate
+import hashlib
+
+STAT_FIELDS = ["order_count", "line_count", "line_value", "total_qty",
+               "rate_sum", "rate_sq_sum", "received_lines", "on_time_lines"]
+REBUILD_MONTHS = 24
+
+
+def get_stats_name(company, supplier, month):
+    """Deterministic row name for a (company, supplier, month) bucket"""
+    return hashlib.md5(f"{company}\n{supplier}\n{getdate(month)}".encode()).hexdigest()[:16]
+
+
+def empty_stats():
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def apply_stats_delta(company, supplier, month, delta, sign=1):
+    """Atomically add (or subtract) a delta to a supplier month"""
+    if not company or not supplier:
+        return
+
+    timestamp = now()
+    month = get_first_day(month)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabAI Supplier Monthly Stats`
+            (name, company, supplier, month, {", ".join(STAT_FIELDS)},
+             creation, modified, owner, modified_by, docstatus)
+        VALUES (%s, %s, %s, %s, {", ".join(["%s"] * len(STAT_FIELDS))}, %s, %s, 'Administrator', 'Administrator', 0)
+        ON DUPLICATE KEY UPDATE
+            {", ".join(f"{field} = {field} + VALUES({field})" for field in STAT_FIELDS)},
+            modified = VALUES(modified)
+    """, [get_stats_name(company, supplier, month), company, supplier, month]
+        + [sign * flt(delta.get(field)) for field in STAT_FIELDS]
+        + [timestamp, timestamp])
+
+
+def get_purchase_order_delta(doc):
+    """Order and line statistics a Purchase Order contributes"""
+    delta = empty_stats()
+    delta["order_count"] = 1
+
+    for item in doc.get("items") or []:
+        rate = flt(item.base_rate or item.rate)
+        delta["line_count"] += 1
+        delta["line_value"] += flt(item.base_net_amount or item.amount)
+        delta["total_qty"] += flt(item.stock_qty or item.qty)
+        delta["rate_sum"] += rate
+        delta["rate_sq_sum"] += rate * rate
+
+    return delta
+
+
+def get_purchase_receipt_delta(doc):
+    """Received and on-time line counts a Purchase Receipt contributes"""
+    delta = empty_stats()
+    po_items = [item.purchase_order_item for item in doc.get("items") or [] if item.get("purchase_order_item")]
+    if not po_items:
+        return delta
+
+    schedule_dates = dict(frappe.db.sql("""
+        SELECT name, schedule_date
+        FROM `tabPurchase Order Item`
+        WHERE name IN %(names)s
+    """, {"names": po_items}))
+
+    posting_date = getdate(doc.posting_date)
+    for po_item in po_items:
+        delta["received_lines"] += 1
+        schedule_date = schedule_dates.get(po_item)
+        if not schedule_date or posting_date <= getdate(schedule_date):
+            delta["on_time_lines"] += 1
+
+    return delta
+
+
+def on_purchase_order_submit(doc, method):
+    try:
+        apply_stats_delta(doc.company, doc.supplier, doc.transaction_date, get_purchase_order_delta(doc))
+    except Exception as e:
+        frappe.log_error(f"Supplier stats update failed for {doc.name}: {str(e)}", "Supplier Stats")
+
+
+def on_purchase_order_cancel(doc, method):
+    try:
+        apply_stats_delta(doc.company, doc.supplier, doc.transaction_date, get_purchase_order_delta(doc), sign=-1)
+    except Exception as e:
+        frappe.log_error(f"Supplier stats update failed for {doc.name}: {str(e)}", "Supplier Stats")
+
+
+def on_purchase_receipt_submit(doc, method):
+    try:
+        apply_stats_delta(doc.company, doc.supplier, doc.posting_date, get_purchase_receipt_delta(doc))
+    except Exception as e:
+        frappe.log_error(f"Supplier stats update failed for {doc.name}: {str(e)}", "Supplier Stats")
+
+
+def on_purchase_receipt_cancel(doc, method):
+    try:
+        apply_stats_delta(doc.company, doc.supplier, doc.posting_date, get_purchase_receipt_delta(doc), sign=-1)
+    except Exception as e:
+        frappe.log_error(f"Supplier stats update failed for {doc.name}: {str(e)}", "Supplier Stats")
+
+
+def get_supplier_stats(company, days=365):
+    """Per-supplier totals over the months covering the last `days` days"""
+    from_month = get_first_day(add_days(nowdate(), -int(days or 365)))
+
+    suppliers = frappe.db.sql(f"""
+        SELECT
+            supplier,
+            {", ".join(f"SUM({field}) AS {field}" for field in STAT_FIELDS)},
+            MAX(month) AS last_active_month
+        FROM `tabAI Supplier Monthly Stats`
+        WHERE company = %s
+        AND month >= %s
+        GROUP BY supplier
+        HAVING SUM(order_count) > 0
+    """, (company, from_month), as_dict=True)
+
+    for row in suppliers:
+        lines = flt(row.line_count)
+        row.rate_mean = row.rate_sum / lines if lines else 0
+        row.rate_variance = max(0, row.rate_sq_sum / lines - row.rate_mean ** 2) if lines else 0
+        row.on_time_ratio = row.on_time_lines / row.received_lines if row.received_lines else 0
+
+    return suppliers
+
+
+def rebuild_supplier_stats(company=None, months=REBUILD_MONTHS):
+    """
+    Recompute the last `months` of supplier statistics from submitted
+    Purchase Orders and Purchase Receipts, correcting any drift from the
+    incremental document-event updates
+    """
+    try:
+        from_month = get_first_day(add_months(nowdate(), -int(months)))
+        values = {"from_month": from_month, "company": company}
+
+        order_rows = frappe.db.sql("""
+            SELECT
+                po.company, po.supplier,
+                DATE_FORMAT(po.transaction_date, '%%Y-%%m-01') AS month,
+                COUNT(DISTINCT po.name) AS order_count,
+                COUNT(poi.name) AS line_count,
+                SUM(IFNULL(NULLIF(poi.base_net_amount, 0), poi.amount)) AS line_value,
+                SUM(IFNULL(NULLIF(poi.stock_qty, 0), poi.qty)) AS total_qty,
+                SUM(IFNULL(NULLIF(poi.base_rate, 0), poi.rate)) AS rate_sum,
+                SUM(POW(IFNULL(NULLIF(poi.base_rate, 0), poi.rate), 2)) AS rate_sq_sum
+            FROM `tabPurchase Order` po
+            INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
+            WHERE po.docstatus = 1
+            AND po.transaction_date >= %(from_month)s
+            {company_condition}
+            GROUP BY po.company, po.supplier, month
+        """.format(company_condition="AND po.company = %(company)s" if company else ""), values, as_dict=True)
+
+        receipt_rows = frappe.db.sql("""
+            SELECT
+                pr.company, pr.supplier,
+                DATE_FORMAT(pr.posting_date, '%%Y-%%m-01') AS month,
+                COUNT(*) AS received_lines,
+                SUM(CASE WHEN poi.schedule_date IS NULL OR pr.posting_date <= poi.schedule_date
+                         THEN 1 ELSE 0 END) AS on_time_lines
+            FROM `tabPurchase Receipt` pr
+            INNER JOIN `tabPurchase Receipt Item` pri ON pri.parent = pr.name
+            INNER JOIN `tabPurchase Order Item` poi ON poi.name = pri.purchase_order_item
+            WHERE pr.docstatus = 1
+            AND pr.posting_date >= %(from_month)s
+            {company_condition}
+            GROUP BY pr.company, pr.supplier, month
+        """.format(company_condition="AND pr.company = %(company)s" if company else ""), values, as_dict=True)
+
+        buckets = {}
+        for row in order_rows + receipt_rows:
+            if not row.company or not row.supplier:
+                continue
+            bucket = buckets.setdefault((row.company, row.supplier, row.month), empty_stats())
+            for field in STAT_FIELDS:
+                bucket[field] += flt(row.get(field))
+
+        conditions = {"month": [">=", from_month]}
+        if company:
+            conditions["company"] = company
+        frappe.db.delete("AI Supplier Monthly Stats", conditions)
+
+        timestamp = now()
+        fields = ["name", "company", "supplier", "month"] + STAT_FIELDS + [
+            "last_rebuilt", "creation", "modified", "owner", "modified_by", "docstatus"
+        ]
+        frappe.db.bulk_insert("AI Supplier Monthly Stats", fields, [
+            [get_stats_name(bucket_company, supplier, month), bucket_company, supplier, month]
+            + [bucket[field] for field in STAT_FIELDS]
+            + [timestamp, timestamp, timestamp, "Administrator", "Administrator", 0]
+            for (bucket_company, supplier, month), bucket in buckets.items()
+        ], chunk_size=1000)
+
+        frappe.db.commit()
+
+        return {"success": True, "buckets": len(buckets)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Supplier stats rebuild failed: {str(e)}", "Supplier Stats")
+        return {"success": False, "error": str(e)}
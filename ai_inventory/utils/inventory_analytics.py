@@ -2,56 +2,71 @@
 # Advanced Data Science Helper Module for Inventory Analytics
 
 import frappe
-from frappe.utils import flt, nowdate, add_days, getdate, cint
-import numpy as np
-import pandas as pd
+from frappe.utils import flt, nowdate, add_days, add_months, get_first_day, getdate, cint
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
-from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from ai_inventory.lazy_imports import lazy_import
+from ai_inventory.behavior_segmentation import get_segments
+from ai_inventory.abc_xyz_classification import get_forecast_classes
 import warnings
 warnings.filterwarnings('ignore')
 
+np = lazy_import("numpy")
+
+VARIABILITY_WINDOW_DAYS = 90
+SEASONALITY_WINDOW_MONTHS = 24
+SEASONAL_PERIODS = (12, 6, 4, 3)
+# The seasonal bins are 4 of the 12 non-DC bins of a 24 month periodogram, so
+# pure noise already puts about a third of its power there (sd ~0.13); 0.6
+# flags about 3% of random series instead of a third
+SEASONALITY_THRESHOLD = 0.6
+
+
+def get_seasonal_strength(series):
+    """
+    Seasonal strength, dominant periodogram bin and detection flag per row of a
+    (series x months) array
+
+    Strength is the share of a series' periodogram power at the yearly cycle
+    and its harmonics (12, 6, 4 and 3 month periods). A series is seasonal
+    when that share clears SEASONALITY_THRESHOLD and its strongest bin is one
+    of those periods.
+    """
+    months = series.shape[1]
+    centered = series - series.mean(axis=1, keepdims=True)
+    power = np.abs(np.fft.rfft(centered, axis=1)) ** 2
+    total_power = power[:, 1:].sum(axis=1)
+    seasonal_bins = [months // period for period in SEASONAL_PERIODS if months % period == 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strength = np.where(total_power > 0, power[:, seasonal_bins].sum(axis=1) / total_power, 0)
+    dominant_bin = power[:, 1:].argmax(axis=1) + 1
+    detected = (strength >= SEASONALITY_THRESHOLD) & np.isin(dominant_bin, seasonal_bins)
+    return strength, dominant_bin, detected
+
 class InventoryAnalytics:
     """Advanced inventory analytics with machine learning capabilities"""
     
     def __init__(self, company=None):
         self.company = company
-        self.scaler = StandardScaler()
     
     def perform_abc_analysis(self, items_data):
-        """Perform ABC analysis based on consumption value and frequency"""
+        """Attach the company-wide ABC/XYZ class persisted on each forecast"""
         try:
             if not items_data:
                 return items_data
             
-            df = pd.DataFrame(items_data)
-            
-            # Calculate annual consumption value
-            df['annual_consumption_value'] = (
-                df['predicted_consumption'] * 12 * df['predicted_price']
+            classes = get_forecast_classes(
+                (item.get('item_code'), item.get('warehouse')) for item in items_data
             )
             
-            # Sort by consumption value
-            df = df.sort_values('annual_consumption_value', ascending=False)
-            
-            # Calculate cumulative percentage
-            df['cumulative_value'] = df['annual_consumption_value'].cumsum()
-            total_value = df['annual_consumption_value'].sum()
-            
-            if total_value > 0:
-                df['cumulative_percentage'] = (df['cumulative_value'] / total_value) * 100
-                
-                # Assign ABC classes
-                df['abc_class'] = df['cumulative_percentage'].apply(
-                    lambda x: 'A' if x <= 80 else ('B' if x <= 95 else 'C')
-                )
-            else:
-                df['abc_class'] = 'C'
+            for item in items_data:
+                stored = classes.get((item.get('item_code'), item.get('warehouse')))
+                item['abc_class'] = (stored and stored.abc_class) or 'C'
+                item['xyz_class'] = (stored and stored.xyz_class) or 'Z'
+                item['annual_consumption_value'] = flt(stored.annual_consumption_value) if stored else 0
             
-            return df.to_dict('records')
+            return items_data
             
         except Exception as e:
             frappe.log_error(f"ABC analysis failed: {str(e)}")
@@ -59,192 +74,209 @@ class InventoryAnalytics:
     
     def calculate_demand_variability(self, item_code, warehouse, company):
         """Calculate demand variability and coefficient of variation"""
+        key = (item_code, warehouse, company)
+        return self.calculate_demand_variability_batch([key])[key]
+    
+    def calculate_demand_variability_batch(self, keys):
+        """Demand variability for many (item_code, warehouse, company) keys from one query"""
+        keys = list(dict.fromkeys(tuple(key) for key in keys))
         try:
-            # Get daily consumption for last 90 days
-            daily_consumption = frappe.db.sql("""
-                SELECT 
-                    DATE(sle.posting_date) as date,
-                    SUM(ABS(sle.actual_qty)) as daily_qty
-                FROM `tabStock Ledger Entry` sle
-                INNER JOIN `tabWarehouse` w ON w.name = sle.warehouse
-                WHERE sle.item_code = %s 
-                AND sle.warehouse = %s
-                AND w.company = %s
-                AND sle.actual_qty < 0
-                AND sle.posting_date >= DATE_SUB(CURDATE(), INTERVAL 90 DAY)
-                GROUP BY DATE(sle.posting_date)
-                ORDER BY date
-            """, (item_code, warehouse, company), as_dict=True)
-            
-            if len(daily_consumption) < 7:
-                return {
-                    'coefficient_of_variation': 1.0,
-                    'demand_variability': 'High',
-                    'forecast_accuracy': 'Low'
+            days = VARIABILITY_WINDOW_DAYS
+            from_date = getdate(add_days(nowdate(), -(days - 1)))
+            
+            # Days without consumption stay NaN so only active days are measured
+            series = self._get_consumption_matrix(keys, "daily", from_date, days, fill_value=np.nan)
+            
+            active_days = np.sum(~np.isnan(series), axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_qty = np.nanmean(series, axis=1)
+                std_qty = np.nanstd(series, axis=1)
+                cv = np.where(mean_qty > 0, std_qty / mean_qty, 1.0)
+            
+            results = {}
+            for i, key in enumerate(keys):
+                if active_days[i] < 7:
+                    results[key] = {
+                        'coefficient_of_variation': 1.0,
+                        'demand_variability': 'High',
+                        'forecast_accuracy': 'Low'
+                    }
+                    continue
+                
+                # Classify variability
+                if cv[i] < 0.3:
+                    variability, accuracy = 'Low', 'High'
+                elif cv[i] < 0.7:
+                    variability, accuracy = 'Medium', 'Medium'
+                else:
+                    variability, accuracy = 'High', 'Low'
+                
+                results[key] = {
+                    'coefficient_of_variation': round(float(cv[i]), 3),
+                    'demand_variability': variability,
+                    'forecast_accuracy': accuracy
                 }
             
-            quantities = [d['daily_qty'] for d in daily_consumption]
-            mean_qty = np.mean(quantities)
-            std_qty = np.std(quantities)
-            
-            cv = std_qty / mean_qty if mean_qty > 0 else 1.0
-            
-            # Classify variability
-            if cv < 0.3:
-                variability = 'Low'
-                accuracy = 'High'
-            elif cv < 0.7:
-                variability = 'Medium'
-                accuracy = 'Medium'
-            else:
-                variability = 'High'
-                accuracy = 'Low'
-            
-            return {
-                'coefficient_of_variation': round(cv, 3),
-                'demand_variability': variability,
-                'forecast_accuracy': accuracy
-            }
+            return results
             
         except Exception as e:
             frappe.log_error(f"Demand variability calculation failed: {str(e)}")
-            return {
+            return {key: {
                 'coefficient_of_variation': 1.0,
                 'demand_variability': 'Unknown',
                 'forecast_accuracy': 'Unknown'
-            }
+            } for key in keys}
     
     def detect_seasonal_patterns(self, item_code, warehouse, company):
         """Detect seasonal patterns using Fourier analysis"""
+        key = (item_code, warehouse, company)
+        return self.detect_seasonal_patterns_batch([key])[key]
+    
+    def detect_seasonal_patterns_batch(self, keys):
+        """
+        Seasonality for many (item_code, warehouse, company) keys from one query
+        
+        See get_seasonal_strength for the measure and the detection rule.
+        """
+        keys = list(dict.fromkeys(tuple(key) for key in keys))
+        no_seasonality = {
+            'seasonality_detected': False,
+            'seasonal_strength': 0,
+            'dominant_period_months': None,
+            'peak_months': [],
+            'low_months': []
+        }
+        
         try:
-            # Get monthly consumption for 24 months
-            monthly_data = frappe.db.sql("""
-                SELECT 
-                    YEAR(sle.posting_date) as year,
-                    MONTH(sle.posting_date) as month,
-                    SUM(ABS(sle.actual_qty)) as monthly_qty
-                FROM `tabStock Ledger Entry` sle
-                INNER JOIN `tabWarehouse` w ON w.name = sle.warehouse
-                WHERE sle.item_code = %s 
-                AND sle.warehouse = %s
-                AND w.company = %s
-                AND sle.actual_qty < 0
-                AND sle.posting_date >= DATE_SUB(CURDATE(), INTERVAL 24 MONTH)
-                GROUP BY YEAR(sle.posting_date), MONTH(sle.posting_date)
-                ORDER BY year, month
-            """, (item_code, warehouse, company), as_dict=True)
-            
-            if len(monthly_data) < 12:
-                return {
-                    'seasonality_detected': False,
-                    'seasonal_strength': 0,
-                    'peak_months': [],
-                    'low_months': []
-                }
-            
-            quantities = [d['monthly_qty'] for d in monthly_data]
-            
-            # Simple seasonality detection using coefficient of variation
-            mean_qty = np.mean(quantities)
-            cv = np.std(quantities) / mean_qty if mean_qty > 0 else 0
-            
-            seasonality_detected = cv > 0.5
-            seasonal_strength = min(cv, 1.0)
-            
-            # Identify peak and low months
-            if seasonality_detected and len(monthly_data) >= 12:
-                # Group by month across years
-                month_averages = defaultdict(list)
-                for d in monthly_data:
-                    month_averages[d['month']].append(d['monthly_qty'])
-                
-                month_stats = {}
-                for month, quantities in month_averages.items():
-                    month_stats[month] = np.mean(quantities)
+            months = SEASONALITY_WINDOW_MONTHS
+            from_month = getdate(get_first_day(add_months(nowdate(), -(months - 1))))
+            series = self._get_consumption_matrix(keys, "monthly", from_month, months, fill_value=0.0)
+            
+            active_months = np.count_nonzero(series, axis=1)
+            
+            # Periodogram of the de-meaned series; bin k is a period of months / k
+            strength, dominant_bin, seasonal = get_seasonal_strength(series)
+            
+            # Average consumption per calendar month, one column per month of the year
+            calendar_month = np.array([(from_month.month - 1 + offset) % 12 for offset in range(months)])
+            month_map = np.zeros((months, 12))
+            month_map[np.arange(months), calendar_month] = 1
+            month_averages = (series @ month_map) / np.maximum(month_map.sum(axis=0), 1)
+            overall_mean = month_averages.mean(axis=1, keepdims=True)
+            peaks = month_averages > overall_mean * 1.2
+            lows = month_averages < overall_mean * 0.8
+            
+            results = {}
+            for i, key in enumerate(keys):
+                if active_months[i] < 12:
+                    results[key] = dict(no_seasonality)
+                    continue
                 
-                overall_mean = np.mean(list(month_stats.values()))
-                
-                peak_months = [month for month, avg in month_stats.items() 
-                              if avg > overall_mean * 1.2]
-                low_months = [month for month, avg in month_stats.items() 
-                             if avg < overall_mean * 0.8]
-            else:
-                peak_months = []
-                low_months = []
+                detected = bool(seasonal[i])
+                results[key] = {
+                    'seasonality_detected': detected,
+                    'seasonal_strength': round(float(strength[i]), 3),
+                    'dominant_period_months': round(months / dominant_bin[i], 1),
+                    'peak_months': [int(m) + 1 for m in np.flatnonzero(peaks[i])] if detected else [],
+                    'low_months': [int(m) + 1 for m in np.flatnonzero(lows[i])] if detected else []
+                }
             
-            return {
-                'seasonality_detected': seasonality_detected,
-                'seasonal_strength': round(seasonal_strength, 3),
-                'peak_months': peak_months,
-                'low_months': low_months
-            }
+            return results
             
         except Exception as e:
             frappe.log_error(f"Seasonal pattern detection failed: {str(e)}")
-            return {
-                'seasonality_detected': False,
-                'seasonal_strength': 0,
-                'peak_months': [],
-                'low_months': []
-            }
+            return {key: dict(no_seasonality) for key in keys}
+    
+    def _get_consumption_matrix(self, keys, granularity, from_date, periods, fill_value):
+        """
+        Consumption of every key as one (keys x periods) matrix from a single
+        Stock Ledger Entry aggregate
+        """
+        matrix = np.full((len(keys), periods), fill_value, dtype=float)
+        if not keys:
+            return matrix
+        
+        if granularity == "daily":
+            bucket = "DATE(sle.posting_date)"
+        else:
+            bucket = "DATE_FORMAT(sle.posting_date, '%%Y-%%m-01')"
+        
+        rows = frappe.db.sql(f"""
+            SELECT 
+                sle.item_code,
+                sle.warehouse,
+                w.company,
+                {bucket} as period,
+                SUM(ABS(sle.actual_qty)) as qty
+            FROM `tabStock Ledger Entry` sle
+            INNER JOIN `tabWarehouse` w ON w.name = sle.warehouse
+            WHERE sle.item_code IN %(item_codes)s
+            AND sle.warehouse IN %(warehouses)s
+            AND sle.actual_qty < 0
+            AND sle.is_cancelled = 0
+            AND sle.posting_date >= %(from_date)s
+            GROUP BY sle.item_code, sle.warehouse, w.company, period
+        """, {
+            "item_codes": list({key[0] for key in keys}),
+            "warehouses": list({key[1] for key in keys}),
+            "from_date": from_date
+        }, as_dict=True)
+        
+        positions = {key: i for i, key in enumerate(keys)}
+        for row in rows:
+            i = positions.get((row.item_code, row.warehouse, row.company))
+            if i is None:
+                continue
+            period = getdate(row.period)
+            if granularity == "daily":
+                offset = (period - from_date).days
+            else:
+                offset = (period.year - from_date.year) * 12 + period.month - from_date.month
+            if 0 <= offset < periods:
+                matrix[i, offset] = flt(row.qty)
+        
+        return matrix
+    
+    def add_demand_patterns(self, items_data, company=None):
+        """Attach variability and seasonality to each item row"""
+        keys = [
+            (item.get('item_code'), item.get('warehouse'), item.get('company') or company)
+            for item in items_data
+        ]
+        valid_keys = [key for key in keys if all(key)]
+        if not valid_keys:
+            return items_data
+        
+        variability = self.calculate_demand_variability_batch(valid_keys)
+        seasonality = self.detect_seasonal_patterns_batch(valid_keys)
+        
+        for item, key in zip(items_data, keys):
+            if key in variability:
+                item.update(variability[key])
+                item['seasonality_detected'] = seasonality[key]['seasonality_detected']
+                item['seasonal_strength'] = seasonality[key]['seasonal_strength']
+        
+        return items_data
     
     def cluster_items_by_behavior(self, items_data):
-        """Cluster items based on consumption behavior using K-means"""
+        """Label items with their behavior segment from the persisted segmentation"""
         try:
             if len(items_data) < 5:
                 return items_data
             
-            df = pd.DataFrame(items_data)
-            
-            # Prepare features for clustering
-            features = []
-            feature_names = []
-            
-            if 'predicted_consumption' in df.columns:
-                features.append(df['predicted_consumption'].fillna(0))
-                feature_names.append('consumption')
-            
-            if 'volatility_index' in df.columns:
-                features.append(df['volatility_index'].fillna(1))
-                feature_names.append('volatility')
-            
-            if 'confidence_score' in df.columns:
-                features.append(df['confidence_score'].fillna(50))
-                feature_names.append('confidence')
-            
-            if 'current_stock' in df.columns:
-                features.append(df['current_stock'].fillna(0))
-                feature_names.append('stock')
-            
-            if len(features) < 2:
+            # Forecast rows already carry their stored segment; only the rest are assigned
+            unlabeled = [item for item in items_data if not item.get('behavior_segment')]
+            segments = get_segments(unlabeled) if unlabeled else []
+            if segments is None:
                 return items_data
             
-            # Create feature matrix
-            X = np.column_stack(features)
+            for item, segment in zip(unlabeled, segments):
+                item['behavior_segment'] = segment
             
-            # Normalize features
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Determine optimal number of clusters (3-6)
-            n_clusters = min(6, max(3, len(items_data) // 10))
-            
-            # Perform K-means clustering
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            clusters = kmeans.fit_predict(X_scaled)
-            
-            # Assign cluster labels
-            cluster_names = {
-                0: 'High Volume/Low Risk',
-                1: 'Medium Volume/Medium Risk', 
-                2: 'Low Volume/High Risk',
-                3: 'Critical/Volatile',
-                4: 'Stable/Predictable',
-                5: 'Irregular/Seasonal'
-            }
-            
-            df['behavior_cluster'] = [cluster_names.get(c, f'Cluster {c}') for c in clusters]
+            for item in items_data:
+                item['behavior_cluster'] = item.get('behavior_segment')
             
-            return df.to_dict('records')
+            return items_data
             
         except Exception as e:
             frappe.log_error(f"Item clustering failed: {str(e)}")
@@ -482,6 +514,9 @@ def get_advanced_analytics_data(items_data, filters=None):
         # Perform ABC analysis
         items_data = analytics.perform_abc_analysis(items_data)
         
+        # Demand variability and seasonality for every item from two batched queries
+        items_data = analytics.add_demand_patterns(items_data, company)
+        
         # Add health scores
         for item in items_data:
             item['health_score'] = analytics.calculate_inventory_health_score(item)
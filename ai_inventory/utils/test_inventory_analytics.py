@@ -0,0 +1,31 @@
+# Copyright (c) 2025, sammish and contributors
+# For license information, please see license.txt
+
+import unittest
+
+import numpy as np
+
+from ai_inventory.utils.inventory_analytics import SEASONALITY_WINDOW_MONTHS, get_seasonal_strength
+
+
+class TestSeasonalityDetection(unittest.TestCase):
+	def test_random_series_are_not_flagged(self):
+		rng = np.random.default_rng(42)
+		series = np.maximum(rng.normal(100, 30, size=(1000, SEASONALITY_WINDOW_MONTHS)), 0)
+
+		strength, dominant_bin, detected = get_seasonal_strength(series)
+
+		# Noise puts about a third of its power in the seasonal bins
+		self.assertAlmostEqual(float(strength.mean()), 1 / 3, delta=0.05)
+		self.assertLess(detected.mean(), 0.06)
+
+	def test_yearly_cycle_is_flagged(self):
+		rng = np.random.default_rng(7)
+		months = np.arange(SEASONALITY_WINDOW_MONTHS)
+		cycle = 100 * (1 + 0.6 * np.sin(2 * np.pi * months / 12))
+		series = np.maximum(cycle + rng.normal(0, 20, size=(200, SEASONALITY_WINDOW_MONTHS)), 0)
+
+		strength, dominant_bin, detected = get_seasonal_strength(series)
+
+		self.assertGreater(detected.mean(), 0.9)
+		self.assertTrue((dominant_bin[detected] == SEASONALITY_WINDOW_MONTHS // 12).all())